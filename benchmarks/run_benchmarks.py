@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from .synthetic_data import generate_dataset, scaled_volume, PLANNING_WEEK
+
+# Usage, from the repository root:
+#   python -m benchmarks.run_benchmarks                      1x, 10x and 50x, compared to the baseline
+#   python -m benchmarks.run_benchmarks --scales 1 --save-baseline
+#   python -m benchmarks.run_benchmarks --stages read,generate --nodes 20
+# Generated inputs are kept in the data directory and reused between runs.
+
+DEFAULT_SCALES = [1, 10, 50]
+STAGES = ['read', 'generate', 'save', 'combine']
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), 'otr_benchmark_data')
+# Slower or bigger than the baseline by more than this counts as a regression
+DEFAULT_TOLERANCE = 0.20
+RSS_SAMPLE_INTERVAL = 0.01
+# How often a running stage is checked for a child that died without a
+# result, e.g. killed by the OOM killer at the larger scales
+RESULT_POLL_SECONDS = 1.0
+
+
+class PeakRSSSampler:
+    # Polls the process RSS on a background thread; the OS only keeps a
+    # lifetime peak, which would hide which stage it belongs to
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        import psutil
+        self.process = psutil.Process()
+        self.interval = interval
+        self.peak = self.process.memory_info().rss
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+def combinations_for(planning_week):
+    # Same presets as the combiner tab
+    from otr_supportinator.engine.naming import make_combinations
+    return make_combinations(planning_week)
+
+
+def stage_read(dataset, work_dir):
+    from otr_supportinator.utils.file_utils import process_file
+    started = time.perf_counter()
+    rows = sum(len(process_file(path)) for path in dataset['forecast_files'])
+    return time.perf_counter() - started, rows
+
+
+def stage_generate(dataset, work_dir):
+    # Read, melt, concat, pivot and summaries, as one generator job does
+    from otr_supportinator.engine.generator import SummaryFileGenerator
+    started = time.perf_counter()
+    SummaryFileGenerator(dataset['forecast_files']).process_files()
+    return time.perf_counter() - started, dataset['forecast_rows'] * dataset['volume']['weeks']
+
+
+def stage_save(dataset, work_dir):
+    # Only the write is timed; the pivot it writes is built first
+    from otr_supportinator.engine.generator import SummaryFileGenerator
+    generator = SummaryFileGenerator(dataset['forecast_files'])
+    pivot_table, _, _ = generator.process_files()
+    started = time.perf_counter()
+    generator.save(pivot_table, os.path.join(work_dir, 'summary_file.xlsx'))
+    return time.perf_counter() - started, len(pivot_table)
+
+
+def stage_combine(dataset, work_dir):
+    from otr_supportinator.engine.combiner import combine_summary_files
+    started = time.perf_counter()
+    combine_summary_files(dataset['summary_files'], combinations_for(dataset['planning_week']),
+                          dataset['planning_week'], work_dir)
+    return time.perf_counter() - started, dataset['summary_rows']
+
+
+STAGE_FUNCTIONS = {
+    'read': stage_read,
+    'generate': stage_generate,
+    'save': stage_save,
+    'combine': stage_combine,
+}
+
+
+def run_stage_in_child(stage, dataset, results):
+    # Each stage gets a fresh process so its peak RSS and import costs are its own
+    work_dir = tempfile.mkdtemp(prefix=f"otr_benchmark_{stage}_")
+    # An empty output cache, so the combiner really writes every output
+    os.environ['OTR_OUTPUT_CACHE_DIR'] = os.path.join(work_dir, 'output_cache')
+    # Benchmark inputs should not skew the ETAs of real runs
+    os.environ['OTR_THROUGHPUT_HISTORY'] = os.path.join(work_dir, 'throughput.json')
+    os.environ['OTR_HISTORY_DIR'] = os.path.join(work_dir, 'history')
+    try:
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                with PeakRSSSampler() as sampler:
+                    seconds, rows = STAGE_FUNCTIONS[stage](dataset, work_dir)
+            finally:
+                sys.stdout = stdout
+        results.put({'seconds': seconds, 'rows': rows, 'peak_rss': sampler.peak,
+                     'rows_per_second': rows / seconds if seconds else None})
+    except Exception as e:
+        results.put({'error': f"{type(e).__name__}: {e}"})
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_stage(stage, dataset):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_stage_in_child, args=(stage, dataset, results))
+    process.start()
+    while True:
+        try:
+            result = results.get(timeout=RESULT_POLL_SECONDS)
+            break
+        except queue.Empty:
+            if process.is_alive():
+                continue
+        # The child may have put its result just before exiting
+        try:
+            result = results.get(timeout=RESULT_POLL_SECONDS)
+        except queue.Empty:
+            process.join()
+            if process.exitcode is not None and process.exitcode < 0:
+                reason = f"was killed by signal {-process.exitcode} (possibly out of memory)"
+            else:
+                reason = f"exited with code {process.exitcode}"
+            result = {'error': f"Benchmark process {reason} before reporting a result"}
+        break
+    process.join()
+    return result
+
+
+def compare(result, baseline, tolerance):
+    # Returns the regressions of one measurement against its baseline
+    if not baseline or 'error' in result:
+        return []
+    regressions = []
+    for metric in ('seconds', 'peak_rss'):
+        if baseline.get(metric) and result[metric] > baseline[metric] * (1 + tolerance):
+            regressions.append(f"{metric} {result[metric] / baseline[metric] - 1:+.0%}")
+    return regressions
+
+
+def format_result(key, result, baseline):
+    if 'error' in result:
+        return f"{key:<16} FAILED {result['error']}"
+    line = (f"{key:<16} {result['seconds']:9.2f}s {result['peak_rss'] / 1024 ** 2:9.0f} MB "
+            f"{result['rows']:>11,} rows {result['rows_per_second'] or 0:>12,.0f} rows/s")
+    if baseline:
+        line += (f"   vs baseline {result['seconds'] / baseline['seconds'] - 1:+.0%} time, "
+                 f"{result['peak_rss'] / baseline['peak_rss'] - 1:+.0%} memory")
+    return line
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_json(path, data):
+    with open(path + '.partial', 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(path + '.partial', path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the generator and combiner pipelines on synthetic inputs")
+    parser.add_argument('--scales', default=",".join(str(scale) for scale in DEFAULT_SCALES),
+                        help="Comma separated multiples of production volume")
+    parser.add_argument('--stages', default=",".join(STAGES))
+    parser.add_argument('--nodes', type=int, help="Nodes per input file at 1x")
+    parser.add_argument('--weeks', type=int, help="Forecast weeks per input file")
+    parser.add_argument('--files', type=int, help="Number of input files")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGE_FUNCTIONS]
+    if unknown:
+        parser.error(f"Unknown stage(s): {', '.join(unknown)}")
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+    for scale in [float(scale) for scale in args.scales.split(',')]:
+        volume = scaled_volume(scale, args.nodes, args.weeks, args.files)
+        label = f"{scale:g}x"
+        directory = os.path.join(args.data_dir, f"{volume['nodes']}n_{volume['weeks']}w_{volume['files']}f")
+        print(f"Preparing {label} inputs ({volume['nodes']} nodes x {volume['weeks']} weeks x {volume['files']} files)...")
+        dataset = generate_dataset(directory, volume)
+        dataset['planning_week'] = dataset.get('planning_week', PLANNING_WEEK)
+
+        for stage in stages:
+            key = f"{label}/{stage}"
+            result = run_stage(stage, dataset)
+            result['volume'] = volume
+            results[key] = result
+            print(format_result(key, result, baseline.get(key)))
+            for regression in compare(result, baseline.get(key), args.tolerance):
+                regressions.append(f"{key}: {regression}")
+
+    if args.output:
+        save_json(args.output, results)
+    if args.save_baseline:
+        baseline.update({key: result for key, result in results.items() if 'error' not in result})
+        save_json(args.baseline, baseline)
+        print(f"Saved baseline to {args.baseline}")
+    elif not baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to store one")
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    failed = any('error' in result for result in results.values())
+    return 1 if regressions or failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import os
+import json
+import random
+from datetime import datetime, timedelta
+from otr_supportinator.utils.date_utils import get_amazon_week
+
+# Roughly one weekly production run: a forecast workbook per region, each
+# with this many nodes, and as many generated summary files for the combiner
+PRODUCTION_VOLUME = {
+    'nodes': 40,
+    'weeks': 12,
+    'files': 4,
+}
+CYCLES = ['AM', 'PM']
+REGIONS = ['Kanto', 'Kansai', 'Chubu', 'Kyushu', 'Tohoku', 'Hokkaido', 'Chugoku', 'Shikoku']
+INDEX_COLUMNS = ['region', 'channel_type', 'parent_node', 'prefecture', 'carrier', 'node', 'cycle',
+                 'metric', 'sub_metric']
+# Every metric/sub_metric pair the generator pivots into a column
+METRIC_PAIRS = [
+    ('1 - FO', 'volume'), ('2 - otr_capa', 'calculated_total'), ('2 - otr_capa', 'optimizer_total'),
+    ('3 - hdp', 'capacity'), ('4 - amflex', 'alloted_capacity'), ('4 - amflex', 'bau_avg_capa'),
+    ('4 - amflex', 'capacity_ask'), ('4 - amflex', 'commitment_capacity'), ('4 - amflex', 'max_block'),
+    ('4 - amflex', 'mde_max_capa'), ('4 - amflex', 'spr'), ('4 - amflex', 'vans_alloted'),
+    ('4 - amflex', 'vans_ask'), ('4 - amflex', 'vans_committed'), ('4 - amflex_keicar', 'capacity'),
+    ('4 - amflex_keicar', 'spr'), ('4 - amflex_keicar', 'vans'), ('4.1 - amflex_total', 'capacity'),
+    ('4.1 - amflex_total', 'spr'), ('4.1 - amflex_total', 'vans'), ('5 - dsp2.0_keivan', 'capacity'),
+    ('5 - dsp2.0_keivan', 'spr'), ('5 - dsp2.0_keivan', 'vans'), ('5 - dsp2.0_largevan', 'capacity'),
+    ('5 - dsp2.0_largevan', 'spr'), ('5 - dsp2.0_largevan', 'vans'), ('5 - dsp_1t_walker', 'capacity'),
+    ('5 - dsp_1t_walker', 'spr'), ('5 - dsp_1t_walker', 'vans'), ('5 - dsp_biker', 'capacity'),
+    ('5 - dsp_biker', 'spr'), ('5 - dsp_biker', 'vans'), ('5 - dsp_keivan', 'capacity'),
+    ('5 - dsp_keivan', 'spr'), ('5 - dsp_keivan', 'vans'), ('5 - dsp_keivan', 'vans_rescue'),
+    ('5 - dsp_keivan_walker', 'capacity'), ('5 - dsp_keivan_walker', 'spr'),
+    ('5 - dsp_keivan_walker', 'vans'), ('5 - dsp_largevan', 'capacity'), ('5 - dsp_largevan', 'spr'),
+    ('5 - dsp_largevan', 'vans'), ('5 - dsp_walker', 'capacity'), ('5 - dsp_walker', 'spr'),
+    ('5 - dsp_walker', 'vans'), ('5.1 - dsp_total', 'capacity'), ('5.1 - dsp_total', 'spr'),
+    ('5.1 - dsp_total', 'vans'), ('6 - excess/shortage', 'capacity'),
+]
+METRIC_COLUMNS = [f"{metric} {sub_metric}" for metric, sub_metric in METRIC_PAIRS]
+# Same leading columns as the generator's output
+SUMMARY_COLUMNS = (['region', 'amazon_week', 'node', 'cycle', 'forecast_period_start'] + METRIC_COLUMNS[:2]
+                   + ['CVP', 'generated_at'] + METRIC_COLUMNS[2:])
+PLANNING_WEEK = 40
+FIRST_WEEK_START = datetime(2024, 9, 29)  # Sunday starting Amazon week 40 of 2024
+
+
+def scaled_volume(scale, nodes=None, weeks=None, files=None):
+    # Scaling multiplies the nodes per file, which is what grows in practice;
+    # weeks and files stay at production values unless given
+    return {
+        'nodes': int((nodes or PRODUCTION_VOLUME['nodes']) * scale),
+        'weeks': weeks or PRODUCTION_VOLUME['weeks'],
+        'files': files or PRODUCTION_VOLUME['files'],
+    }
+
+
+def week_starts(weeks):
+    return [FIRST_WEEK_START + timedelta(weeks=week) for week in range(weeks)]
+
+
+def metric_value(rng, sub_metric):
+    if rng.random() < 0.02:
+        return None  # Real files have gaps
+    if sub_metric == 'spr':
+        return round(rng.uniform(80, 220), 2)
+    if 'vans' in sub_metric or sub_metric == 'max_block':
+        return rng.randint(0, 120)
+    return round(rng.uniform(0, 25000), 1)
+
+
+def node_names(file_index, nodes):
+    region = REGIONS[file_index % len(REGIONS)]
+    return region, [f"{region[0]}{file_index:02d}{node:04d}" for node in range(nodes)]
+
+
+def write_forecast_workbook(file_path, file_index, nodes, weeks, seed=0):
+    # Wide forecast layout read by process_file: index columns, then one
+    # column per week holding the value for each metric/sub_metric row
+    from openpyxl import Workbook
+
+    rng = random.Random(seed * 1000 + file_index)
+    region, names = node_names(file_index, nodes)
+    dates = week_starts(weeks)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(INDEX_COLUMNS + dates)
+    for node in names:
+        for cycle in CYCLES:
+            prefix = [region, 'DSP', f"{node[:3]}P", f"Pref-{node[1:3]}", f"Carrier-{node[-1]}", node, cycle]
+            for metric, sub_metric in METRIC_PAIRS:
+                ws.append(prefix + [metric, sub_metric] + [metric_value(rng, sub_metric) for _ in dates])
+    wb.save(file_path)
+    return nodes * len(CYCLES) * len(METRIC_PAIRS)
+
+
+def write_summary_file(file_path, file_index, nodes, weeks, seed=0):
+    # Generator output layout read by the combiner
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    rng = random.Random(seed * 1000 + 500 + file_index)
+    region, names = node_names(file_index, nodes)
+    generated_at = datetime(2024, 9, 27, 9, 0).strftime('%Y-%m-%d %H:%M:%S')
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    header = []
+    for column in SUMMARY_COLUMNS:
+        cell = WriteOnlyCell(ws, value=column)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    ws.append(header)
+    rows = 0
+    for week_start in week_starts(weeks):
+        amazon_week = get_amazon_week(week_start)
+        for node in names:
+            for cycle in CYCLES:
+                values = {column: metric_value(rng, column.rsplit(' ', 1)[1]) for column in METRIC_COLUMNS}
+                volume, capacity = values['1 - FO volume'], values['2 - otr_capa calculated_total']
+                values['CVP'] = min(volume, capacity) if volume is not None and capacity is not None else None
+                values.update({'region': region, 'amazon_week': amazon_week, 'node': node, 'cycle': cycle,
+                               'forecast_period_start': week_start.strftime('%Y-%m-%d'),
+                               'generated_at': generated_at})
+                ws.append([values[column] for column in SUMMARY_COLUMNS])
+                rows += 1
+    wb.save(file_path)
+    return rows
+
+
+def generate_dataset(directory, volume, seed=0):
+    # Writes the inputs for one scale and a dataset.json describing them.
+    # An existing dataset with the same volume and seed is reused.
+    manifest_path = os.path.join(directory, 'dataset.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['volume'] == volume and manifest['seed'] == seed:
+            return manifest
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = {'volume': volume, 'seed': seed, 'planning_week': PLANNING_WEEK,
+                'forecast_files': [], 'summary_files': [], 'forecast_rows': 0, 'summary_rows': 0}
+    for file_index in range(volume['files']):
+        forecast_path = os.path.join(directory, f"forecast_{file_index + 1:02d}.xlsx")
+        manifest['forecast_rows'] += write_forecast_workbook(forecast_path, file_index, volume['nodes'],
+                                                             volume['weeks'], seed)
+        manifest['forecast_files'].append(forecast_path)
+
+        weeks = ".".join(str(week) for week in range(1, volume['weeks'] + 1))
+        summary_path = os.path.join(directory, f"summary_file_plwk{PLANNING_WEEK}_w-{weeks}_{file_index + 1:02d}.xlsx")
+        manifest['summary_rows'] += write_summary_file(summary_path, file_index, volume['nodes'],
+                                                       volume['weeks'], seed)
+        manifest['summary_files'].append(summary_path)
+        print(f"Generated input set {file_index + 1} of {volume['files']} in {directory}")
+
+    with open(manifest_path + '.partial', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.partial', manifest_path)
+    return manifest
+
+
+if __name__ == '__main__':
+    # python -m benchmarks.synthetic_data <directory> [scale]
+    import sys
+    target = sys.argv[1] if len(sys.argv) > 1 else 'synthetic_inputs'
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 1
+    print(json.dumps(generate_dataset(target, scaled_volume(scale)), indent=2))
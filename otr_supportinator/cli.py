@@ -0,0 +1,279 @@
+import os
+import sys
+import glob
+import json
+import queue
+import argparse
+import threading
+import contextlib
+from .engine.jobs import run_job_in_child
+from .engine.naming import (PLAN_TYPES, extract_plan_type, extract_planning_week, summary_file_name,
+                            make_combinations)
+
+# Usage:
+#   otr_supportinator generate "in/*plwk40*.xlsx" --plan-type final --output-dir out
+#   otr_supportinator combine "out/summary_file_plwk40_*.xlsx" --weeks 2-2,3-5,2-10 --json
+#   otr_supportinator serve --port 8765 --workers 2          (see service.py)
+#   otr_supportinator watch "W:/drop" --output-dir out         (see watcher.py)
+# Nothing here imports Qt, so these run on machines without a display.
+
+COMMANDS = ['generate', 'combine', 'serve', 'watch']
+EXIT_FAILED = 1
+EXIT_CANCELLED = 130
+JOIN_POLL_INTERVAL = 0.2
+
+
+def expand_inputs(patterns):
+    # Globs are expanded here too, for shells that pass them through
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            path = os.path.abspath(path)
+            if os.path.isfile(path) and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def parse_week_ranges(text):
+    # "2-2,3-5,8" -> [(2, 2), (3, 5), (8, 8)]
+    ranges = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition('-')
+        try:
+            start_week, end_week = int(start), int(end or start)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid week range '{part}'")
+        if not 1 <= start_week <= end_week <= 10:
+            raise argparse.ArgumentTypeError(f"Week range '{part}' must be within 1-10, start before end")
+        ranges.append((start_week, end_week))
+    if not ranges:
+        raise argparse.ArgumentTypeError("No week ranges given")
+    return ranges
+
+
+class ProgressPrinter:
+    # Job events as text on stderr, or as one JSON object per line on stdout
+    def __init__(self, json_output, stream):
+        self.json_output = json_output
+        self.stream = stream
+        self.last_message = None
+
+    def write(self, event, **fields):
+        if self.json_output:
+            self.stream.write(json.dumps(dict(event=event, **fields), default=str) + "\n")
+            self.stream.flush()
+            return
+        if event == 'progress':
+            if fields['message'] == self.last_message:
+                return
+            self.last_message = fields['message']
+            line = f"[{fields['percent']:3d}%] {fields['message']}"
+        elif event == 'result':
+            line = "\n".join(fields['summary'])
+        else:
+            line = f"{event}: {fields.get('message', '')}"
+        print(line, file=sys.stderr, flush=True)
+
+
+def run_job(job_name, job_kwargs, printer):
+    # Runs the job through the same entry point as the job processes of the
+    # window, on a thread so Ctrl+C can cancel it cleanly
+    events = queue.Queue()
+    cancel_event = threading.Event()
+    thread = threading.Thread(target=run_job_in_child, name=job_name,
+                              args=(job_name, job_kwargs, events, queue.Queue(), cancel_event))
+    partial_outputs = set()
+    # Debug prints of the engine must not end up in the JSON stream
+    with contextlib.redirect_stdout(sys.stderr):
+        thread.start()
+        while True:
+            try:
+                kind, payload = events.get(timeout=JOIN_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            except KeyboardInterrupt:
+                printer.write('cancelling', message="Cancelling, waiting for the job to stop...")
+                cancel_event.set()
+                continue
+            if kind == 'progress':
+                printer.write('progress', percent=payload[0], message=payload[1])
+            elif kind == 'error':
+                printer.write('warning', message=payload)
+            elif kind == 'writing':
+                partial_outputs.add(payload)
+            elif kind == 'committed':
+                partial_outputs.discard(payload)
+            elif kind == 'trace':
+                printer.write('trace', message=payload, path=payload)
+            elif kind in ('result', 'cancelled', 'failed'):
+                thread.join()
+                for path in partial_outputs:
+                    if os.path.exists(path):
+                        os.remove(path)
+                return kind, payload
+
+
+def build_generate_job(inputs, plan_type=None, planning_week=None, output_dir=None, output_name=None):
+    # Job kwargs for run_job_in_child; ValueError describes bad arguments
+    files = expand_inputs(inputs)
+    if not files:
+        raise ValueError("No input files matched")
+    if output_name and (os.path.basename(output_name.replace('\\', '/')) != output_name
+                        or not output_name.lower().endswith('.xlsx')):
+        raise ValueError(f"The output name must be a bare .xlsx file name, not {output_name}")
+    first_file_name = os.path.basename(files[0])
+    planning_week = planning_week or extract_planning_week(first_file_name)
+    file_name = output_name or summary_file_name(first_file_name, plan_type, planning_week)
+    output_dir = output_dir or os.path.dirname(files[0])
+    os.makedirs(output_dir, exist_ok=True)
+    return {'files': files, 'suggested_filename': file_name, 'save_file_path': os.path.join(output_dir, file_name)}
+
+
+def build_combine_job(inputs, plan_type=None, planning_week=None, output_dir=None, weeks=None):
+    files = expand_inputs(inputs)
+    if plan_type:
+        # Lets one glob cover a folder that holds several plan types
+        files = [path for path in files if extract_plan_type(os.path.basename(path)) == plan_type]
+    if not files:
+        raise ValueError("No input files matched")
+    if planning_week is None:
+        found = {extract_planning_week(os.path.basename(path)) for path in files}
+        if len(found) != 1 or None in found:
+            raise ValueError("Could not tell the planning week from the file names "
+                             f"(found {sorted(found, key=str)}); pass the planning week")
+        planning_week = found.pop()
+    output_dir = output_dir or os.path.dirname(files[0])
+    os.makedirs(output_dir, exist_ok=True)
+    return {'file_paths': files, 'combinations': make_combinations(planning_week, weeks),
+            'planning_week': planning_week, 'save_directory': output_dir}
+
+
+def summarize_result(job_name, result):
+    # The JSON-friendly part of a job result: output paths and counts, no frames
+    if job_name == 'generate':
+        summary = {
+            'summary': [f"Saved {result['output_file']} ({len(result['pivot_table'])} rows)"]
+                       + [f"Warning: {warning}" for warning in result['warnings']],
+            'output_files': [result['output_file']],
+            'rows': len(result['pivot_table']),
+            'warnings': result['warnings'],
+            'history_run_id': result.get('history_run_id'),
+        }
+    else:
+        summary = {
+            'summary': [f"Created {name}" for name in result['combination_names']],
+            'output_files': [os.path.join(result['save_directory'], f"{title}.xlsx") for title in result['row_counts']],
+            'save_directory': result['save_directory'],
+            'row_counts': result['row_counts'],
+            'cached': result['cached_titles'],
+            'resumed': result['resumed_titles'],
+        }
+    summary['summary'] += result.get('memory_summary', [])
+    summary['memory_stats_file'] = result.get('memory_stats_file')
+    return summary
+
+
+def run_command(job_name, build_job, printer):
+    try:
+        job_kwargs = build_job()
+    except ValueError as e:
+        printer.write('failed', message=str(e))
+        return EXIT_FAILED
+    kind, payload = run_job(job_name, job_kwargs, printer)
+    if kind != 'result':
+        return finish(kind, payload, printer)
+    printer.write('result', **summarize_result(job_name, payload))
+    return 0
+
+
+def generate_command(args, printer):
+    return run_command('generate', lambda: build_generate_job(
+        args.inputs, args.plan_type, args.planning_week, args.output_dir, args.output_name), printer)
+
+
+def combine_command(args, printer):
+    return run_command('combine', lambda: build_combine_job(
+        args.inputs, args.plan_type, args.planning_week, args.output_dir, args.weeks), printer)
+
+
+def finish(kind, payload, printer):
+    if kind == 'cancelled':
+        printer.write('cancelled', message="Cancelled")
+        return EXIT_CANCELLED
+    printer.write('failed', message=payload)
+    return EXIT_FAILED
+
+
+def serve_command(args, printer):
+    from .service import serve
+    cache_bytes = int(args.cache_mb * 1024 * 1024) if args.cache_mb is not None else None
+    return serve(args.host, args.port, args.workers, cache_bytes)
+
+
+def watch_command(args, printer):
+    from .watcher import watch_command
+    return watch_command(args, printer)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='otr_supportinator',
+                                     description="Run without arguments to open the window.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help="Build a summary file from forecast workbooks")
+    generate.add_argument('inputs', nargs='+', help="Forecast files or glob patterns")
+    generate.add_argument('--plan-type', help=f"One of {', '.join(PLAN_TYPES)} or any label; "
+                                              "taken from the first file name by default")
+    generate.add_argument('--planning-week', type=int, help="Taken from the first file name by default")
+    generate.add_argument('--output-dir', help="Defaults to the folder of the first input")
+    generate.add_argument('--output-name', help="Overrides the usual summary_file_plwk... name")
+    generate.set_defaults(handler=generate_command)
+
+    combine = subparsers.add_parser('combine', help="Combine summary files by planning horizon")
+    combine.add_argument('inputs', nargs='+', help="Summary files or glob patterns")
+    combine.add_argument('--plan-type', help="Only combine inputs whose name ends in _<plan type>")
+    combine.add_argument('--planning-week', type=int, help="Taken from the file names by default")
+    combine.add_argument('--weeks', type=parse_week_ranges,
+                         help="Planning horizon ranges, e.g. 2-2,3-5,6-7,8-10,2-10 (the default)")
+    combine.add_argument('--output-dir', help="Defaults to the folder of the first input")
+    combine.set_defaults(handler=combine_command)
+
+    from .service import DEFAULT_PORT, DEFAULT_WORKERS
+    serve = subparsers.add_parser('serve', help="Accept generate and combine jobs over HTTP on localhost")
+    serve.add_argument('--host', default='127.0.0.1', help="127.0.0.1, localhost or ::1")
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Jobs run at the same time")
+    serve.add_argument('--cache-mb', type=float, help="Parsed inputs kept per worker (default 512, "
+                                                      "or OTR_INPUT_CACHE_MB)")
+    serve.set_defaults(handler=serve_command, json=False)
+
+    from .watcher import DEFAULT_INCLUDE, DEFAULT_STABLE_SECONDS, DEFAULT_POLL_SECONDS
+    watch = subparsers.add_parser('watch', help="Generate summary files as forecasts land in a folder")
+    watch.add_argument('folder', help="Drop folder to watch")
+    watch.add_argument('--output-dir', help="Defaults to the watched folder")
+    watch.add_argument('--include', default=DEFAULT_INCLUDE, help="Forecast file name patterns, comma separated")
+    watch.add_argument('--plan-type', help="Only generate for this plan type")
+    watch.add_argument('--stable-seconds', type=float, default=DEFAULT_STABLE_SECONDS,
+                       help="How long files must stay unchanged before a run")
+    watch.add_argument('--poll-seconds', type=float, default=DEFAULT_POLL_SECONDS,
+                       help="Scan interval when watchdog is not installed")
+    watch.set_defaults(handler=watch_command)
+
+    for subparser in (generate, combine, watch):
+        subparser.add_argument('--json', action='store_true',
+                               help="Write progress and the result as JSON lines on stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    printer = ProgressPrinter(args.json, sys.stdout)
+    return args.handler(args, printer)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
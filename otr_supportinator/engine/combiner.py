@@ -0,0 +1,337 @@
+import os
+import shutil
+import tempfile
+import pandas as pd
+from openpyxl import load_workbook, Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from ..utils.memory_governor import get_memory_governor
+from ..utils.fingerprint import file_fingerprint, file_content_hash
+from ..utils.input_readers import read_summary_input, estimate_in_memory_size, get_extension
+from ..utils.output_cache import OutputCache, combination_cache_key
+from ..utils.run_manifest import RunManifest, remove_stale_partials
+from ..utils.publisher import OutputPublisher
+from ..utils.tracing import span
+from ..utils.memory_stats import record_frame
+from .job_context import JobContext
+from .progress import ProgressTracker
+from .input_cache import cached_input
+
+RESERVE_TIMEOUT = 30  # Seconds to back off before spilling to disk instead
+MAX_CHUNK_ROWS = 50000  # Upper bound so cancellation is checked regularly while writing
+
+
+class SummaryFileCombiner:
+    def __init__(self, file_paths, combinations, planning_week, save_directory, context=None,
+                 fingerprints=None, local_paths=None):
+        self.file_paths = file_paths
+        # Staged local copies to read instead of the files on the share; the
+        # original paths still identify the inputs in the manifest
+        self.local_paths = local_paths or {}
+        self.combinations = combinations
+        self.planning_week = planning_week
+        self.save_directory = save_directory
+        self.context = context or JobContext()
+        self.combination_row_counts = {}
+        self.header_format = None
+        self.data_parts = []
+        self.columns = []
+        self.reservations = []
+        self.spill_dir = None
+        self.governor = get_memory_governor()
+        self.manifest = None
+        self.resumed_titles = []
+        self.cached_titles = []
+        self.fingerprints = dict(fingerprints or {})
+        self.content_hashes = None
+        self.output_cache = None
+        self.build_dir = None
+        self.publisher = None
+        # Stages are weighted by input bytes; writing and publishing shrink to
+        # the share of combinations that still have to be built
+        self.input_bytes = sum(os.path.getsize(self.read_path(path)) for path in file_paths)
+        self.progress = ProgressTracker(self.context, 'combine', [
+            ('prepare', self.input_bytes), ('read', self.input_bytes),
+            ('write', self.input_bytes), ('publish', self.input_bytes)])
+        self.combinations_built = 0
+        self.pending_count = 1
+
+    def run(self):
+        try:
+            self.progress.stage('prepare', "Fingerprinting input files...")
+            with span('fingerprint', files=len(self.file_paths)):
+                for path in self.file_paths:
+                    if path not in self.fingerprints:
+                        self.fingerprints[path] = file_fingerprint(self.read_path(path))
+
+            self.progress.advance(0.7, "Checking for an interrupted run...")
+            self.load_manifest()
+
+            self.progress.advance(0.8, "Checking the output cache...")
+            self.restore_cached_outputs()
+            pending_share = len(self.get_pending_combinations()) / max(len(self.combinations), 1)
+            self.progress.resize('write', self.input_bytes * pending_share)
+            self.progress.resize('publish', self.input_bytes * pending_share)
+
+            self.progress.advance(0.9, "Extracting header format...")
+            self.extract_header_format()
+
+            if self.get_pending_combinations():
+                self.progress.stage('read', "Reading input files...")
+                self.read_and_process_input_files()
+
+            self.progress.stage('write', "Processing combinations...")
+            self.start_publisher()
+            self.process_combinations()
+
+            self.progress.stage('publish', "Publishing outputs...")
+            with span('publish wait'):
+                self.finish_published(self.publisher.collect(wait_for_all=True))
+            self.manifest.clear()
+
+            self.progress.finish("Process completed.")
+            return {
+                'combination_names': self.get_combination_names(),
+                'save_directory': self.save_directory,
+                'row_counts': dict(self.combination_row_counts),
+                'cached_titles': list(self.cached_titles),
+                'resumed_titles': list(self.resumed_titles),
+            }
+        finally:
+            self.release_memory()
+            self.stop_publisher()
+
+    def read_path(self, file_path):
+        return self.local_paths.get(file_path, file_path)
+
+    def start_publisher(self):
+        # Outputs are built on local disk and copied to the share in the
+        # background while the next combination is being built
+        self.build_dir = tempfile.mkdtemp(prefix="otr_combiner_build_")
+        self.publisher = OutputPublisher(self.save_directory,
+                                         check_cancelled=self.context.check_cancelled,
+                                         on_writing=self.context.writing,
+                                         on_committed=self.context.committed)
+
+    def stop_publisher(self):
+        if self.publisher is not None:
+            self.publisher.shutdown()
+            self.publisher = None
+        if self.build_dir is not None:
+            shutil.rmtree(self.build_dir, ignore_errors=True)
+            self.build_dir = None
+
+    def finish_published(self, published):
+        # Only outputs visible in the target count as done for a resumed run
+        for (combination, row_count), local_file, output_file in published:
+            self.combination_row_counts[combination['title']] = row_count
+            self.manifest.mark_completed(combination, output_file, row_count)
+            os.remove(local_file)
+
+    def load_manifest(self):
+        remove_stale_partials(self.save_directory, [combination['title'] for combination in self.combinations])
+        self.manifest = RunManifest(self.save_directory, self.file_paths, self.planning_week, self.fingerprints)
+        if self.manifest.load():
+            for combination in self.combinations:
+                if self.manifest.is_completed(combination):
+                    title = combination['title']
+                    self.combination_row_counts[title] = self.manifest.completed[title]['rows']
+                    self.resumed_titles.append(title)
+            print(f"Resuming interrupted run, {len(self.resumed_titles)} combination(s) already done")
+
+    def get_cache_key(self, combination):
+        # A cached output is reused across runs, so it is keyed on the whole
+        # content of the inputs rather than the sampled fingerprints
+        if self.content_hashes is None:
+            with span('content_hash', files=len(self.file_paths)):
+                self.content_hashes = [file_content_hash(self.read_path(path)) for path in self.file_paths]
+        return combination_cache_key(self.content_hashes,
+                                     self.planning_week, combination['start_week'], combination['end_week'])
+
+    def restore_cached_outputs(self):
+        try:
+            self.output_cache = OutputCache()
+        except OSError as e:
+            print(f"Output cache unavailable: {e}")
+            return
+
+        for combination in self.get_pending_combinations():
+            output_file = os.path.join(self.save_directory, f"{combination['title']}.xlsx")
+            meta = self.output_cache.materialize(self.get_cache_key(combination), output_file)
+            if meta is not None:
+                self.combination_row_counts[combination['title']] = meta['rows']
+                self.cached_titles.append(combination['title'])
+                self.manifest.mark_completed(combination, output_file, meta['rows'])
+
+    def get_pending_combinations(self):
+        return [combination for combination in self.combinations
+                if combination['title'] not in self.resumed_titles
+                and combination['title'] not in self.cached_titles]
+
+    def extract_header_format(self):
+        # Only xlsx inputs carry header styling; other formats use the defaults
+        if get_extension(self.file_paths[0]) != '.xlsx':
+            self.header_format = []
+            return
+        wb = load_workbook(self.read_path(self.file_paths[0]), read_only=True)
+        ws = wb.active
+        self.header_format = [cell.font for cell in next(ws.rows)]
+        wb.close()
+
+    def read_and_process_input_files(self):
+        # Input files are kept as separate parts instead of one concatenated
+        # frame; parts that do not fit in the memory budget are spilled to disk
+        self.data_parts = []
+        self.columns = []
+        total_files = len(self.file_paths)
+        bytes_done = 0
+        
+        for i, file_path in enumerate(self.file_paths, 1):
+            self.context.check_cancelled()
+            estimate = estimate_in_memory_size(self.read_path(file_path))
+            reservation = self.governor.reserve(estimate, owner="combiner", timeout=RESERVE_TIMEOUT)
+
+            with span('file', file=os.path.basename(file_path),
+                      bytes=os.path.getsize(self.read_path(file_path))) as file_span:
+                df = cached_input('summary', self.read_path(file_path), lambda: read_summary_input(
+                    self.read_path(file_path), cancel_token=self.context.cancel_token))
+                df['planning_horizon'] = (df['amazon_week'] - self.planning_week) % 52
+                file_span.set(rows=len(df))
+                record_frame(f"read {os.path.basename(file_path)}", df)
+            self.context.rows_processed(len(df))
+            bytes_done += os.path.getsize(self.read_path(file_path))
+            for column in df.columns:
+                if column not in self.columns and column != 'planning_horizon':
+                    self.columns.append(column)
+
+            footprint = df.memory_usage(deep=True).sum()
+            if reservation is None:
+                reservation = self.governor.try_reserve(footprint, owner="combiner")
+            else:
+                reservation.resize(footprint)
+
+            if reservation is None:
+                self.data_parts.append(self.spill_to_disk(df, i))
+            else:
+                self.reservations.append(reservation)
+                self.data_parts.append(df)
+            del df
+            self.progress.advance(bytes_done / max(self.input_bytes, 1), f"Reading input file {i}/{total_files}...")
+
+    def spill_to_disk(self, df, index):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="otr_combiner_spill_")
+        spill_path = os.path.join(self.spill_dir, f"part_{index}.pkl")
+        df.to_pickle(spill_path)
+        print(f"Memory budget exhausted, spilled input {index} to {spill_path}")
+        return spill_path
+
+    def iter_data_parts(self):
+        for part in self.data_parts:
+            if isinstance(part, str):
+                yield pd.read_pickle(part)
+            else:
+                yield part
+
+    def release_memory(self):
+        for reservation in self.reservations:
+            reservation.release()
+        self.reservations = []
+        self.data_parts = []
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+
+    def process_combinations(self):
+        total_combinations = len(self.combinations)
+        self.pending_count = max(len(self.get_pending_combinations()), 1)
+        self.combinations_built = 0
+        for i, combination in enumerate(self.combinations, 1):
+            if combination['title'] in self.resumed_titles or combination['title'] in self.cached_titles:
+                self.progress.advance(self.combinations_built / self.pending_count,
+                                      f"Skipping completed combination {i}/{total_combinations}...")
+                continue
+            self.progress.advance(self.combinations_built / self.pending_count,
+                                  f"Processing combination {i}/{total_combinations}...")
+            
+            with span('combination', title=combination['title']) as combination_span:
+                row_count = self.build_combination(combination)
+                combination_span.set(rows=row_count)
+            self.combinations_built += 1
+
+    def build_combination(self, combination):
+        output_file = os.path.join(self.build_dir, f"{combination['title']}.xlsx")
+        weeks_for_combination = set(range(combination['start_week'], combination['end_week'] + 1))
+        
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+
+        header = []
+        for idx, column_name in enumerate(self.columns):
+            cell = WriteOnlyCell(ws, value=column_name)
+            if idx < len(self.header_format):
+                cell.font = Font(
+                    name=self.header_format[idx].name,
+                    size=self.header_format[idx].size,
+                    bold=self.header_format[idx].bold,
+                    italic=self.header_format[idx].italic,
+                )
+            header.append(cell)
+
+        ws.append(header)
+
+        row_count = 0
+        for part_number, part in enumerate(self.iter_data_parts(), 1):
+            self.context.check_cancelled()
+            filtered_df = part[part['planning_horizon'].isin(weeks_for_combination)]
+            filtered_df = filtered_df.reindex(columns=self.columns)
+            if filtered_df.empty:
+                continue
+
+            # Only one chunk at a time is converted to Python rows, sized
+            # from what is left in the shared memory budget
+            sample_data = filtered_df.head(1000)
+            bytes_per_row = sample_data.memory_usage(deep=True).sum() / len(sample_data)
+            chunk_size = min(self.governor.chunk_rows(bytes_per_row), MAX_CHUNK_ROWS)
+
+            for start_row in range(0, len(filtered_df), chunk_size):
+                self.context.check_cancelled()
+                chunk = filtered_df.iloc[start_row:start_row + chunk_size]
+                for row in chunk.values.tolist():
+                    ws.append(row)
+                self.context.rows_processed(len(chunk))
+            row_count += len(filtered_df)
+            self.progress.advance((self.combinations_built + part_number / (len(self.data_parts) + 1))
+                                  / self.pending_count)
+
+        self.context.check_cancelled()
+        with span('write', file=os.path.basename(output_file), rows=row_count) as write_span:
+            wb.save(output_file)
+            write_span.set(bytes=os.path.getsize(output_file))
+        if self.output_cache is not None:
+            self.output_cache.store(self.get_cache_key(combination), output_file, row_count)
+
+        self.publisher.publish(output_file, (combination, row_count))
+        self.finish_published(self.publisher.collect())
+        return row_count
+
+    def get_combination_names(self):
+        names = []
+        for combination in self.combinations:
+            title = combination['title']
+            if title not in self.combination_row_counts:
+                continue
+            name = f"{title}.xlsx with {self.combination_row_counts[title]} rows"
+            if title in self.resumed_titles:
+                name += " (resumed from previous run)"
+            elif title in self.cached_titles:
+                name += " (from cache)"
+            names.append(name)
+        return names
+
+
+def combine_summary_files(file_paths, combinations, planning_week, save_directory, context=None,
+                          fingerprints=None, local_paths=None):
+    combiner = SummaryFileCombiner(file_paths, combinations, planning_week, save_directory,
+                                   context, fingerprints, local_paths)
+    return combiner.run()
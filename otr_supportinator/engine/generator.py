@@ -0,0 +1,309 @@
+import os
+from datetime import datetime
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Border, Side, Alignment
+from ..utils.file_utils import process_file
+from ..utils.date_utils import get_amazon_week
+from ..utils.memory_governor import get_memory_governor
+from ..utils.run_manifest import partial_path, commit_partial, remove_partial
+from ..utils.input_readers import OPENPYXL_MEMORY_FACTOR
+from ..utils.tracing import span
+from ..utils.memory_stats import record_frame
+from ..utils.history_store import start_history_append
+from .job_context import JobContext, JobCancelled
+from .progress import ProgressTracker
+from .input_cache import cached_input
+from .naming import extract_plan_type, extract_planning_week, DEFAULT_PLAN_TYPE
+
+PIVOT_MEMORY_FACTOR = 3  # Pivot working set relative to the combined long-format frame
+RESERVE_TIMEOUT = 60  # Seconds to back off before continuing without a reservation
+WRITE_CHUNK_ROWS = 5000  # Rows written between cancellation checks
+
+# Same header look as DataFrame.to_excel
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'),
+                       top=Side(style='thin'), bottom=Side(style='thin'))
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+
+class SummaryFileGenerator:
+    def __init__(self, files, context=None, local_paths=None):
+        self.files = files
+        # Staged local copies to read instead of the files on the share
+        self.local_paths = local_paths or {}
+        self.context = context or JobContext()
+        self.warnings = []
+        self.governor = get_memory_governor()
+        self.reservations = []
+        # Every stage is weighted by the input size; reading advances by
+        # rows within each file and saving by rows written
+        self.input_bytes = sum(os.path.getsize(self.local_paths.get(file_path, file_path))
+                               for file_path in files if file_path is not None)
+        self.progress = ProgressTracker(self.context, 'generate', [
+            ('read', self.input_bytes), ('pivot', self.input_bytes), ('save', self.input_bytes)])
+
+    def reserve_memory(self, nbytes):
+        # Waits for other jobs to release budget before a heavy stage
+        reservation = self.governor.reserve(nbytes, owner="generator", timeout=RESERVE_TIMEOUT)
+        if reservation is None:
+            print(f"Memory budget exhausted, continuing without a reservation of {nbytes} bytes")
+        else:
+            self.reservations.append(reservation)
+        return reservation
+
+    def release_memory(self):
+        for reservation in self.reservations:
+            reservation.release()
+        self.reservations = []
+
+    def process_files(self):
+        try:
+            return self._process_files()
+        finally:
+            self.release_memory()
+
+    def _process_files(self):
+        results = []
+        total_files = len(self.files)
+        bytes_done = 0
+        self.progress.stage('read', f"Processing file 1 of {total_files}")
+
+        for i, file_path in enumerate(self.files, 1):
+            self.progress.advance(bytes_done / max(self.input_bytes, 1), f"Processing file {i} of {total_files}")
+            
+            if file_path is None:
+                continue
+            
+            read_path = self.local_paths.get(file_path, file_path)
+            file_bytes = os.path.getsize(read_path)
+            reservation = self.reserve_memory(file_bytes * OPENPYXL_MEMORY_FACTOR)
+            try:
+                with span('file', file=os.path.basename(file_path), bytes=file_bytes) as file_span:
+                    result = cached_input('forecast', read_path, lambda: process_file(
+                        read_path, self.context.cancel_token,
+                        lambda fraction, done=bytes_done, size=file_bytes: self.progress.advance(
+                            (done + size * fraction) / max(self.input_bytes, 1))))
+                    file_span.set(rows=len(result) if result is not None else 0)
+                bytes_done += file_bytes
+                if result is not None:
+                    self.context.rows_processed(len(result))
+                    results.append(result)
+                    if reservation is not None:
+                        reservation.resize(result.memory_usage(deep=True).sum())
+                elif reservation is not None:
+                    reservation.release()
+            except JobCancelled:
+                raise
+            except Exception as e:
+                if reservation is not None:
+                    reservation.release()
+                self.context.error(f"Error processing file {file_path}: {str(e)}")
+
+        if not results:
+            raise ValueError("No valid data found in any of the input files.")
+
+        self.progress.stage('pivot', "Combining results...")
+        combined_size = sum(result.memory_usage(deep=True).sum() for result in results)
+        self.reserve_memory(combined_size * PIVOT_MEMORY_FACTOR)
+        with span('concat', parts=len(results)) as concat_span:
+            combined_df = pd.concat(results, ignore_index=True)
+            concat_span.set(rows=len(combined_df))
+            record_frame("concat", combined_df)
+        del results
+
+        self.progress.advance(0.1, "Creating pivot table...")
+
+        try:
+            with span('pivot', rows=len(combined_df)) as pivot_span:
+                # Pivot the combined dataframe
+                pivot_table = pd.pivot_table(combined_df,
+                                            values='value',
+                                            index=['region', 'node', 'cycle', 'forecast_period_start'],
+                                            columns=['metric', 'sub_metric'],
+                                            aggfunc='first',
+                                            fill_value=None)
+
+                # Reset the index to make 'region', 'node', etc. regular columns
+                pivot_table = pivot_table.reset_index()
+
+                # Flatten the multi-level column names
+                pivot_table.columns = [' '.join(col).strip() if isinstance(col, tuple) else col for col in pivot_table.columns]
+                pivot_span.set(output_rows=len(pivot_table), columns=len(pivot_table.columns))
+                record_frame("pivot", pivot_table)
+
+            with span('amazon_week', rows=len(pivot_table)):
+                # Convert 'forecast_period_start' to datetime
+                pivot_table['forecast_period_start'] = pd.to_datetime(pivot_table['forecast_period_start'])
+
+                # Calculate and insert 'amazon_week'
+                pivot_table['forecast_period_start'] = pd.to_datetime(pivot_table['forecast_period_start'])
+                pivot_table.insert(1, 'amazon_week', pivot_table['forecast_period_start'].apply(get_amazon_week))
+
+            with span('CVP', rows=len(pivot_table)):
+                # Calculate CVP
+                if '1 - FO volume' in pivot_table.columns and '2 - otr_capa calculated_total' in pivot_table.columns:
+                    pivot_table.insert(5, 'CVP', pivot_table[['1 - FO volume', '2 - otr_capa calculated_total']].min(axis=1))
+                else:
+                    pivot_table.insert(5, 'CVP', None)
+                    self.warnings.append("Warning: Unable to calculate CVP due to missing columns.")
+
+            # Add generated_at column
+            pivot_table.insert(6, 'generated_at', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+            # Convert forecast_period_start back to string
+            pivot_table['forecast_period_start'] = pivot_table['forecast_period_start'].dt.strftime('%Y-%m-%d')
+
+            # List of expected columns (based on the original output)
+            expected_columns = [
+                'region', 'amazon_week', 'node', 'cycle', 'forecast_period_start', '1 - FO volume',
+                '2 - otr_capa calculated_total', 'CVP', 'generated_at', '2 - otr_capa optimizer_total',
+                '3 - hdp capacity', '4 - amflex alloted_capacity', '4 - amflex bau_avg_capa',
+                '4 - amflex capacity_ask', '4 - amflex commitment_capacity', '4 - amflex max_block',
+                '4 - amflex mde_max_capa', '4 - amflex spr', '4 - amflex vans_alloted',
+                '4 - amflex vans_ask', '4 - amflex vans_committed', '4 - amflex_keicar capacity',
+                '4 - amflex_keicar spr', '4 - amflex_keicar vans', '4.1 - amflex_total capacity',
+                '4.1 - amflex_total spr', '4.1 - amflex_total vans', '5 - dsp2.0_keivan capacity',
+                '5 - dsp2.0_keivan spr', '5 - dsp2.0_keivan vans', '5 - dsp2.0_largevan capacity',
+                '5 - dsp2.0_largevan spr', '5 - dsp2.0_largevan vans', '5 - dsp_1t_walker capacity',
+                '5 - dsp_1t_walker spr', '5 - dsp_1t_walker vans', '5 - dsp_biker capacity',
+                '5 - dsp_biker spr', '5 - dsp_biker vans', '5 - dsp_keivan capacity',
+                '5 - dsp_keivan spr', '5 - dsp_keivan vans', '5 - dsp_keivan vans_rescue',
+                '5 - dsp_keivan_walker capacity', '5 - dsp_keivan_walker spr',
+                '5 - dsp_keivan_walker vans', '5 - dsp_largevan capacity', '5 - dsp_largevan spr',
+                '5 - dsp_largevan vans', '5 - dsp_walker capacity', '5 - dsp_walker spr',
+                '5 - dsp_walker vans', '5.1 - dsp_total capacity', '5.1 - dsp_total spr',
+                '5.1 - dsp_total vans', '6 - excess/shortage capacity'
+                ]
+
+
+            # Check for missing columns
+            missing_columns = [col for col in expected_columns if col not in pivot_table.columns]
+            if missing_columns:
+                self.warnings.append(f"Warning: The following expected columns are missing: {missing_columns}")
+                self.warnings.append("This may indicate issues with the input data or data processing.")
+
+            # Add missing columns with None values
+            for col in missing_columns:
+                pivot_table[col] = None
+
+            # Reorder columns
+            pivot_table = pivot_table[expected_columns]
+            record_frame("column reorder", pivot_table)
+
+            # Calculate total van ask
+            if '4 - amflex vans_ask' in pivot_table.columns:
+                total_van_ask = pivot_table['4 - amflex vans_ask'].sum()
+                self.progress.advance(0.9, f"Total Van ask (all weeks): {round(int(total_van_ask),0)}")
+            else:
+                self.warnings.append("Warning: Unable to calculate total van ask. '4 - amflex vans_ask' column is missing.")
+
+            with span('summaries', rows=len(pivot_table)):
+                # Create summaries
+                if '4 - amflex vans_ask' in pivot_table.columns:
+                    weekly_summary = pivot_table.groupby('amazon_week')['4 - amflex vans_ask'].sum().reset_index()
+                    weekly_summary['4 - amflex vans_ask'] = weekly_summary['4 - amflex vans_ask'].astype(int)
+
+                    region_weekly_summary = pivot_table.groupby(['amazon_week', 'region'])['4 - amflex vans_ask'].sum().reset_index()
+                    region_weekly_summary['4 - amflex vans_ask'] = region_weekly_summary['4 - amflex vans_ask'].astype(int)
+                else:
+                    weekly_summary = pd.DataFrame(columns=['amazon_week', '4 - amflex vans_ask'])
+                    region_weekly_summary = pd.DataFrame(columns=['amazon_week', 'region', '4 - amflex vans_ask'])
+                    self.warnings.append("Warning: Unable to create summaries. '4 - amflex vans_ask' column is missing.")
+
+            self.progress.advance(1.0, "Pivot table and summaries created")
+
+            return pivot_table, weekly_summary, region_weekly_summary
+
+        except JobCancelled:
+            raise
+        except Exception as e:
+            self.context.error(f"Error creating pivot table: {str(e)}")
+            raise
+
+    def save(self, pivot_table, file_path):
+        # Written in chunks under a temporary name so a cancelled or failed
+        # save never leaves a truncated file behind
+        temp_path = partial_path(file_path)
+        self.context.writing(temp_path)
+        with span('write', file=os.path.basename(file_path), rows=len(pivot_table)) as write_span:
+            try:
+                wb = Workbook(write_only=True)
+                ws = wb.create_sheet(title='Sheet1')
+
+                header = []
+                for column_name in pivot_table.columns:
+                    cell = WriteOnlyCell(ws, value=column_name)
+                    cell.font = HEADER_FONT
+                    cell.border = HEADER_BORDER
+                    cell.alignment = HEADER_ALIGNMENT
+                    header.append(cell)
+                ws.append(header)
+
+                for start_row in range(0, len(pivot_table), WRITE_CHUNK_ROWS):
+                    self.context.check_cancelled()
+                    chunk = pivot_table.iloc[start_row:start_row + WRITE_CHUNK_ROWS].astype(object)
+                    for row in chunk.where(chunk.notna(), None).values.tolist():
+                        ws.append(row)
+                    self.context.rows_processed(len(chunk))
+                    self.progress.advance((start_row + len(chunk)) / max(len(pivot_table), 1))
+
+                self.context.check_cancelled()
+                wb.save(temp_path)
+                commit_partial(file_path)
+            except BaseException:
+                remove_partial(file_path)
+                raise
+            write_span.set(bytes=os.path.getsize(file_path))
+        self.context.committed(temp_path)
+
+
+def generate_summary_file(files, suggested_filename, context=None, save_file_path=None, local_paths=None):
+    # Without a save path, the user is asked once the pivot is ready
+    context = context or JobContext()
+    generator = SummaryFileGenerator(files, context, local_paths)
+
+    context.progress(0, "Starting file processing...")
+    pivot_table, weekly_summary, region_weekly_summary = generator.process_files()
+
+    if save_file_path is None:
+        generator.progress.stage('save', "Waiting for a save location...")
+        # Time spent in the dialog is not counted toward the ETA or throughput
+        generator.progress.pause()
+        with span('save dialog wait'):
+            save_file_path = context.request('save_file', suggested_filename, os.path.dirname(files[0]))
+        generator.progress.resume()
+        if not save_file_path:
+            raise ValueError("File save cancelled.")
+
+    # The pivot's history files are written while the workbook is saved; the
+    # run is only recorded once the save succeeded
+    file_name = os.path.basename(save_file_path)
+    history = start_history_append(
+        pivot_table, extract_planning_week(file_name), extract_plan_type(file_name) or DEFAULT_PLAN_TYPE,
+        [(file_path, generator.local_paths.get(file_path, file_path)) for file_path in files if file_path is not None])
+
+    generator.progress.stage('save', "Saving summary file...")
+    try:
+        generator.save(pivot_table, save_file_path)
+    except BaseException:
+        if history is not None:
+            history.discard()
+        raise
+    history_run_id = None
+    if history is not None:
+        with span('history wait'):
+            history_run_id = history.commit(save_file_path)
+        if history.error:
+            context.error(f"Could not add the run to the history store: {history.error}")
+    generator.progress.finish("File saved successfully.")
+
+    return {
+        'pivot_table': pivot_table,
+        'weekly_summary': weekly_summary,
+        'region_weekly_summary': region_weekly_summary,
+        'output_file': save_file_path,
+        'warnings': generator.warnings,
+        'history_run_id': history_run_id,
+    }
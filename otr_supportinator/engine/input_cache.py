@@ -0,0 +1,90 @@
+import os
+import threading
+from collections import OrderedDict
+from ..utils.fingerprint import file_fingerprint
+
+# Parsed input frames kept between jobs by long-lived job processes, such as
+# the service workers. Off unless enable_input_cache() was called, since a
+# job process of the window only ever runs one job.
+CACHE_SIZE_ENV_VAR = 'OTR_INPUT_CACHE_MB'
+DEFAULT_CACHE_MB = 512
+
+_cache = None
+
+
+class InputCache:
+    # Least recently used frames are dropped once the byte budget is reached
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        # A shallow copy, so columns a job adds do not end up in the cache
+        return entry[0].copy(deep=False)
+
+    def put(self, key, df):
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (df, nbytes)
+            self.total_bytes += nbytes
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.total_bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+def cache_size_from_env():
+    try:
+        return int(float(os.environ.get(CACHE_SIZE_ENV_VAR, DEFAULT_CACHE_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_CACHE_MB * 1024 * 1024
+
+
+def enable_input_cache(max_bytes=None):
+    global _cache
+    _cache = InputCache(cache_size_from_env() if max_bytes is None else max_bytes)
+    return _cache
+
+
+def get_input_cache():
+    return _cache
+
+
+def cached_input(kind, file_path, read):
+    # Returns read() for file_path, or the frame parsed by an earlier job if
+    # the file content has not changed. kind separates the readers, as the
+    # same file parses differently as a forecast and as a summary file.
+    cache = _cache
+    if cache is None:
+        return read()
+    # The fingerprint only samples the file; size and mtime catch an edit
+    # between the sampled blocks
+    file_stat = os.stat(file_path)
+    key = (kind, os.path.abspath(file_path), file_stat.st_size, file_stat.st_mtime_ns, file_fingerprint(file_path))
+    df = cache.get(key)
+    if df is not None:
+        return df
+    df = read()
+    if df is None:
+        return None
+    cache.put(key, df)
+    return df.copy(deep=False)
@@ -0,0 +1,66 @@
+import threading
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    # Wraps anything with set()/is_set(), e.g. a multiprocessing.Event shared
+    # with the parent process
+    def __init__(self, event=None):
+        self.event = event if event is not None else threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    def is_cancelled(self):
+        return self.event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.event.is_set():
+            raise JobCancelled("Operation cancelled by user")
+
+
+class JobContext:
+    # Everything a pipeline needs from whoever runs it: progress reporting,
+    # cancellation, tracking of files being written, and questions for the user
+    def __init__(self, progress_callback=None, cancel_token=None, event_callback=None,
+                 request_callback=None):
+        self.progress_callback = progress_callback
+        self.cancel_token = cancel_token or CancelToken()
+        self.event_callback = event_callback
+        self.request_callback = request_callback
+
+    def progress(self, value, message):
+        self.check_cancelled()
+        if self.progress_callback:
+            self.progress_callback(value, message)
+
+    def error(self, message):
+        # Non-fatal error; the job carries on
+        self.emit('error', message)
+
+    def check_cancelled(self):
+        self.cancel_token.raise_if_cancelled()
+
+    def rows_processed(self, count):
+        # Feeds the live rows/s readout; call per file or chunk, not per row
+        self.emit('rows', count)
+
+    def writing(self, path):
+        self.emit('writing', path)
+
+    def committed(self, path):
+        self.emit('committed', path)
+
+    def emit(self, kind, payload):
+        if self.event_callback:
+            self.event_callback(kind, payload)
+        elif kind == 'error':
+            print(payload)
+
+    def request(self, kind, *args):
+        if self.request_callback is None:
+            raise RuntimeError(f"No handler available for request '{kind}'")
+        return self.request_callback(kind, *args)
@@ -0,0 +1,126 @@
+import os
+import queue
+import tempfile
+import traceback
+from datetime import datetime
+from .job_context import CancelToken, JobContext, JobCancelled
+from ..utils.memory_governor import configure_memory_governor
+from ..utils.tracing import start_tracing, stop_tracing, span, TRACE_DIR_ENV_VAR
+from ..utils.memory_stats import start_memory_stats, stop_memory_stats, write_memory_stats
+
+REPLY_POLL_INTERVAL = 0.1
+
+
+def run_generate_job(context, files, suggested_filename, save_file_path=None, local_paths=None):
+    from .generator import generate_summary_file
+    return generate_summary_file(files, suggested_filename, context, save_file_path, local_paths)
+
+
+def run_combine_job(context, file_paths, combinations, planning_week, save_directory, fingerprints=None,
+                    local_paths=None):
+    from .combiner import combine_summary_files
+    return combine_summary_files(file_paths, combinations, planning_week, save_directory,
+                                 context, fingerprints, local_paths)
+
+
+JOBS = {
+    'generate': run_generate_job,
+    'combine': run_combine_job,
+}
+
+
+def memory_stats_path(job_name, result):
+    # Saved next to what the job wrote
+    if result.get('output_file'):
+        return os.path.splitext(result['output_file'])[0] + '.memory.json'
+    if result.get('save_directory'):
+        return os.path.join(result['save_directory'],
+                            f"{job_name}_memory_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    return None
+
+
+def failed_memory_stats_path(job_name, job_kwargs):
+    # A failed job has no result, so the report goes next to where it would
+    # have saved, else into the trace folder or the temp folder
+    path = memory_stats_path(job_name, {'output_file': job_kwargs.get('save_file_path'),
+                                        'save_directory': job_kwargs.get('save_directory')})
+    if path and os.path.isdir(os.path.dirname(path) or '.'):
+        return path
+    directory = os.environ.get(TRACE_DIR_ENV_VAR) or tempfile.gettempdir()
+    return os.path.join(directory, f"{job_name}_memory_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+
+
+def write_failed_memory_stats(job_name, job_kwargs, stats):
+    # Failures such as MemoryError in the pivot are what the report is for;
+    # returns the path of the report, or None
+    for line in stats.summary_lines():
+        print(line)
+    try:
+        path = failed_memory_stats_path(job_name, job_kwargs)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return write_memory_stats(stats, path)
+    except OSError as e:
+        print(f"Could not write memory stats: {e}")
+        return None
+
+
+def attach_memory_stats(job_name, stats, result):
+    result['memory_summary'] = stats.summary_lines()
+    path = memory_stats_path(job_name, result)
+    if path:
+        try:
+            result['memory_stats_file'] = write_memory_stats(stats, path)
+        except OSError as e:
+            print(f"Could not write memory stats: {e}")
+
+
+def run_job_in_child(job_name, job_kwargs, events, replies, cancel_event, memory_budget=None):
+    # Entry point of the job process. Everything goes back to the parent as
+    # (kind, payload) tuples on the events queue.
+    if memory_budget:
+        configure_memory_governor(memory_budget)
+    cancel_token = CancelToken(cancel_event)
+
+    def request(kind, *args):
+        events.put(('request', (kind, args)))
+        while True:
+            cancel_token.raise_if_cancelled()
+            try:
+                return replies.get(timeout=REPLY_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+    context = JobContext(
+        progress_callback=lambda value, message: events.put(('progress', (value, message))),
+        cancel_token=cancel_token,
+        event_callback=lambda kind, payload: events.put((kind, payload)),
+        request_callback=request,
+    )
+
+    tracer = start_tracing(job_name)
+    memory_stats = start_memory_stats(job_name)
+    try:
+        with span('job', job=job_name):
+            result = JOBS[job_name](context, **job_kwargs)
+        if memory_stats is not None:
+            stop_memory_stats()
+            attach_memory_stats(job_name, memory_stats, result)
+        outcome = ('result', result)
+    except JobCancelled:
+        outcome = ('cancelled', None)
+    except Exception as e:
+        traceback.print_exc()
+        message = str(e) or type(e).__name__
+        if memory_stats is not None:
+            stop_memory_stats()
+            path = write_failed_memory_stats(job_name, job_kwargs, memory_stats)
+            if path:
+                message += f" (memory stats: {path})"
+        outcome = ('failed', message)
+    finally:
+        stop_memory_stats()
+
+    # The trace goes out before the outcome, which ends the parent's monitoring
+    if tracer is not None:
+        events.put(('trace', stop_tracing()))
+    events.put(outcome)
@@ -0,0 +1,51 @@
+import re
+from ..utils.date_utils import get_current_amazon_week
+
+# Shared by the tabs and the command line so both name outputs the same way
+PLAN_TYPES = ["ask", "DS Callout", "final", "custom"]
+DEFAULT_PLAN_TYPE = "ask"
+# Planning horizon ranges offered by the combiner, as (start_week, end_week)
+COMBINATION_PRESETS = {
+    "A": (2, 2), "B": (3, 5), "C": (6, 7), "D": (8, 10),
+    "All": (2, 10), "Custom": (1, 10)
+}
+DEFAULT_COMBINATION_RANGES = [COMBINATION_PRESETS[preset] for preset in ("All", "A", "B", "C", "D")]
+
+
+def extract_plan_type(file_name):
+    match = re.search(r'_(ask|DS Callout|final|custom)\.', file_name)
+    return match.group(1) if match else None
+
+
+def extract_planning_week(file_name):
+    # Forecast inputs and summary files both carry plwk<week>
+    match = re.search(r'plwk(\d+)', file_name)
+    return int(match.group(1)) if match else None
+
+
+def extract_forecast_weeks(file_name):
+    # The W-2.3.4 part of a forecast file name, or ''
+    match = re.search(r'W-(\d+(?:\.\d+)*)(?:\D|$)', file_name)
+    return match.group(1) if match else ''
+
+
+def summary_file_name(first_file_name, plan_type=None, planning_week=None):
+    # Plan type and planning week come from the file name unless given
+    if plan_type is None:
+        plan_type = extract_plan_type(first_file_name) or DEFAULT_PLAN_TYPE
+    if planning_week is None:
+        planning_week = extract_planning_week(first_file_name) or get_current_amazon_week()
+    return f"summary_file_plwk{planning_week}_w-{extract_forecast_weeks(first_file_name)}_{plan_type}.xlsx"
+
+
+def combination_title(planning_week, start_week, end_week):
+    weeks = ".".join(str(week) for week in range(start_week, end_week + 1))
+    if planning_week is None:
+        return f"summary_file_plwk[Not Set]_w-{weeks}"
+    return f"summary_file_plwk{planning_week}_w-{weeks}"
+
+
+def make_combinations(planning_week, ranges=None):
+    return [{'start_week': start_week, 'end_week': end_week,
+             'title': combination_title(planning_week, start_week, end_week)}
+            for start_week, end_week in (ranges or DEFAULT_COMBINATION_RANGES)]
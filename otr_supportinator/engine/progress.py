@@ -0,0 +1,186 @@
+import os
+import json
+import time
+
+# Learned throughput per job and stage, in input bytes per second
+HISTORY_ENV_VAR = 'OTR_THROUGHPUT_HISTORY'
+HISTORY_SMOOTHING = 0.3  # Weight of the newest run in the moving average
+# Starting points until a stage has been timed on this machine
+DEFAULT_RATES = {
+    ('generate', 'read'): 400 * 1024,
+    ('generate', 'pivot'): 4 * 1024 * 1024,
+    ('generate', 'save'): 600 * 1024,
+    ('combine', 'read'): 500 * 1024,
+    ('combine', 'write'): 250 * 1024,
+    ('combine', 'publish'): 20 * 1024 * 1024,
+}
+FALLBACK_RATE = 1024 * 1024
+EMIT_INTERVAL = 0.25  # Seconds between progress messages sent to the UI
+MIN_ETA_SECONDS = 2  # No ETA until the run has been going this long
+
+
+def get_history_path():
+    if os.environ.get(HISTORY_ENV_VAR):
+        return os.environ[HISTORY_ENV_VAR]
+    return os.path.join(os.path.expanduser("~"), ".otr_supportinator", "throughput.json")
+
+
+def load_history(path=None):
+    try:
+        with open(path or get_history_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_history(history, path=None):
+    path = path or get_history_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.partial', 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=2, sort_keys=True)
+        os.replace(path + '.partial', path)
+    except OSError as e:
+        print(f"Could not save throughput history: {e}")
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+class Stage:
+    def __init__(self, name, work, rate):
+        self.name = name
+        self.work = max(work, 1)
+        self.rate = rate
+        self.fraction = 0.0
+        self.seconds = 0.0
+
+    def estimate(self):
+        return self.work / self.rate
+
+
+class ProgressTracker:
+    # Turns stage-level progress into an overall percentage and ETA. Stages
+    # are weighted by their expected duration: the input bytes they handle
+    # divided by the throughput learned for that stage on earlier runs.
+    # Messages to the UI are rate limited.
+    def __init__(self, context, job_name, stages, history=None, emit_interval=EMIT_INTERVAL):
+        self.context = context
+        self.job_name = job_name
+        history = load_history() if history is None else history
+        learned = history.get(job_name, {})
+        self.stages = [Stage(name, work, learned.get(name) or DEFAULT_RATES.get((job_name, name), FALLBACK_RATE))
+                       for name, work in stages]
+        self.by_name = {stage.name: stage for stage in self.stages}
+        self.emit_interval = emit_interval
+        self.current = None
+        self.message = ""
+        self.active_seconds = 0.0
+        self.resumed_at = time.monotonic()
+        self.paused = False
+        self.last_emit = 0.0
+
+    def clock(self):
+        # Seconds of active work since the last call; paused time is not counted
+        now = time.monotonic()
+        if self.paused:
+            return 0.0
+        elapsed, self.resumed_at = now - self.resumed_at, now
+        self.active_seconds += elapsed
+        return elapsed
+
+    def charge(self):
+        elapsed = self.clock()
+        if self.current is not None:
+            self.current.seconds += elapsed
+
+    def resize(self, name, work):
+        # For stages whose size is only known part way, e.g. after a cache check
+        self.by_name[name].work = max(work, 1)
+
+    def stage(self, name, message, fraction=0.0):
+        # Moves to a stage; stages in between count as done
+        self.charge()
+        stage = self.by_name[name]
+        if self.current is not None and self.current is not stage:
+            self.current.fraction = 1.0
+        for earlier in self.stages[:self.stages.index(stage)]:
+            earlier.fraction = 1.0
+        self.current = stage
+        stage.fraction = max(stage.fraction, fraction)
+        self.message = message
+        self.emit(force=True)
+
+    def advance(self, fraction, message=None):
+        # fraction of the current stage, e.g. rows or bytes done over total
+        self.charge()
+        if self.current is not None:
+            self.current.fraction = min(max(fraction, self.current.fraction), 1.0)
+        if message is not None:
+            self.message = message
+        self.emit()
+
+    def pause(self):
+        # For waits on the user, which say nothing about throughput
+        self.charge()
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        self.resumed_at = time.monotonic()
+
+    def overall(self):
+        total = sum(stage.estimate() for stage in self.stages)
+        done = sum(stage.estimate() * stage.fraction for stage in self.stages)
+        return done, total
+
+    def eta(self):
+        done, total = self.overall()
+        if done <= 0 or self.active_seconds < MIN_ETA_SECONDS:
+            return None
+        # Trust the observed pace more as more of the run is behind us
+        observed = self.active_seconds / done
+        weight = min(4 * done / total, 1.0)
+        return (total - done) * ((1 - weight) + observed * weight)
+
+    def emit(self, force=False):
+        now = time.monotonic()
+        done, total = self.overall()
+        value = min(int(100 * done / total), 99) if total else 0
+        if not force and now - self.last_emit < self.emit_interval:
+            self.context.check_cancelled()
+            return
+        self.last_emit = now
+        message = self.message
+        eta = self.eta()
+        if eta is not None and eta >= 1:
+            message += f" (about {format_duration(eta)} left)"
+        self.context.progress(value, message)
+
+    def finish(self, message, record=True):
+        self.charge()
+        for stage in self.stages:
+            stage.fraction = 1.0
+        self.context.progress(100, message)
+        if record:
+            self.record()
+
+    def record(self):
+        # Folds this run's per-stage throughput into the history. Stages that
+        # took no measurable time, e.g. fully cached, are left alone.
+        history = load_history()
+        learned = history.setdefault(self.job_name, {})
+        for stage in self.stages:
+            if stage.seconds < 0.05:
+                continue
+            rate = stage.work / stage.seconds
+            previous = learned.get(stage.name)
+            learned[stage.name] = rate if previous is None else (
+                HISTORY_SMOOTHING * rate + (1 - HISTORY_SMOOTHING) * previous)
+        save_history(history)
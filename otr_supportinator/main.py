@@ -1,17 +1,31 @@
 import sys
 import os
-from PyQt6.QtWidgets import QApplication
-from .main_window import MainWindow
+import multiprocessing
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 def main():
+    multiprocessing.freeze_support()  # Job processes in frozen builds
+    # Subcommands run headless; Qt is only imported for the window
+    if len(sys.argv) > 1 and sys.argv[1] in ('generate', 'combine', 'serve', 'watch', '-h', '--help'):
+        from .cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+    run_gui()
+
+def run_gui():
+    from .utils import startup_timing
+    from PyQt6.QtWidgets import QApplication
+    from .main_window import MainWindow
+    startup_timing.mark("Imports")
     print("Starting application...")
     app = QApplication(sys.argv)
     print("Created QApplication")
-    
+    startup_timing.mark("QApplication")
+
     try:
         main_window = MainWindow()
         print("Created MainWindow")
+        startup_timing.mark("MainWindow")
+        startup_timing.report_on_first_paint(main_window)
         main_window.show()
         print("Showed MainWindow")
         sys.exit(app.exec())
@@ -1,10 +1,12 @@
 import os
 import tempfile
-from PyQt6.QtWidgets import QMainWindow, QTabWidget, QVBoxLayout, QWidget, QStatusBar, QMenuBar, QMenu, QMessageBox, QApplication, QSizePolicy
+from PyQt6.QtWidgets import QMainWindow, QTabWidget, QVBoxLayout, QWidget, QStatusBar, QMenuBar, QMenu, QMessageBox, QApplication, QSizePolicy, QDockWidget
 from PyQt6.QtGui import QAction
-from .tabs.summary_file_generator_tab import SummaryFileGeneratorTab
-from .tabs.pop_tab import PopTab
-from .tabs.summary_file_combiner_tab import SummaryFileCombinerTab
+from PyQt6.QtCore import Qt
+from .utils.job_scheduler import JobScheduler
+from .utils.job_queue_panel import JobQueuePanel
+from .utils.staging import configure_staging, get_staging_manager
+from .utils.resource_monitor import ResourceMonitor, ResourceStatusLabel
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -12,6 +14,8 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.temp_dir = tempfile.mkdtemp()
         print("Created temp directory")
+        # Queued inputs are copied here from the share before jobs read them
+        configure_staging(os.path.join(self.temp_dir, 'staging'))
         self.setWindowTitle("OTR Capacity Plan Upload Supportinator")
         self.setGeometry(100, 100, 900, 1000)
         self.setMinimumWidth(900)
@@ -26,53 +30,114 @@ class MainWindow(QMainWindow):
         self.main_layout.addWidget(self.tab_widget)
         print("Added tab widget")
 
-        try:
-            print("Creating SummaryFileGeneratorTab...")
-            self.summary_file_generator_tab = SummaryFileGeneratorTab(self)
-            print("Created SummaryFileGeneratorTab")
-        except Exception as e:
-            print(f"Error creating SummaryFileGeneratorTab: {e}")
-            import traceback
-            traceback.print_exc()
-
-        try:
-            print("Creating PopTab...")
-            self.pop_tab = PopTab(self)
-            print("Created PopTab")
-        except Exception as e:
-            print(f"Error creating PopTab: {e}")
-            import traceback
-            traceback.print_exc()
-
-        try:
-            print("Creating SummaryFileCombinerTab...")
-            self.summary_file_combiner_tab = SummaryFileCombinerTab(self)
-            print("Created SummaryFileCombinerTab")
-        except Exception as e:
-            print(f"Error creating SummaryFileCombinerTab: {e}")
-            import traceback
-            traceback.print_exc()
-
-        self.tab_widget.addTab(self.summary_file_generator_tab, "Summary File Generator")
-        self.tab_widget.addTab(self.pop_tab, "PoP")
-        self.tab_widget.addTab(self.summary_file_combiner_tab, "Summary File Combiner")
+        # Shared by all tabs so generator and combiner jobs queue together
+        self.job_scheduler = JobScheduler(parent=self)
+        self.job_queue_dock = QDockWidget("Jobs", self)
+        self.job_queue_dock.setWidget(JobQueuePanel(self.job_scheduler))
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.job_queue_dock)
+        print("Added job queue panel")
+
+        # Most sessions use one tab, so each is built the first time it is
+        # selected and a bare placeholder holds its place until then
+        self.tab_factories = [
+            ('summary_file_generator_tab', "Summary File Generator", self.create_summary_file_generator_tab),
+            ('pop_tab', "PoP", self.create_pop_tab),
+            ('summary_file_combiner_tab', "Summary File Combiner", self.create_summary_file_combiner_tab),
+            ('history_tab', "History", self.create_history_tab),
+        ]
+        for attribute, title, factory in self.tab_factories:
+            setattr(self, attribute, None)
+            self.tab_widget.addTab(QWidget(), title)
+        self.tab_widget.currentChanged.connect(self.ensure_tab_created)
+        self.ensure_tab_created(self.tab_widget.currentIndex())
         print("Added tabs to tab widget")
 
-        # Ensure each tab takes up all available space
-        for i in range(self.tab_widget.count()):
-            self.tab_widget.widget(i).setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
+        # Lets users tell a slow share from CPU or memory pressure
+        self.resource_label = ResourceStatusLabel()
+        self.statusBar.addPermanentWidget(self.resource_label)
+        self.resource_monitor = ResourceMonitor(self.job_scheduler, parent=self)
+        self.resource_monitor.sample_ready.connect(self.resource_label.show_sample)
+        self.resource_monitor.start()
 
         self.create_menu_bar()
 
-        self.temp_dir = tempfile.mkdtemp()
-
         print("MainWindow initialization complete")
 
+    def create_summary_file_generator_tab(self):
+        from .tabs.summary_file_generator_tab import SummaryFileGeneratorTab
+        return SummaryFileGeneratorTab(self)
+
+    def create_pop_tab(self):
+        from .tabs.pop_tab import PopTab
+        return PopTab(self)
+
+    def create_summary_file_combiner_tab(self):
+        from .tabs.summary_file_combiner_tab import SummaryFileCombinerTab
+        return SummaryFileCombinerTab(self)
+
+    def create_history_tab(self):
+        from .tabs.history_tab import HistoryTab
+        return HistoryTab(self)
+
+    def ensure_tab_created(self, index):
+        if index < 0 or index >= len(self.tab_factories):
+            return None
+        attribute, title, factory = self.tab_factories[index]
+        tab = getattr(self, attribute)
+        if tab is not None:
+            return tab
+        try:
+            print(f"Creating {title} tab...")
+            tab = factory()
+            print(f"Created {title} tab")
+        except Exception as e:
+            print(f"Error creating {title} tab: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+        # Ensure the tab takes up all available space
+        tab.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        setattr(self, attribute, tab)
+        placeholder = self.tab_widget.widget(index)
+        self.tab_widget.blockSignals(True)
+        self.tab_widget.removeTab(index)
+        self.tab_widget.insertTab(index, tab, title)
+        self.tab_widget.setCurrentIndex(index)
+        self.tab_widget.blockSignals(False)
+        placeholder.deleteLater()
+        return tab
+
+    def created_tabs(self):
+        return [getattr(self, attribute) for attribute, title, factory in self.tab_factories
+                if getattr(self, attribute) is not None]
+
+    def confirm_cancel_jobs(self):
+        if not self.job_scheduler.has_active_jobs():
+            self.job_scheduler.wait_for_threads()
+            return True
+        reply = QMessageBox.question(self, 'Jobs Running', 'Jobs are still running or queued. Cancel them and quit?',
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                     QMessageBox.StandardButton.No)
+        if reply != QMessageBox.StandardButton.Yes:
+            return False
+        self.job_scheduler.cancel_all()
+        self.job_scheduler.wait_for_threads()
+        return True
+
     def closeEvent(self, event):
-        # Clean up the temporary directory when the application closes
+        if not self.confirm_cancel_jobs():
+            event.ignore()
+            return
+        self.resource_monitor.stop()
+        get_staging_manager().shutdown()
+        # Clean up the temporary directory when the application closes; Quit
+        # may already have removed it
+        if not os.path.exists(self.temp_dir):
+            super().closeEvent(event)
+            return
         for filename in os.listdir(self.temp_dir):
             file_path = os.path.join(self.temp_dir, filename)
             try:
@@ -100,17 +165,23 @@ class MainWindow(QMainWindow):
         quit_action.triggered.connect(self.quit)
         file_menu.addAction(quit_action)
 
+        view_menu = QMenu("View", self)
+        menu_bar.addMenu(view_menu)
+        view_menu.addAction(self.job_queue_dock.toggleViewAction())
+
     def restart(self):
-        self.summary_file_generator_tab.restart()
-        self.pop_tab.restart()
-        self.summary_file_combiner_tab.restart()
+        # Tabs never opened have nothing to reset
+        for tab in self.created_tabs():
+            tab.restart()
         self.statusBar.showMessage("Application restarted", 5000)
 
     def quit(self):
         reply = QMessageBox.question(self, 'Quit', 'Do you want to quit?',
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                      QMessageBox.StandardButton.No)
-        if reply == QMessageBox.StandardButton.Yes:
+        if reply == QMessageBox.StandardButton.Yes and self.confirm_cancel_jobs():
+            self.resource_monitor.stop()
+            get_staging_manager().shutdown()
             self.clean_up_temp_files()
             QApplication.instance().quit()
 
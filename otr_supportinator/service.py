@@ -0,0 +1,526 @@
+import os
+import json
+import time
+import hmac
+import uuid
+import queue
+import secrets
+import threading
+import multiprocessing
+import urllib.request
+import urllib.error
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from .engine.jobs import run_job_in_child
+from .engine.input_cache import enable_input_cache, cache_size_from_env
+from .cli import build_generate_job, build_combine_job, summarize_result
+
+# Usage:
+#   otr_supportinator serve --port 8765 --workers 2
+#
+# REST:
+#   POST /jobs                {"job": "combine", "params": {"inputs": ["W:/.../summary_file_plwk40_*.xlsx"]}}
+#   GET  /jobs, GET /jobs/<id>, POST /jobs/<id>/cancel, GET /status
+# JSON-RPC 2.0 on POST /rpc with the methods submit, status, list, cancel and service_status.
+#
+# params are the command line options: inputs, plan_type, planning_week,
+# output_dir and output_name (generate) or weeks (combine, as [[2, 2], [3, 5]]).
+# Workers are long-lived processes that keep parsed inputs between jobs.
+#
+# Every request needs "Authorization: Bearer <token>" with the token printed
+# by serve (or OTR_SERVICE_TOKEN when set), a loopback Host header, and POST
+# bodies sent as application/json. Together these keep web pages open in a
+# browser on the same machine from submitting jobs.
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+MAX_QUEUED_JOBS = 32
+MAX_FINISHED_JOBS = 200  # Finished jobs kept for status queries
+DISPATCH_INTERVAL = 0.1
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+TOKEN_ENV_VAR = 'OTR_SERVICE_TOKEN'
+FINISHED_STATES = ('succeeded', 'failed', 'cancelled')
+
+JOB_BUILDERS = {
+    'generate': lambda params: build_generate_job(
+        params['inputs'], params.get('plan_type'), params.get('planning_week'),
+        params.get('output_dir'), params.get('output_name')),
+    'combine': lambda params: build_combine_job(
+        params['inputs'], params.get('plan_type'), params.get('planning_week'),
+        params.get('output_dir'), [tuple(weeks) for weeks in params['weeks']] if params.get('weeks') else None),
+}
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+class UnknownJob(Exception):
+    pass
+
+
+class WorkerEvents:
+    # Stands in for the events queue of run_job_in_child: tags every event
+    # with the job id and trims the result down to paths and counts
+    def __init__(self, events, job_id, job_name):
+        self.events = events
+        self.job_id = job_id
+        self.job_name = job_name
+
+    def put(self, event):
+        kind, payload = event
+        if kind == 'result':
+            payload = summarize_result(self.job_name, payload)
+        self.events.put((self.job_id, kind, payload))
+
+
+def service_worker(index, inbox, events, cancel_event, memory_budget, cache_bytes):
+    # Entry point of a worker process; runs one job at a time until told to stop
+    cache = enable_input_cache(cache_bytes)
+    while True:
+        item = inbox.get()
+        if item is None:
+            return
+        job_id, job_name, job_kwargs = item
+        run_job_in_child(job_name, job_kwargs, WorkerEvents(events, job_id, job_name), queue.Queue(),
+                         cancel_event, memory_budget)
+        events.put((job_id, 'cache', cache.stats()))
+
+
+class ServiceJob:
+    def __init__(self, job_name, params, job_kwargs):
+        self.id = uuid.uuid4().hex[:12]
+        self.job_name = job_name
+        self.params = params
+        self.job_kwargs = job_kwargs
+        self.status = 'queued'
+        self.percent = 0
+        self.message = "Waiting for a worker"
+        self.warnings = []
+        self.result = None
+        self.error = None
+        self.worker = None
+        self.partial_outputs = set()
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    def describe(self):
+        return {
+            'id': self.id,
+            'job': self.job_name,
+            'params': self.params,
+            'status': self.status,
+            'percent': self.percent,
+            'message': self.message,
+            'warnings': self.warnings,
+            'result': self.result,
+            'error': self.error,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class WorkerSlot:
+    def __init__(self, index, mp_context, events, memory_budget, cache_bytes):
+        self.index = index
+        self.inbox = mp_context.Queue()
+        self.cancel_event = mp_context.Event()
+        self.process = mp_context.Process(target=service_worker, name=f"otr-service-worker-{index}",
+                                          args=(index, self.inbox, events, self.cancel_event,
+                                                memory_budget, cache_bytes), daemon=True)
+        self.process.start()
+        self.job = None
+        self.cache_stats = None
+
+
+class JobService:
+    # Queues jobs and hands them to a fixed pool of worker processes. All job
+    # state lives here and is updated from the workers' events by one
+    # dispatcher thread.
+    def __init__(self, workers=DEFAULT_WORKERS, max_queued=MAX_QUEUED_JOBS, cache_bytes=None):
+        from .utils.memory_governor import get_memory_governor
+        self.mp_context = multiprocessing.get_context('spawn')
+        self.events = self.mp_context.Queue()
+        self.max_queued = max_queued
+        self.cache_bytes = cache_size_from_env() if cache_bytes is None else cache_bytes
+        # Each worker plans against its share of the budget, less its cache
+        self.memory_budget = max(get_memory_governor().available() // workers - self.cache_bytes, 0)
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.pending = deque()
+        self.finished_ids = deque()
+        self.slots = [self.start_worker(index) for index in range(workers)]
+        self.stopped = threading.Event()
+        self.dispatcher = threading.Thread(target=self.dispatch, name='otr-service-dispatcher', daemon=True)
+        self.dispatcher.start()
+
+    def start_worker(self, index):
+        return WorkerSlot(index, self.mp_context, self.events, self.memory_budget, self.cache_bytes)
+
+    def submit(self, job_name, params):
+        if job_name not in JOB_BUILDERS:
+            raise ValueError(f"Unknown job '{job_name}', expected one of {', '.join(JOB_BUILDERS)}")
+        if not isinstance(params, dict) or not params.get('inputs'):
+            raise ValueError("params.inputs must list input files or glob patterns")
+        if isinstance(params['inputs'], str):
+            params = dict(params, inputs=[params['inputs']])
+        try:
+            job_kwargs = JOB_BUILDERS[job_name](params)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid params: {e}")
+        with self.lock:
+            if len(self.pending) >= self.max_queued:
+                raise ServiceBusy(f"{len(self.pending)} jobs are already waiting; try again later")
+            job = ServiceJob(job_name, params, job_kwargs)
+            self.jobs[job.id] = job
+            self.pending.append(job)
+            self.assign_pending()
+            return job.describe()
+
+    def status(self, job_id):
+        with self.lock:
+            return self.get_job(job_id).describe()
+
+    def list_jobs(self):
+        with self.lock:
+            return [job.describe() for job in self.jobs.values()]
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.get_job(job_id)
+            if job.status == 'queued':
+                self.pending.remove(job)
+                self.finish(job, 'cancelled', "Cancelled before it started")
+            elif job.status == 'running':
+                job.message = "Cancelling..."
+                self.slots[job.worker].cancel_event.set()
+            return job.describe()
+
+    def service_status(self):
+        with self.lock:
+            return {
+                'workers': [{'index': slot.index, 'alive': slot.process.is_alive(),
+                             'job': slot.job.id if slot.job else None, 'input_cache': slot.cache_stats}
+                            for slot in self.slots],
+                'queued': len(self.pending),
+                'max_queued': self.max_queued,
+            }
+
+    def get_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise UnknownJob(f"No job with id '{job_id}'")
+        return job
+
+    def assign_pending(self):
+        # Called with the lock held
+        for slot in self.slots:
+            if slot.job is None and self.pending:
+                job = self.pending.popleft()
+                slot.job = job
+                job.status = 'running'
+                job.worker = slot.index
+                job.message = "Starting"
+                job.started = time.time()
+                # Cleared here, not in the worker: a cancel sent right after
+                # this put must not be wiped when the worker picks the job up
+                slot.cancel_event.clear()
+                slot.inbox.put((job.id, job.job_name, job.job_kwargs))
+
+    def finish(self, job, status, message):
+        # Called with the lock held
+        job.status = status
+        job.message = message
+        job.finished = time.time()
+        for path in job.partial_outputs:
+            if os.path.exists(path):
+                os.remove(path)
+        job.partial_outputs.clear()
+        if job.worker is not None and self.slots[job.worker].job is job:
+            self.slots[job.worker].job = None
+        self.finished_ids.append(job.id)
+        while len(self.finished_ids) > MAX_FINISHED_JOBS:
+            self.jobs.pop(self.finished_ids.popleft(), None)
+
+    def dispatch(self):
+        while not self.stopped.is_set():
+            try:
+                job_id, kind, payload = self.events.get(timeout=DISPATCH_INTERVAL)
+            except queue.Empty:
+                with self.lock:
+                    self.check_workers()
+                continue
+            with self.lock:
+                self.handle_event(job_id, kind, payload)
+                self.assign_pending()
+
+    def handle_event(self, job_id, kind, payload):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        if kind == 'cache':
+            self.slots[job.worker].cache_stats = payload
+            return
+        if job.status in FINISHED_STATES:
+            # Late events of a job whose worker died or that was cancelled
+            return
+        if kind == 'progress':
+            job.percent, job.message = payload
+        elif kind == 'error':
+            job.warnings.append(payload)
+        elif kind == 'writing':
+            job.partial_outputs.add(payload)
+        elif kind == 'committed':
+            job.partial_outputs.discard(payload)
+        elif kind == 'result':
+            job.result = payload
+            job.percent = 100
+            self.finish(job, 'succeeded', "Completed")
+        elif kind == 'cancelled':
+            self.finish(job, 'cancelled', "Cancelled")
+        elif kind == 'failed':
+            job.error = payload
+            self.finish(job, 'failed', payload)
+
+    def check_workers(self):
+        # A worker that dies, e.g. out of memory, fails its job and is replaced
+        for index, slot in enumerate(self.slots):
+            if self.stopped.is_set() or slot.process.is_alive():
+                continue
+            job = slot.job
+            message = f"Worker {index} stopped unexpectedly (exit code {slot.process.exitcode})"
+            print(message)
+            self.slots[index] = self.start_worker(index)
+            if job is not None:
+                job.error = message
+                self.finish(job, 'failed', message)
+        self.assign_pending()
+
+    def shutdown(self):
+        self.stopped.set()
+        self.dispatcher.join()
+        with self.lock:
+            for job in list(self.pending):
+                self.finish(job, 'cancelled', "Service stopped")
+            self.pending.clear()
+            for slot in self.slots:
+                slot.cancel_event.set()
+                slot.inbox.put(None)
+        for slot in self.slots:
+            slot.process.join(timeout=5)
+            if slot.process.is_alive():
+                slot.process.terminate()
+
+
+class RPCError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def call_method(service, method, params):
+    # Shared by the JSON-RPC endpoint; params may be a list or an object
+    methods = {
+        'submit': lambda job, params=None: service.submit(job, params or {}),
+        'status': service.status,
+        'list': service.list_jobs,
+        'cancel': service.cancel,
+        'service_status': service.service_status,
+    }
+    if method not in methods:
+        raise RPCError(-32601, f"Method not found: {method}")
+    try:
+        if isinstance(params, dict):
+            return methods[method](**params)
+        return methods[method](*(params or []))
+    except TypeError as e:
+        raise RPCError(-32602, f"Invalid params: {e}")
+    except ValueError as e:
+        raise RPCError(-32602, str(e))
+    except UnknownJob as e:
+        raise RPCError(-32001, str(e))
+    except ServiceBusy as e:
+        raise RPCError(-32002, str(e))
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    server_version = "otr_supportinator"
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} {format % args}")
+
+    def send_json(self, status, body):
+        data = json.dumps(body, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def check_request(self):
+        # Sends the error response and returns False when the request may not
+        # have come from a local client
+        host = (self.headers.get('Host') or '').strip().lower()
+        if host.startswith('['):
+            host = host[1:].split(']', 1)[0]
+        elif host.count(':') == 1:
+            host = host.split(':', 1)[0]
+        if host not in LOCAL_HOSTS:
+            self.send_json(403, {'error': "Requests must be addressed to a loopback host"})
+            return False
+        supplied = self.headers.get('Authorization') or ''
+        if not hmac.compare_digest(supplied.encode('utf-8'), f"Bearer {self.server.token}".encode('utf-8')):
+            self.send_json(401, {'error': "Missing or wrong service token"})
+            return False
+        if self.command == 'POST':
+            content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+            if content_type != 'application/json':
+                self.send_json(415, {'error': "Request bodies must be application/json"})
+                return False
+        return True
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def route(self):
+        return [part for part in self.path.split('?')[0].split('/') if part]
+
+    def do_GET(self):
+        if not self.check_request():
+            return
+        service = self.server.service
+        parts = self.route()
+        try:
+            if parts == ['jobs']:
+                self.send_json(200, service.list_jobs())
+            elif len(parts) == 2 and parts[0] == 'jobs':
+                self.send_json(200, service.status(parts[1]))
+            elif parts == ['status']:
+                self.send_json(200, service.service_status())
+            else:
+                self.send_json(404, {'error': f"Not found: {self.path}"})
+        except UnknownJob as e:
+            self.send_json(404, {'error': str(e)})
+
+    def do_POST(self):
+        if not self.check_request():
+            return
+        service = self.server.service
+        parts = self.route()
+        try:
+            body = self.read_json()
+        except ValueError as e:
+            self.send_json(400, {'error': f"Invalid JSON: {e}"})
+            return
+        try:
+            if parts == ['jobs']:
+                self.send_json(202, service.submit(body.get('job'), body.get('params')))
+            elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+                self.send_json(200, service.cancel(parts[1]))
+            elif parts == ['rpc']:
+                self.send_json(200, self.handle_rpc(service, body))
+            else:
+                self.send_json(404, {'error': f"Not found: {self.path}"})
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+        except UnknownJob as e:
+            self.send_json(404, {'error': str(e)})
+        except ServiceBusy as e:
+            self.send_json(503, {'error': str(e)})
+
+    def handle_rpc(self, service, body):
+        response = {'jsonrpc': '2.0', 'id': body.get('id')}
+        try:
+            response['result'] = call_method(service, body.get('method'), body.get('params'))
+        except RPCError as e:
+            response['error'] = {'code': e.code, 'message': str(e)}
+        return response
+
+
+def create_server(host='127.0.0.1', port=DEFAULT_PORT, workers=DEFAULT_WORKERS, cache_bytes=None, token=None):
+    # Only ever bound to the loopback interface, and only answers requests
+    # carrying the token, since jobs write wherever they are told to
+    if host not in LOCAL_HOSTS:
+        raise ValueError(f"The service only listens on localhost, not {host}")
+    service = JobService(workers, cache_bytes=cache_bytes)
+    try:
+        server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+    except OSError:
+        service.shutdown()
+        raise
+    server.daemon_threads = True
+    server.service = service
+    server.token = token or os.environ.get(TOKEN_ENV_VAR) or secrets.token_urlsafe(24)
+    return server
+
+
+def serve(host='127.0.0.1', port=DEFAULT_PORT, workers=DEFAULT_WORKERS, cache_bytes=None):
+    server = create_server(host, port, workers, cache_bytes)
+    print(f"Serving on http://{host}:{server.server_address[1]} with {workers} worker(s)")
+    print(f"Token: {server.token}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        server.server_close()
+        server.service.shutdown()
+    return 0
+
+
+class ServiceClient:
+    # Small client for scripts and for trying the service out:
+    #   client = ServiceClient(token="<printed by serve>")
+    #   job = client.submit('generate', inputs=['in/*.xlsx'], plan_type='final')
+    #   print(client.wait(job['id'])['result']['output_files'])
+    def __init__(self, url=f"http://127.0.0.1:{DEFAULT_PORT}", token=None, timeout=30):
+        self.url = url.rstrip('/')
+        self.token = token or os.environ.get(TOKEN_ENV_VAR)
+        self.timeout = timeout
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        request = urllib.request.Request(self.url + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"{e.code}: {json.loads(e.read()).get('error')}")
+
+    def submit(self, job, **params):
+        return self.request('POST', '/jobs', {'job': job, 'params': params})
+
+    def status(self, job_id):
+        return self.request('GET', f'/jobs/{job_id}')
+
+    def cancel(self, job_id):
+        return self.request('POST', f'/jobs/{job_id}/cancel', {})
+
+    def jobs(self):
+        return self.request('GET', '/jobs')
+
+    def service_status(self):
+        return self.request('GET', '/status')
+
+    def rpc(self, method, params=None, request_id=1):
+        response = self.request('POST', '/rpc', {'jsonrpc': '2.0', 'method': method,
+                                                 'params': params or {}, 'id': request_id})
+        if 'error' in response:
+            raise RuntimeError(f"{response['error']['code']}: {response['error']['message']}")
+        return response['result']
+
+    def wait(self, job_id, poll_interval=0.5, timeout=None):
+        started = time.monotonic()
+        while True:
+            job = self.status(job_id)
+            if job['status'] in FINISHED_STATES:
+                return job
+            if timeout is not None and time.monotonic() - started > timeout:
+                raise TimeoutError(f"Job {job_id} still {job['status']} after {timeout}s")
+            time.sleep(poll_interval)
@@ -0,0 +1,146 @@
+from PyQt6.QtWidgets import QHBoxLayout, QComboBox, QSpinBox, QLabel, QPushButton
+from PyQt6.QtCore import QThread, pyqtSignal
+from .base_tab import BaseTab
+from ..utils.dataframe_table import DataFrameTableView
+from ..utils.date_utils import get_current_amazon_week
+from ..utils.history_store import get_history_directory
+
+DEFAULT_METRIC = '4 - amflex vans_ask'
+GROUP_BY_CHOICES = [("Region", 'region'), ("Node", 'node'), ("Total", None)]
+
+
+class HistoryQueryWorker(QThread):
+    # Runs a query, or with query=None loads the plan types and metrics on offer
+    finished_with_result = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, query=None, parent=None):
+        super().__init__(parent)
+        self.query = query
+
+    def run(self):
+        try:
+            from ..utils.history_store import HistoryStore
+            from ..utils.history_query import query_history, history_options
+            store = HistoryStore()
+            if self.query is None:
+                self.finished_with_result.emit(history_options(store))
+            else:
+                self.finished_with_result.emit(query_history(store=store, **self.query))
+        except Exception as e:
+            self.failed.emit(f"{type(e).__name__}: {e}")
+
+
+class HistoryTab(BaseTab):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.worker = None
+        self.init_ui()
+        self.load_options()
+
+    def init_ui(self):
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Plan type:"))
+        self.plan_type_combo = QComboBox()
+        controls.addWidget(self.plan_type_combo, 1)
+
+        controls.addWidget(QLabel("Metric:"))
+        self.metric_combo = QComboBox()
+        self.metric_combo.setEditable(True)
+        controls.addWidget(self.metric_combo, 3)
+
+        controls.addWidget(QLabel("Target week:"))
+        self.target_week_spin = QSpinBox()
+        self.target_week_spin.setRange(1, 53)
+        self.target_week_spin.setValue(get_current_amazon_week())
+        controls.addWidget(self.target_week_spin)
+
+        controls.addWidget(QLabel("Last planning weeks:"))
+        self.last_weeks_spin = QSpinBox()
+        self.last_weeks_spin.setRange(1, 104)
+        self.last_weeks_spin.setValue(8)
+        controls.addWidget(self.last_weeks_spin)
+
+        controls.addWidget(QLabel("By:"))
+        self.group_by_combo = QComboBox()
+        for label, value in GROUP_BY_CHOICES:
+            self.group_by_combo.addItem(label, value)
+        controls.addWidget(self.group_by_combo)
+
+        self.refresh_button = QPushButton("Refresh")
+        self.refresh_button.clicked.connect(self.load_options)
+        controls.addWidget(self.refresh_button)
+        self.run_button = QPushButton("Run")
+        self.run_button.clicked.connect(self.process)
+        controls.addWidget(self.run_button)
+        self.layout.addLayout(controls)
+
+        self.status_label = QLabel()
+        self.layout.addWidget(self.status_label)
+        self.table = DataFrameTableView()
+        self.layout.addWidget(self.table)
+
+    def start_worker(self, query):
+        if self.worker is not None and self.worker.isRunning():
+            return False
+        if get_history_directory() is None:
+            self.status_label.setText("The history store is switched off (OTR_HISTORY_DIR)")
+            return False
+        self.run_button.setEnabled(False)
+        self.refresh_button.setEnabled(False)
+        self.worker = HistoryQueryWorker(query, parent=self)
+        self.worker.finished_with_result.connect(self.show_options if query is None else self.show_result)
+        self.worker.failed.connect(self.show_error)
+        self.worker.finished.connect(self.worker_finished)
+        self.worker.start()
+        return True
+
+    def worker_finished(self):
+        self.run_button.setEnabled(True)
+        self.refresh_button.setEnabled(True)
+
+    def load_options(self):
+        if self.start_worker(None):
+            self.status_label.setText("Loading stored runs...")
+
+    def show_options(self, options):
+        current_plan_type = self.plan_type_combo.currentText()
+        current_metric = self.metric_combo.currentText() or DEFAULT_METRIC
+        self.plan_type_combo.clear()
+        self.plan_type_combo.addItems(options['plan_types'])
+        if current_plan_type in options['plan_types']:
+            self.plan_type_combo.setCurrentText(current_plan_type)
+        self.metric_combo.clear()
+        self.metric_combo.addItems(options['metrics'])
+        self.metric_combo.setCurrentText(current_metric)
+        self.status_label.setText(f"{options['runs']:,} stored runs")
+
+    def process(self):
+        metric = self.metric_combo.currentText().strip()
+        plan_type = self.plan_type_combo.currentText()
+        if not metric or not plan_type:
+            self.status_label.setText("No stored runs to query yet")
+            return
+        query = {
+            'metric': metric,
+            'target_week': self.target_week_spin.value(),
+            'plan_type': plan_type,
+            'last_weeks': self.last_weeks_spin.value(),
+            'group_by': self.group_by_combo.currentData(),
+        }
+        if self.start_worker(query):
+            self.status_label.setText("Querying...")
+
+    def show_result(self, result):
+        self.table.set_dataframe(result['table'])
+        source = "rollups" if result['used_rollups'] else "pivots"
+        self.status_label.setText(f"{len(result['runs'])} planning weeks from {result['files_read']} {source} "
+                                  f"in {result['seconds']:.2f}s")
+
+    def show_error(self, message):
+        print(f"History query failed: {message}")
+        self.status_label.setText(f"Query failed: {message}")
+
+    def restart(self):
+        self.table.set_dataframe(None)
+        self.load_options()
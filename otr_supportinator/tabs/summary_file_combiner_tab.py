@@ -2,126 +2,61 @@ from PyQt6.QtWidgets import (QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
                              QListWidget, QFileDialog, QScrollArea, QWidget,
                              QTableWidget, QTableWidgetItem, QHeaderView, QDialog, 
                              QRadioButton, QDialogButtonBox, QComboBox, QSpinBox,
-                             QCheckBox, QGroupBox, QSizePolicy, QMessageBox, 
-                             QProgressDialog)
+                             QCheckBox, QGroupBox, QSizePolicy, QMessageBox, QLineEdit)
 from PyQt6.QtCore import Qt, pyqtSignal, QSize, QRect, QThread, QEventLoop
 from PyQt6.QtGui import QColor, QResizeEvent, QDropEvent, QDragEnterEvent, QFontMetrics, QPainter
 from .base_tab import BaseTab
-from openpyxl import load_workbook, Workbook
-from openpyxl.utils import get_column_letter
-from openpyxl.cell import WriteOnlyCell
-from openpyxl.styles import Font
+from ..utils.input_readers import estimate_in_memory_size, INPUT_FILE_FILTER, SUPPORTED_INPUT_EXTENSIONS
+from ..utils.folder_scanner import FolderImporter, MetadataScanner
+from ..utils.file_registry import FileRegistry
+from ..utils.gui_components import show_duplicates_message
+from ..utils.file_utils import get_default_directory
+from ..engine.naming import COMBINATION_PRESETS, combination_title
+from ..utils.job_runner import JobRunner
+from ..utils.workbook_metadata import (get_planned_horizons,
+                                       estimate_combination_output, format_byte_size,
+                                       EXCEL_MAX_ROWS)
 import os
 import re
-import numpy as np
-import pandas as pd
-import psutil
-
-def find_optimal_chunk_size(sample_data, target_memory_usage=0.1):
-    available_memory = psutil.virtual_memory().available
-    sample_memory = sample_data.memory_usage(deep=True).sum()
-    memory_per_row = sample_memory / len(sample_data)
-    target_memory = available_memory * target_memory_usage
-    chunk_size = int(target_memory / memory_per_row)
-    return max(chunk_size, 1)
-
-class FileCombinerWorker(QThread):
-    progress_updated = pyqtSignal(int, str)
-    error_occurred = pyqtSignal(str)
-    process_completed = pyqtSignal(list, str)
+
+class FileCombinerWorker(JobRunner):
+    process_completed = pyqtSignal(list, str, list)
     save_location_requested = pyqtSignal()
     save_location_set = pyqtSignal()
 
-    def __init__(self, file_paths, combinations, planning_week, parent=None):
-        super().__init__(parent)
+    def __init__(self, file_paths, combinations, planning_week, parent=None, fingerprints=None):
+        memory_estimate = sum(estimate_in_memory_size(path) for path in file_paths)
+        super().__init__('combine', {
+            'file_paths': file_paths,
+            'combinations': combinations,
+            'planning_week': planning_week,
+            'fingerprints': fingerprints,
+        }, memory_estimate, parent)
         self.file_paths = file_paths
         self.combinations = combinations
         self.planning_week = planning_week
         self.save_directory = None
-        self.combination_row_counts = {}
-        self.header_format = None
-        self.master_data = None
 
-    def run(self):
-        try:
+    def prepare(self):
+        # Queued jobs normally get their directory before submission
+        if self.save_directory is None:
             self.progress_updated.emit(0, "Requesting save location...")
             if not self.get_save_location():
                 raise Exception("Save location selection cancelled")
+        self.job_kwargs['save_directory'] = self.save_directory
 
-            self.progress_updated.emit(5, "Extracting header format...")
-            self.extract_header_format()
-
-            self.progress_updated.emit(10, "Reading input files...")
-            self.read_and_process_input_files()
-
-            self.progress_updated.emit(50, "Processing combinations...")
-            self.process_combinations()
+        local_paths = self.stage_inputs(self.file_paths)
+        if local_paths is None:
+            return False
+        self.job_kwargs['local_paths'] = local_paths
+        return True
 
-            self.progress_updated.emit(100, "Process completed.")
-            self.process_completed.emit(self.get_combination_names(), self.save_directory)
-        except Exception as e:
-            self.error_occurred.emit(str(e))
+    def describe_result(self, result):
+        return f"{len(result['combination_names'])} file(s) saved to {result['save_directory']}"
 
-    def extract_header_format(self):
-        wb = load_workbook(self.file_paths[0], read_only=True)
-        ws = wb.active
-        self.header_format = [cell.font for cell in next(ws.rows)]
-
-    def read_and_process_input_files(self):
-        self.master_data = pd.DataFrame()
-        total_files = len(self.file_paths)
-        
-        for i, file_path in enumerate(self.file_paths, 1):
-            df = pd.read_excel(file_path)
-            df['planning_horizon'] = (df['amazon_week'] - self.planning_week) % 52
-            self.master_data = pd.concat([self.master_data, df], ignore_index=True)
-            self.progress_updated.emit(10 + int(40 * i / total_files), f"Reading input file {i}/{total_files}...")
-
-    def process_combinations(self):
-        total_combinations = len(self.combinations)
-        for i, combination in enumerate(self.combinations, 1):
-            self.progress_updated.emit(50 + int(45 * i / total_combinations), f"Processing combination {i}/{total_combinations}...")
-            
-            output_file = os.path.join(self.save_directory, f"{combination['title']}.xlsx")
-            weeks_for_combination = set(range(combination['start_week'], combination['end_week'] + 1))
-            
-            filtered_df = self.master_data[self.master_data['planning_horizon'].isin(weeks_for_combination)]
-            filtered_df = filtered_df.drop(columns=['planning_horizon'])
-            
-            sample_data = filtered_df.head(1000) if len(filtered_df) > 1000 else filtered_df
-            chunk_size = find_optimal_chunk_size(sample_data)
-            
-            wb = Workbook(write_only=True)
-            ws = wb.create_sheet()
-
-            header = []
-            for idx, column_name in enumerate(filtered_df.columns):
-                cell = WriteOnlyCell(ws, value=column_name)
-                if idx < len(self.header_format):
-                    cell.font = Font(
-                        name=self.header_format[idx].name,
-                        size=self.header_format[idx].size,
-                        bold=self.header_format[idx].bold,
-                        italic=self.header_format[idx].italic,
-                    )
-                header.append(cell)
-
-            ws.append(header)
-
-            data_array = filtered_df.values
-
-            for start_row in range(0, len(data_array), chunk_size):
-                end_row = min(start_row + chunk_size, len(data_array))
-                chunk = data_array[start_row:end_row]
-                
-                for row in chunk:
-                    ws.append(row.tolist())
-
-            wb.save(output_file)
-            
-            self.combination_row_counts[combination['title']] = len(filtered_df)
-
-        self.progress_updated.emit(95, "Finalizing process...")
+    def handle_result(self, result):
+        self.process_completed.emit(result['combination_names'], result['save_directory'],
+                                    result.get('memory_summary', []))
 
     def get_save_location(self):
         self.save_location_requested.emit()
@@ -135,20 +70,27 @@ class FileCombinerWorker(QThread):
     def set_save_directory(self, directory):
         if directory:
             self.save_directory = directory
-            self.save_location_set.emit()
-
-    def get_combination_names(self):
-        return [f"{title}.xlsx with {self.combination_row_counts[title]} rows" for title in self.combination_row_counts]
+        self.save_location_set.emit()
 
 class FileListWidget(QListWidget):
     files_changed = pyqtSignal()
-    file_added = pyqtSignal(str)
+    files_added = pyqtSignal(list)
+    duplicates_found = pyqtSignal(list)
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setAcceptDrops(True)
         self.setDragDropMode(QListWidget.DragDropMode.InternalMove)
 
+        # Dropped folders and file checks are handled off the UI thread
+        self.importer = FolderImporter(SUPPORTED_INPUT_EXTENSIONS, self)
+        self.importer.files_found.connect(self.add_files)
+
+        # Path and content index of the queued files; fingerprints are reused
+        # by the combiner's manifest and output cache
+        self.registry = FileRegistry(self)
+        self.registry.duplicates_found.connect(self.duplicates_found)
+
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
@@ -158,23 +100,35 @@ class FileListWidget(QListWidget):
     def dropEvent(self, event: QDropEvent):
         if event.mimeData().hasUrls():
             event.setDropAction(Qt.DropAction.CopyAction)
-            for url in event.mimeData().urls():
-                file_path = url.toLocalFile()
-                if file_path.lower().endswith(('.xlsx', '.xls')):
-                    if not self.file_exists(file_path):
-                        self.addItem(file_path)
-                        self.file_added.emit(file_path)
+            self.importer.import_paths([url.toLocalFile() for url in event.mimeData().urls()])
             event.accept()
-            self.files_changed.emit()
         else:
             super().dropEvent(event)
 
+    def add_files(self, file_paths):
+        # One files_added per batch, so the tab refreshes once per batch
+        added = [file_path for file_path in file_paths if self.add_file(file_path)]
+        if added:
+            self.files_added.emit(added)
+        self.files_changed.emit()
+        return added
+
+    def add_file(self, file_path):
+        if not self.registry.add(file_path):
+            return False
+        self.addItem(file_path)
+        return True
+
     def file_exists(self, file_path):
-        file_name = os.path.basename(file_path)
-        for index in range(self.count()):
-            if file_name == os.path.basename(self.item(index).text()):
-                return True
-        return False
+        return self.registry.contains(file_path)
+
+    def take_file(self, item):
+        self.registry.remove(item.text())
+        return self.takeItem(self.row(item))
+
+    def clear(self):
+        super().clear()
+        self.registry.clear()
 
 class WrappingLabel(QLabel):
     def __init__(self, *args, **kwargs):
@@ -226,8 +180,12 @@ class SummaryFileCombinerTab(BaseTab):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.file_data = {}
+        self.file_metadata = {}
         self.planning_week = None
         self.combinations = []
+        # Workbook metadata is read off the UI thread
+        self.metadata_scanner = MetadataScanner(self)
+        self.metadata_scanner.metadata_scanned.connect(self.apply_metadata)
         self.init_ui()
         
         # Connect the window's resize event to our custom handler
@@ -251,24 +209,37 @@ class SummaryFileCombinerTab(BaseTab):
         row_height = font_metrics.height()
         self.file_list.setMinimumHeight(row_height * 6)
         self.file_list.files_changed.connect(self.update_ui_state)
-        self.file_list.file_added.connect(self.process_file)
+        self.file_list.files_added.connect(self.process_files)
         self.file_list.itemSelectionChanged.connect(self.update_remove_button)
+        self.file_list.duplicates_found.connect(self.remove_duplicate_files)
         self.content_layout.addWidget(self.file_list)
 
         # File buttons layout
         file_buttons_layout = QHBoxLayout()
         self.browse_button = QPushButton("Browse Files")
         self.browse_button.clicked.connect(self.browse_files)
+        self.browse_folder_button = QPushButton("Browse Folder")
+        self.browse_folder_button.clicked.connect(self.browse_folder)
         self.remove_button = QPushButton("Remove Selected")
         self.remove_button.clicked.connect(self.remove_selected_files)
         self.remove_button.setEnabled(False)  # Initially disabled
         self.clear_all_button = QPushButton("Clear All")
         self.clear_all_button.clicked.connect(self.clear_all_files)
         file_buttons_layout.addWidget(self.browse_button)
+        file_buttons_layout.addWidget(self.browse_folder_button)
         file_buttons_layout.addWidget(self.remove_button)
         file_buttons_layout.addWidget(self.clear_all_button)
         self.content_layout.addLayout(file_buttons_layout)
 
+        # Applies to files found inside dropped or browsed folders
+        include_layout = QHBoxLayout()
+        include_layout.addWidget(QLabel("Include:"))
+        self.include_patterns_edit = QLineEdit()
+        self.include_patterns_edit.setPlaceholderText("All summary files, or e.g. summary_file_plwk*, kanto_")
+        self.include_patterns_edit.textChanged.connect(self.file_list.importer.set_include_patterns)
+        include_layout.addWidget(self.include_patterns_edit)
+        self.content_layout.addLayout(include_layout)
+
         # Planning week layout
         self.planning_week_widget = QWidget()
         planning_week_layout = QHBoxLayout(self.planning_week_widget)
@@ -350,8 +321,11 @@ class SummaryFileCombinerTab(BaseTab):
             combination.setFixedWidth(combination_width)
 
     def clear_all_files(self):
+        self.file_list.importer.cancel_all()
+        self.metadata_scanner.cancel_all()
         self.file_list.clear()
         self.file_data.clear()
+        self.file_metadata.clear()
         self.planning_week = None
         self.planning_week_label.setText("Planning Week: Not Set")
         self.planning_week_widget.setStyleSheet("")
@@ -447,6 +421,11 @@ class SummaryFileCombinerTab(BaseTab):
         generate_checkbox.setChecked(True)  # Set to True by default
         layout.addWidget(generate_checkbox)
 
+        # Output size estimate from the input metadata
+        estimate_label = WrappingLabel()
+        estimate_label.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
+        layout.addWidget(estimate_label)
+
         group.setLayout(layout)
 
         # Connect signals
@@ -470,12 +449,7 @@ class SummaryFileCombinerTab(BaseTab):
         end_week = group.layout().itemAt(1).itemAt(3).widget()
         
         preset = preset_dropdown.currentText()
-        ranges = {
-            "A": (2, 2), "B": (3, 5), "C": (6, 7), "D": (8, 10),
-            "All": (2, 10), "Custom": (1, 10)
-        }
-
-        start, end = ranges[preset]
+        start, end = COMBINATION_PRESETS[preset]
         start_week.setValue(start)
         end_week.setValue(end)
 
@@ -517,15 +491,35 @@ class SummaryFileCombinerTab(BaseTab):
 
         self.check_range_validity(group, index)
 
-        weeks = ".".join(str(w) for w in range(start_week, end_week + 1))
-        if self.planning_week is not None:
-            title = f"summary_file_plwk{self.planning_week}_w-{weeks}"
-        else:
-            title = f"summary_file_plwk[Not Set]_w-{weeks}"
+        title = combination_title(self.planning_week, start_week, end_week)
         
         if not generate_checkbox.isChecked():
             title += " (Disabled)"
         title_label.setText(title)
+        self.update_combination_estimate(group)
+
+    def get_combination_estimate(self, group):
+        if self.planning_week is None or not self.file_metadata:
+            return None
+        start_week = group.layout().itemAt(1).itemAt(1).widget().value()
+        end_week = group.layout().itemAt(1).itemAt(3).widget().value()
+        return estimate_combination_output(list(self.file_metadata.values()), self.planning_week, start_week, end_week)
+
+    def update_combination_estimate(self, group):
+        estimate_label = group.layout().itemAt(4).widget()
+        estimate = self.get_combination_estimate(group)
+        if estimate is None:
+            estimate_label.setText("")
+            estimate_label.setStyleSheet("")
+            return
+
+        text = f"Est. {estimate['rows']:,} rows, {format_byte_size(estimate['bytes'])}"
+        if estimate['exceeds_excel_limit']:
+            text += "\nExceeds Excel row limit"
+            estimate_label.setStyleSheet("color: red;")
+        else:
+            estimate_label.setStyleSheet("")
+        estimate_label.setText(text)
 
     def update_ui_state(self):
         has_files = self.file_list.count() > 0
@@ -534,6 +528,7 @@ class SummaryFileCombinerTab(BaseTab):
         self.remove_button.setEnabled(has_files)
         self.clear_all_button.setEnabled(has_files)
         self.browse_button.setEnabled(not has_error)
+        self.browse_folder_button.setEnabled(not has_error)
         self.planned_weeks_table.setEnabled(not has_error)
         self.generate_button.setEnabled(has_files and not has_error)
         
@@ -544,12 +539,21 @@ class SummaryFileCombinerTab(BaseTab):
             self.update_table()
 
     def remove_selected_files(self):
-        for item in self.file_list.selectedItems():
+        self.remove_files(self.file_list.selectedItems())
+
+    def remove_duplicate_files(self, duplicates):
+        paths = {path for path, existing in duplicates}
+        self.remove_files([self.file_list.item(row) for row in range(self.file_list.count())
+                           if self.file_list.item(row).text() in paths])
+        show_duplicates_message(self, duplicates)
+
+    def remove_files(self, items):
+        for item in items:
             file_path = item.text()
-            row = self.file_list.row(item)
-            self.file_list.takeItem(row)
+            self.file_list.take_file(item)
             if file_path in self.file_data:
                 del self.file_data[file_path]
+            self.file_metadata.pop(file_path, None)
         
         # Reset planning week and hide warning if no files left
         if self.file_list.count() == 0:
@@ -585,30 +589,58 @@ class SummaryFileCombinerTab(BaseTab):
         self.update_planned_weeks()
 
     def browse_files(self):
-        files, _ = QFileDialog.getOpenFileNames(self, "Select Excel Files", "", "Excel Files (*.xlsx *.xls)")
+        files, _ = QFileDialog.getOpenFileNames(self, "Select Summary Files", "", INPUT_FILE_FILTER)
+        added = self.file_list.add_files(files)
         for file in files:
-            if not self.file_list.file_exists(file):
-                self.file_list.addItem(file)
-                self.process_file(file)
-            else:
+            if file not in added:
                 QMessageBox.warning(self, "Duplicate File", f"The file '{os.path.basename(file)}' has already been added.")
 
-    def process_file(self, file_path):
-        file_name = os.path.basename(file_path)
-        extracted_planning_week = self.extract_planning_week(file_name)
-        if extracted_planning_week:
-            if self.planning_week is None:
-                self.planning_week = extracted_planning_week
-                self.planning_week_label.setText(f"Planning Week: {self.planning_week}")
-                self.update_all_combination_titles()  # Add this line
-            elif self.planning_week != extracted_planning_week:
-                self.planning_week_label.setText("Planning Week: Multiple Planning Weeks Detected - Remove Summary File From Incorrect Planning Week")
-                self.planning_week_widget.setStyleSheet("background-color: red; color: white; padding: 5px;")
-        
-        planned_horizons = self.extract_planned_horizons(file_name)
-        self.file_data[file_path] = planned_horizons
+    def browse_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder", get_default_directory())
+        if folder:
+            self.file_list.importer.import_paths([folder])
+
+    def process_files(self, file_paths):
+        for file_path in file_paths:
+            file_name = os.path.basename(file_path)
+            extracted_planning_week = self.extract_planning_week(file_name)
+            if extracted_planning_week:
+                if self.planning_week is None:
+                    self.planning_week = extracted_planning_week
+                    self.planning_week_label.setText(f"Planning Week: {self.planning_week}")
+                elif self.planning_week != extracted_planning_week:
+                    self.planning_week_label.setText("Planning Week: Multiple Planning Weeks Detected - Remove Summary File From Incorrect Planning Week")
+                    self.planning_week_widget.setStyleSheet("background-color: red; color: white; padding: 5px;")
+            # The horizons in the name stand in until the metadata is read
+            self.file_data[file_path] = self.extract_planned_horizons(file_name)
+        self.metadata_scanner.scan(file_paths)
+        self.refresh_file_state()
+
+    def apply_metadata(self, results):
+        for file_path, metadata, error in results:
+            if file_path not in self.file_data:
+                continue  # Removed while it was being scanned
+            if metadata is None:
+                self.log_message(f"Could not scan metadata for {os.path.basename(file_path)}: {error}")
+                continue
+            self.file_metadata[file_path] = metadata
+
+            # Prefer the weeks actually present in the file over the name. A
+            # sample of the first rows can miss weeks that only later regions
+            # forecast, so it only adds to the horizons in the name.
+            if metadata['amazon_weeks'] and self.planning_week is not None:
+                sampled_horizons = get_planned_horizons(metadata, self.planning_week)
+                if metadata['weeks_complete']:
+                    self.file_data[file_path] = sampled_horizons
+                else:
+                    named_horizons = self.extract_planned_horizons(os.path.basename(file_path))
+                    self.file_data[file_path] = sorted(set(named_horizons) | set(sampled_horizons))
+        self.refresh_file_state()
+
+    def refresh_file_state(self):
         self.update_planned_weeks()
         self.update_combinations_validity()
+        self.update_all_combination_titles()
         self.update_ui_state()
 
     def extract_planning_week(self, file_name):
@@ -616,7 +648,7 @@ class SummaryFileCombinerTab(BaseTab):
         return int(match.group(1)) if match else None
 
     def extract_planned_horizons(self, file_name):
-        match = re.search(r"w-([\d\.]+)", file_name)
+        match = re.search(r"w-(\d+(?:\.\d+)*)", file_name)
         return [int(horizon) for horizon in match.group(1).split('.')] if match else []
 
     def update_planned_weeks(self):
@@ -695,6 +727,28 @@ class SummaryFileCombinerTab(BaseTab):
         self.log_message(f"Identified {len(enabled_combinations)} enabled combinations")
         return enabled_combinations
 
+    def confirm_output_sizes(self):
+        oversized = []
+        for combination in self.combinations:
+            generate_checkbox = combination.layout().itemAt(3).widget()
+            if not (generate_checkbox.isChecked() and generate_checkbox.isEnabled()):
+                continue
+            estimate = self.get_combination_estimate(combination)
+            if estimate and estimate['exceeds_excel_limit']:
+                title = combination.layout().itemAt(2).widget().text()
+                oversized.append(f"{title}: ~{estimate['rows']:,} rows")
+
+        if not oversized:
+            return True
+
+        reply = QMessageBox.question(
+            self, "Excel Row Limit",
+            f"The following outputs are estimated to exceed the Excel limit of {EXCEL_MAX_ROWS:,} rows:\n\n"
+            + "\n".join(oversized) + "\n\nGenerate anyway?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No)
+        return reply == QMessageBox.StandardButton.Yes
+
     def get_file_paths(self):
         return [self.file_list.item(i).text() for i in range(self.file_list.count())]
 
@@ -704,39 +758,38 @@ class SummaryFileCombinerTab(BaseTab):
             QMessageBox.warning(self, "No Combinations", "Please enable at least one valid combination before generating files.")
             return
 
-        file_paths = self.get_file_paths()
-        self.worker = FileCombinerWorker(file_paths, enabled_combinations, self.planning_week)
-        self.worker.progress_updated.connect(self.update_progress)
-        self.worker.error_occurred.connect(self.show_error)
-        self.worker.process_completed.connect(self.show_process_completed)
-        self.worker.save_location_requested.connect(self.get_save_location)
-        self.worker.start()
-
-        self.progress_dialog = QProgressDialog("Generating Combined Files", "Cancel", 0, 100, self)
-        self.progress_dialog.setWindowTitle("Generating Combined Files")
-        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-        self.progress_dialog.setAutoReset(False)
-        self.progress_dialog.setAutoClose(False)
-        self.progress_dialog.canceled.connect(self.cancel_process)
-        self.progress_dialog.show()
+        if not self.confirm_output_sizes():
+            return
 
-    def get_save_location(self):
+        # Ask for the directory now, while the user is here, rather than when
+        # the scheduler eventually starts the job
+        save_dir = self.ask_save_directory()
+        if not save_dir:
+            return
+
+        file_paths = self.get_file_paths()
+        worker = FileCombinerWorker(file_paths, enabled_combinations, self.planning_week, self,
+                                    self.file_list.registry.fingerprints(file_paths))
+        worker.save_directory = save_dir
+        worker.error_occurred.connect(self.show_error)
+        worker.process_completed.connect(self.show_process_completed)
+        worker.save_location_requested.connect(lambda worker=worker: self.get_save_location(worker))
+        worker.job_cancelled.connect(self.show_process_cancelled)
+
+        names = ", ".join(combination['title'] for combination in enabled_combinations)
+        self.window().job_scheduler.submit(worker, f"Combine {names}")
+
+    def ask_save_directory(self):
         default_dir = r"W:\Shared With Me\11. OTR\01_ShareFolder\output to bigpush"
-        save_dir = QFileDialog.getExistingDirectory(self, "Select Save Directory", default_dir)
-        if save_dir:
-            self.worker.set_save_directory(save_dir)
-        else:
-            self.worker.error_occurred.emit("Save location selection cancelled")
+        return QFileDialog.getExistingDirectory(self, "Select Save Directory", default_dir)
+
+    def get_save_location(self, worker):
+        worker.set_save_directory(self.ask_save_directory())
 
-    def cancel_process(self):
-        if self.worker.isRunning():
-            self.worker.terminate()
-            self.worker.wait()
-            QMessageBox.information(self, "Process Cancelled", "The combination process has been cancelled.")
-        self.progress_dialog.close()
+    def show_process_cancelled(self):
+        QMessageBox.information(self, "Process Cancelled", "The combination process has been cancelled.")
 
     def show_process_completed(self, combination_names, save_directory, row_counts):
-        self.progress_dialog.close()
         message = f"Process completed successfully.\n\nCombinations created:\n"
         for name in combination_names:
             base_name = os.path.splitext(name)[0]  # Remove file extension
@@ -751,32 +804,30 @@ class SummaryFileCombinerTab(BaseTab):
     def log_save_timing(self, timing_info):
         self.log_message(timing_info)
 
-    def update_progress(self, value, message):
-        self.progress_dialog.setValue(value)
-        self.progress_dialog.setLabelText(message)
-
     def process_finished(self):
-        self.progress_dialog.close()
         QMessageBox.information(self, "Process Completed", "All combinations have been processed and saved.")
 
     def show_error(self, error_message):
         QMessageBox.critical(self, "Error", error_message)
-        self.progress_dialog.close()
 
-    def show_process_completed(self, combination_names, save_directory):
-        self.progress_dialog.close()
+    def show_process_completed(self, combination_names, save_directory, memory_summary=None):
         message = f"Process completed successfully.\n\nCombinations created:\n"
         message += "\n".join(combination_names)
         message += f"\n\nSaved to: {save_directory}"
+        if memory_summary:
+            # Only collected when OTR_MEMORY_STATS is set
+            message += "\n\nMemory:\n" + "\n".join(memory_summary)
         QMessageBox.information(self, "Process Completed", message)
 
     def show_combination_completed(self, file_path):
         QMessageBox.information(self, "Combination Completed", f"Combined file saved as:\n{file_path}")
-        self.progress_dialog.close()
 
     def restart(self):
+        self.file_list.importer.cancel_all()
+        self.metadata_scanner.cancel_all()
         self.file_list.clear()
         self.file_data.clear()
+        self.file_metadata.clear()
         self.planning_week = None
         self.planning_week_label.setText("Planning Week: Not Set")
         self.planning_week_widget.setStyleSheet("")
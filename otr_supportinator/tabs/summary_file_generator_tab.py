@@ -1,199 +1,59 @@
 import io
 import sys
 import os
-import re
-import pandas as pd
 from datetime import datetime
 from PyQt6.QtWidgets import (QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
                              QSpinBox, QLineEdit, QTextEdit, QProgressDialog,
                              QMessageBox, QFileDialog, QComboBox, QGroupBox, 
-                             QFormLayout, QMainWindow)
+                             QFormLayout, QMainWindow, QTabWidget)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from .base_tab import BaseTab
 from ..utils.gui_components import FileDropArea
-from ..utils.file_utils import process_file
 from ..utils.date_utils import get_amazon_week
-
-class SummaryFileGeneratorWorker(QThread):
-    progress_update = pyqtSignal(int, str)
-    error_occurred = pyqtSignal(str)
-    finished = pyqtSignal(object, object, object, str, list)
+from ..utils.file_utils import get_default_directory
+from ..utils.job_runner import JobRunner
+from ..utils.dataframe_table import DataFrameTableView
+from ..utils.pivot_drilldown_panel import PivotDrillDownPanel
+from ..utils.input_readers import OPENPYXL_MEMORY_FACTOR
+from ..engine.naming import PLAN_TYPES, DEFAULT_PLAN_TYPE, extract_plan_type, extract_planning_week, summary_file_name
+
+class SummaryFileGeneratorWorker(JobRunner):
+    finished = pyqtSignal(object, object, object, str, list, list)
     request_save_file = pyqtSignal(str, str)
-    operation_cancelled = pyqtSignal()
     file_saved = pyqtSignal()
 
     def __init__(self, files, planning_type, temp_dir, suggested_filename, parent=None):
-        super().__init__(parent)
+        memory_estimate = sum(os.path.getsize(file) * OPENPYXL_MEMORY_FACTOR for file in files)
+        super().__init__('generate', {'files': files, 'suggested_filename': suggested_filename},
+                         memory_estimate, parent)
         self.files = files
         self.planning_type = planning_type
         self.temp_dir = temp_dir
         self.suggested_filename = suggested_filename
-        self.parent = parent
-        self.is_cancelled = False
-        self.save_file_path = None
-
-    def run(self):
-        try:
-            self.progress_update.emit(0, "Starting file processing...")
-            pivot_table, weekly_summary, region_weekly_summary = self.process_files()
-            
-            if self.is_cancelled:
-                self.operation_cancelled.emit()
-                return
 
-            self.progress_update.emit(95, "Preparing to save file...")
-            self.request_save_file.emit(self.suggested_filename, os.path.dirname(self.files[0]))
-            
-            while self.save_file_path is None:
-                QThread.msleep(100)
-                if self.is_cancelled:
-                    self.operation_cancelled.emit()
-                    return
-
-            if self.save_file_path:
-                self.progress_update.emit(97, "Saving summary file...")
-                pivot_table.to_excel(self.save_file_path, index=False)
-                self.progress_update.emit(100, "File saved successfully.")
-                self.file_saved.emit()
-                self.finished.emit(pivot_table, weekly_summary, region_weekly_summary, self.save_file_path, self.warnings)
-            else:
-                self.error_occurred.emit("File save cancelled.")
-        except Exception as e:
-            self.error_occurred.emit(str(e))
-
-    def cancel(self):
-        self.is_cancelled = True
-
-    def process_files(self):
-        results = []
-        total_files = len(self.files)
-
-        for i, file_path in enumerate(self.files, 1):
-            self.progress_update.emit(int(90 * i / total_files), f"Processing file {i} of {total_files}")
-            
-            if file_path is None:
-                continue
-            
-            try:
-                result = process_file(file_path)
-                if result is not None:
-                    results.append(result)
-            except Exception as e:
-                self.error_occurred.emit(f"Error processing file {file_path}: {str(e)}")
-            
-            if self.is_cancelled:
-                raise Exception("Operation cancelled by user")
-
-        if not results:
-            raise ValueError("No valid data found in any of the input files.")
-
-        self.progress_update.emit(90, "Combining results...")
-        combined_df = pd.concat(results, ignore_index=True)
-
-        self.progress_update.emit(92, "Creating pivot table...")
-
-        try:
-            # Pivot the combined dataframe
-            pivot_table = pd.pivot_table(combined_df,
-                                        values='value',
-                                        index=['region', 'node', 'cycle', 'forecast_period_start'],
-                                        columns=['metric', 'sub_metric'],
-                                        aggfunc='first',
-                                        fill_value=None)
-
-            # Reset the index to make 'region', 'node', etc. regular columns
-            pivot_table = pivot_table.reset_index()
-
-            # Flatten the multi-level column names
-            pivot_table.columns = [' '.join(col).strip() if isinstance(col, tuple) else col for col in pivot_table.columns]
-
-            # Convert 'forecast_period_start' to datetime
-            pivot_table['forecast_period_start'] = pd.to_datetime(pivot_table['forecast_period_start'])
-
-            # Calculate and insert 'amazon_week'
-            pivot_table['forecast_period_start'] = pd.to_datetime(pivot_table['forecast_period_start'])
-            pivot_table.insert(1, 'amazon_week', pivot_table['forecast_period_start'].apply(get_amazon_week))
-
-            # Calculate CVP
-            if '1 - FO volume' in pivot_table.columns and '2 - otr_capa calculated_total' in pivot_table.columns:
-                pivot_table.insert(5, 'CVP', pivot_table[['1 - FO volume', '2 - otr_capa calculated_total']].min(axis=1))
-            else:
-                pivot_table.insert(5, 'CVP', None)
-                self.log_message.emit("Warning: Unable to calculate CVP due to missing columns.")
-
-            # Add generated_at column
-            pivot_table.insert(6, 'generated_at', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-
-            # Convert forecast_period_start back to string
-            pivot_table['forecast_period_start'] = pivot_table['forecast_period_start'].dt.strftime('%Y-%m-%d')
-
-            # List of expected columns (based on the original output)
-            expected_columns = [
-                'region', 'amazon_week', 'node', 'cycle', 'forecast_period_start', '1 - FO volume',
-                '2 - otr_capa calculated_total', 'CVP', 'generated_at', '2 - otr_capa optimizer_total',
-                '3 - hdp capacity', '4 - amflex alloted_capacity', '4 - amflex bau_avg_capa',
-                '4 - amflex capacity_ask', '4 - amflex commitment_capacity', '4 - amflex max_block',
-                '4 - amflex mde_max_capa', '4 - amflex spr', '4 - amflex vans_alloted',
-                '4 - amflex vans_ask', '4 - amflex vans_committed', '4 - amflex_keicar capacity',
-                '4 - amflex_keicar spr', '4 - amflex_keicar vans', '4.1 - amflex_total capacity',
-                '4.1 - amflex_total spr', '4.1 - amflex_total vans', '5 - dsp2.0_keivan capacity',
-                '5 - dsp2.0_keivan spr', '5 - dsp2.0_keivan vans', '5 - dsp2.0_largevan capacity',
-                '5 - dsp2.0_largevan spr', '5 - dsp2.0_largevan vans', '5 - dsp_1t_walker capacity',
-                '5 - dsp_1t_walker spr', '5 - dsp_1t_walker vans', '5 - dsp_biker capacity',
-                '5 - dsp_biker spr', '5 - dsp_biker vans', '5 - dsp_keivan capacity',
-                '5 - dsp_keivan spr', '5 - dsp_keivan vans', '5 - dsp_keivan vans_rescue',
-                '5 - dsp_keivan_walker capacity', '5 - dsp_keivan_walker spr',
-                '5 - dsp_keivan_walker vans', '5 - dsp_largevan capacity', '5 - dsp_largevan spr',
-                '5 - dsp_largevan vans', '5 - dsp_walker capacity', '5 - dsp_walker spr',
-                '5 - dsp_walker vans', '5.1 - dsp_total capacity', '5.1 - dsp_total spr',
-                '5.1 - dsp_total vans', '6 - excess/shortage capacity'
-                ]
-
-
-            # Check for missing columns
-            missing_columns = [col for col in expected_columns if col not in pivot_table.columns]
-            if missing_columns:
-                self.warnings.append(f"Warning: The following expected columns are missing: {missing_columns}")
-                self.warnings.append("This may indicate issues with the input data or data processing.")
-
-            # Add missing columns with None values
-            for col in missing_columns:
-                pivot_table[col] = None
-
-            # Reorder columns
-            pivot_table = pivot_table[expected_columns]
-
-            # Calculate total van ask
-            if '4 - amflex vans_ask' in pivot_table.columns:
-                total_van_ask = pivot_table['4 - amflex vans_ask'].sum()
-                self.progress_update.emit(94, f"Total Van ask (all weeks): {round(int(total_van_ask),0)}")
-            else:
-                self.warnings.append("Warning: Unable to calculate total van ask. '4 - amflex vans_ask' column is missing.")
-
-            # Create summaries
-            if '4 - amflex vans_ask' in pivot_table.columns:
-                weekly_summary = pivot_table.groupby('amazon_week')['4 - amflex vans_ask'].sum().reset_index()
-                weekly_summary['4 - amflex vans_ask'] = weekly_summary['4 - amflex vans_ask'].astype(int)
-
-                region_weekly_summary = pivot_table.groupby(['amazon_week', 'region'])['4 - amflex vans_ask'].sum().reset_index()
-                region_weekly_summary['4 - amflex vans_ask'] = region_weekly_summary['4 - amflex vans_ask'].astype(int)
-            else:
-                weekly_summary = pd.DataFrame(columns=['amazon_week', '4 - amflex vans_ask'])
-                region_weekly_summary = pd.DataFrame(columns=['amazon_week', 'region', '4 - amflex vans_ask'])
-                self.warnings.append("Warning: Unable to create summaries. '4 - amflex vans_ask' column is missing.")
-
-            self.progress_update.emit(95, "Pivot table and summaries created")
-
-            return pivot_table, weekly_summary, region_weekly_summary
-
-        except Exception as e:
-            self.error_occurred.emit(f"Error creating pivot table: {str(e)}")
-            raise
-
-    def progress_callback(self, value, message):
-        if self.is_cancelled:
-            raise Exception("Operation cancelled by user")
-        self.progress_update.emit(value, message)
+    def prepare(self):
+        local_paths = self.stage_inputs(self.files)
+        if local_paths is None:
+            return False
+        self.job_kwargs['local_paths'] = local_paths
+        return True
+
+    def handle_request(self, kind, args):
+        if kind == 'save_file':
+            self.request_save_file.emit(*args)
+        else:
+            super().handle_request(kind, args)
+
+    def set_save_file_path(self, file_path):
+        self.reply(file_path if file_path else None)
+
+    def describe_result(self, result):
+        return f"Saved {result['output_file']}"
+
+    def handle_result(self, result):
+        self.file_saved.emit()
+        self.finished.emit(result['pivot_table'], result['weekly_summary'], result['region_weekly_summary'],
+                           result['output_file'], result['warnings'], result.get('memory_summary', []))
 
 class SummaryFileGeneratorTab(BaseTab):
     def __init__(self, parent=None):
@@ -209,6 +69,8 @@ class SummaryFileGeneratorTab(BaseTab):
         file_buttons_layout = QHBoxLayout()
         self.browse_button = QPushButton("Browse Files")
         self.browse_button.clicked.connect(self.browse_files)
+        self.browse_folder_button = QPushButton("Browse Folder")
+        self.browse_folder_button.clicked.connect(self.browse_folder)
         self.remove_selected_button = QPushButton("Remove Selected")
         self.remove_selected_button.clicked.connect(self.remove_selected_files)
         self.remove_selected_button.setEnabled(False)
@@ -216,17 +78,27 @@ class SummaryFileGeneratorTab(BaseTab):
         self.clear_all_button.clicked.connect(self.file_drop_area.clear_all_files)
         self.clear_all_button.setEnabled(False)
         file_buttons_layout.addWidget(self.browse_button)
+        file_buttons_layout.addWidget(self.browse_folder_button)
         file_buttons_layout.addWidget(self.remove_selected_button)
         file_buttons_layout.addWidget(self.clear_all_button)
         self.layout.addLayout(file_buttons_layout)
 
+        # Applies to files found inside dropped or browsed folders
+        include_layout = QHBoxLayout()
+        include_layout.addWidget(QLabel("Include:"))
+        self.include_patterns_edit = QLineEdit()
+        self.include_patterns_edit.setPlaceholderText("All Excel files, or e.g. *plwk40*, kanto_")
+        self.include_patterns_edit.textChanged.connect(self.file_drop_area.importer.set_include_patterns)
+        include_layout.addWidget(self.include_patterns_edit)
+        self.layout.addLayout(include_layout)
+
         self.settings_group = QGroupBox("Settings")
         settings_layout = QFormLayout()
         self.settings_group.setLayout(settings_layout)
 
 
         self.plan_type_combo = QComboBox()
-        self.plan_type_combo.addItems(["ask", "DS Callout", "final", "custom"])
+        self.plan_type_combo.addItems(PLAN_TYPES)
         self.plan_type_combo.setEditable(True)
         self.plan_type_combo.setEnabled(False)
         self.plan_type_combo.setCurrentText("")  # Set to empty string initially
@@ -252,6 +124,17 @@ class SummaryFileGeneratorTab(BaseTab):
         self.output_text.setReadOnly(True)
         self.layout.addWidget(self.output_text)
 
+        # Breakdowns go in model/view grids, which stay responsive however
+        # many rows the pivot has
+        self.results_tabs = QTabWidget()
+        self.weekly_table = DataFrameTableView()
+        self.region_table = DataFrameTableView()
+        self.drilldown_panel = PivotDrillDownPanel()
+        self.results_tabs.addTab(self.weekly_table, "Weekly Breakdown")
+        self.results_tabs.addTab(self.region_table, "Region-wise Breakdown")
+        self.results_tabs.addTab(self.drilldown_panel, "Drill-down")
+        self.layout.addWidget(self.results_tabs)
+
         self.file_drop_area.files_added.connect(self.update_ui_state)
         self.file_drop_area.files_cleared.connect(self.update_ui_state)
         self.file_drop_area.file_list.itemSelectionChanged.connect(self.update_remove_button_state)
@@ -263,12 +146,14 @@ class SummaryFileGeneratorTab(BaseTab):
 
     def browse_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Select Files", "", "Excel Files (*.xlsx *.xls)")
-        for file in files:
-            self.file_drop_area.add_file(file)
+        self.file_drop_area.importer.import_paths(files)
+
+    def browse_folder(self):
+        self.file_drop_area.browse_folder(get_default_directory())
 
     def remove_selected_files(self):
-        for item in self.file_drop_area.file_list.selectedItems():
-            self.file_drop_area.file_list.takeItem(self.file_drop_area.file_list.row(item))
+        selected = self.file_drop_area.file_list.selectedItems()
+        self.file_drop_area.remove_files([item.data(Qt.ItemDataRole.UserRole) for item in selected])
         self.update_ui_state()
 
     def update_remove_button_state(self):
@@ -292,32 +177,16 @@ class SummaryFileGeneratorTab(BaseTab):
         if self.file_drop_area.file_list.count() > 0:
             first_file_name = self.file_drop_area.file_list.item(0).text()
             
-            # Extract plan type
-            plan_type_match = re.search(r'_(ask|DS Callout|final|custom)\.', first_file_name)
-            if plan_type_match:
-                self.plan_type_combo.setCurrentText(plan_type_match.group(1))
-            else:
-                self.plan_type_combo.setCurrentText("ask")
-            
-            # Extract planning week
-            week_match = re.search(r'plwk(\d+)', first_file_name)
-            if week_match:
-                self.planning_week_spin.setValue(int(week_match.group(1)))
-            else:
-                self.planning_week_spin.setValue(get_amazon_week(datetime.now()))
+            self.plan_type_combo.setCurrentText(extract_plan_type(first_file_name) or DEFAULT_PLAN_TYPE)
+            self.planning_week_spin.setValue(extract_planning_week(first_file_name) or get_amazon_week(datetime.now()))
 
     def update_filename_preview(self):
         plan_type = self.plan_type_combo.currentText()
         planning_week = self.planning_week_spin.value()
         
         if self.file_drop_area.file_list.count() > 0:
-            y_string = ''
             first_file_name = self.file_drop_area.file_list.item(0).text()
-            match = re.search(r'W-(\d+(?:\.\d+)*)(?:\D|$)', first_file_name)
-            if match:
-                y_string = match.group(1)
-            
-            filename = f"summary_file_plwk{planning_week}_w-{y_string}_{plan_type}.xlsx"
+            filename = summary_file_name(first_file_name, plan_type, planning_week)
             self.file_name_preview.setText(filename)
             self.file_name_preview.setEnabled(True)
         else:
@@ -350,46 +219,31 @@ class SummaryFileGeneratorTab(BaseTab):
             QMessageBox.warning(self, "Missing Input", "Please enter the Planning Type.")
             return
 
-        self.progress_dialog = QProgressDialog("Generating Summary File", "Cancel", 0, 100, self)
-        self.progress_dialog.setWindowTitle("Generating Summary File")
-        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-        self.progress_dialog.setAutoReset(False)
-        self.progress_dialog.setAutoClose(False)
-        self.progress_dialog.setValue(0)
-        self.progress_dialog.canceled.connect(self.cancel_summary_generation)
-        self.progress_dialog.show()
-
-        self.worker = SummaryFileGeneratorWorker(files, planning_type, self.main_window.temp_dir, suggested_filename, self)
-        self.worker.progress_update.connect(self.update_progress)
-        self.worker.error_occurred.connect(self.handle_error)
-        self.worker.finished.connect(self.handle_finished)
-        self.worker.request_save_file.connect(self.get_save_file_name)
-        self.worker.operation_cancelled.connect(self.handle_cancellation)
-        self.worker.file_saved.connect(self.progress_dialog.close)
-        
-        self.worker.start()
+        # Progress and cancel live in the Jobs panel, so the tab stays usable
+        # and further runs can be queued behind this one
+        worker = SummaryFileGeneratorWorker(files, planning_type, self.main_window.temp_dir, suggested_filename, self)
+        worker.error_occurred.connect(self.handle_error)
+        worker.finished.connect(self.handle_finished)
+        worker.request_save_file.connect(
+            lambda name, directory, worker=worker: self.get_save_file_name(worker, name, directory))
+        worker.job_cancelled.connect(self.handle_cancellation)
+
+        self.main_window.job_scheduler.submit(worker, f"Generate {suggested_filename}")
+        self.output_text.append(f"<p>Queued summary generation for {suggested_filename}</p>")
 
     def on_filename_edited(self):
         self.custom_output_name = True
 
-    def cancel_summary_generation(self):
-        if self.worker:
-            self.worker.cancel()
-        self.progress_dialog.close()
-
-    def update_progress(self, value, message):
-        self.progress_dialog.setValue(value)
-        self.progress_dialog.setLabelText(message)
-
     def handle_error(self, error_message):
-        self.progress_dialog.close()
         QMessageBox.critical(self, "Error", f"An error occurred: {error_message}")
 
-    def handle_finished(self, pivot_table, weekly_summary, region_weekly_summary, output_file, warnings):
-        self.progress_dialog.close()
-        self.display_results(pivot_table, weekly_summary, region_weekly_summary, output_file, warnings)
+    def handle_finished(self, pivot_table, weekly_summary, region_weekly_summary, output_file, warnings,
+                        memory_summary):
+        self.display_results(pivot_table, weekly_summary, region_weekly_summary, output_file, warnings,
+                             memory_summary)
 
-    def display_results(self, pivot_table, weekly_summary, region_weekly_summary, output_file, warnings):
+    def display_results(self, pivot_table, weekly_summary, region_weekly_summary, output_file, warnings,
+                        memory_summary=None):
         total_van_ask = pivot_table['4 - amflex vans_ask'].sum() if '4 - amflex vans_ask' in pivot_table.columns else 0
         
         self.output_text.clear()
@@ -397,12 +251,16 @@ class SummaryFileGeneratorTab(BaseTab):
         self.output_text.append(f"<p><b>Total Van ask (all weeks):</b> {round(int(total_van_ask),0)}</p>")
         self.output_text.append(f"<p><b>Output file:</b> {output_file}</p>")
         
-        self.output_text.append("<h3>Weekly Breakdown</h3>")
-        self.add_table_to_text_edit(weekly_summary)
-        
-        self.output_text.append("<h3>Region-wise Breakdown</h3>")
-        self.add_table_to_text_edit(region_weekly_summary)
+        self.weekly_table.set_dataframe(weekly_summary)
+        self.region_table.set_dataframe(region_weekly_summary)
+        self.drilldown_panel.set_pivot(pivot_table)
         
+        if memory_summary:
+            # Only collected when OTR_MEMORY_STATS is set
+            self.output_text.append("<h3>Memory</h3>")
+            for line in memory_summary:
+                self.output_text.append(f"<p>{line}</p>")
+
         if warnings:
             self.output_text.append("<h3 style='color: red;'>Warnings</h3>")
             for warning in warnings:
@@ -413,23 +271,14 @@ class SummaryFileGeneratorTab(BaseTab):
         else:
             QMessageBox.information(self, "Success", f"Summary file saved successfully as:\n{output_file}")
 
-    def add_table_to_text_edit(self, df):
-        html = "<table border='1' cellpadding='3' cellspacing='0'>"
-        html += "<tr>" + "".join(f"<th>{col}</th>" for col in df.columns) + "</tr>"
-        for _, row in df.iterrows():
-            html += "<tr>" + "".join(f"<td>{value}</td>" for value in row) + "</tr>"
-        html += "</table>"
-        self.output_text.append(html)
-
-    def get_save_file_name(self, suggested_filename, default_dir):
+    def get_save_file_name(self, worker, suggested_filename, default_dir):
         file_path, _ = QFileDialog.getSaveFileName(
             self,
             "Save Summary File",
             os.path.join(default_dir, suggested_filename),
             "Excel Files (*.xlsx)"
         )
-        if self.worker:
-            self.worker.save_file_path = file_path if file_path else None
+        worker.set_save_file_path(file_path)
 
     def update_output_display(self, message):
         self.output_text.append(message)
@@ -445,5 +294,8 @@ class SummaryFileGeneratorTab(BaseTab):
         self.planning_week_spin.setEnabled(False)
         self.file_name_preview.clear()
         self.output_text.clear()
+        for table in (self.weekly_table, self.region_table):
+            table.set_dataframe(None)
+        self.drilldown_panel.set_pivot(None)
         self.custom_output_name = False
         self.update_ui_state()
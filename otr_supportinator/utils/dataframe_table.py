@@ -0,0 +1,200 @@
+# dataframe_table.py
+from PyQt6.QtWidgets import QTableView, QHeaderView, QApplication, QMenu, QAbstractItemView
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QKeySequence
+
+FETCH_BATCH_ROWS = 1000
+# Column widths are measured on this many rows instead of the whole table
+RESIZE_PRECISION_ROWS = 200
+
+# Bound by format_cell on first use; importing them here would slow startup
+np = None
+pd = None
+
+
+class DataFrameTableModel(QAbstractTableModel):
+    # Serves cells straight from the DataFrame's column arrays. Rows are handed
+    # to the view in batches as it scrolls, and sorting only reorders an index
+    # array, so nothing is converted or copied per cell up front.
+    def __init__(self, df=None, batch_size=FETCH_BATCH_ROWS, parent=None):
+        super().__init__(parent)
+        self.batch_size = batch_size
+        self.set_dataframe(df)
+
+    def set_dataframe(self, df, rows=None):
+        # None shows an empty table without needing pandas, so empty views can
+        # be built before any job has run
+        self.beginResetModel()
+        self.df = df
+        if df is None:
+            self.columns, self.arrays, self.numeric = [], [], []
+        else:
+            from pandas.api.types import is_numeric_dtype
+            self.columns = [str(column) for column in df.columns]
+            self.arrays = [df.iloc[:, position].to_numpy() for position in range(df.shape[1])]
+            self.numeric = [is_numeric_dtype(df.dtypes.iloc[position]) for position in range(df.shape[1])]
+        self.sort_column = -1
+        self.sort_order = Qt.SortOrder.AscendingOrder
+        self._set_rows(rows)
+        self.endResetModel()
+
+    def set_rows(self, rows=None):
+        # Shows a subset of the frame's rows (positions) without copying it,
+        # keeping the current sort
+        self.beginResetModel()
+        self._set_rows(rows)
+        self._apply_sort()
+        self.endResetModel()
+
+    def _set_rows(self, rows):
+        if self.df is None:
+            self.rows = self.order = []
+            self.total_rows = self.loaded_rows = 0
+            return
+        import numpy as np
+        if rows is None:
+            rows = np.arange(len(self.df))
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.total_rows = len(self.rows)
+        self.order = self.rows
+        self.loaded_rows = min(self.batch_size, self.total_rows)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded_rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded_rows < self.total_rows
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.batch_size, self.total_rows - self.loaded_rows)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded_rows, self.loaded_rows + count - 1)
+        self.loaded_rows += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return format_cell(self.arrays[column][self.order[index.row()]])
+        if role == Qt.ItemDataRole.TextAlignmentRole and self.numeric[column]:
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.columns[section] if section < len(self.columns) else None
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if column < 0 or column >= len(self.arrays):
+            return
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column = column
+        self.sort_order = order
+        self._apply_sort()
+        self.layoutChanged.emit()
+
+    def _apply_sort(self):
+        if self.sort_column < 0 or self.df is None:
+            self.order = self.rows
+            return
+        import pandas as pd
+        keys = pd.Series(self.arrays[self.sort_column][self.rows])
+        if not self.numeric[self.sort_column]:
+            # Object columns can mix strings and numbers; blanks stay blank
+            keys = keys.where(keys.isna(), keys.astype(str))
+        # Blanks go last in either direction
+        positions = keys.sort_values(ascending=self.sort_order == Qt.SortOrder.AscendingOrder, kind='stable',
+                                     na_position='last').index.to_numpy()
+        self.order = self.rows[positions]
+
+    def row_positions(self, rows):
+        return [self.order[row] for row in rows]
+
+    def to_text(self, rows=None, columns=None, include_header=True):
+        # Tab separated, which pastes into Excel as cells
+        rows = self.order if rows is None else self.row_positions(rows)
+        columns = list(range(len(self.columns))) if columns is None else list(columns)
+        lines = []
+        if include_header:
+            lines.append("\t".join(self.columns[column] for column in columns))
+        for row in rows:
+            lines.append("\t".join(format_cell(self.arrays[column][row]) for column in columns))
+        return "\n".join(lines)
+
+
+def format_cell(value):
+    # Called for every visible or copied cell, so numpy and pandas are bound
+    # once here instead of imported on each call
+    global np, pd
+    if np is None:
+        import numpy as np
+        import pandas as pd
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+        return ""
+    if isinstance(value, (float, np.floating)):
+        return str(int(value)) if float(value).is_integer() else f"{value:.2f}"
+    return str(value)
+
+
+class DataFrameTableView(QTableView):
+    def __init__(self, df=None, parent=None):
+        super().__init__(parent)
+        self.setModel(DataFrameTableModel(df, parent=self))
+        # Start unsorted; enabling sorting would otherwise sort by column 0
+        self.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.setSortingEnabled(True)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setAlternatingRowColors(True)
+        self.setWordWrap(False)
+
+        # Fixed row heights let the view skip measuring every row
+        vertical_header = self.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(self.fontMetrics().height() + 6)
+        self.horizontalHeader().setResizeContentsPrecision(RESIZE_PRECISION_ROWS)
+
+        self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.customContextMenuRequested.connect(self.show_context_menu)
+
+    def set_dataframe(self, df, rows=None):
+        self.model().set_dataframe(df, rows)
+        self.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.resizeColumnsToContents()
+
+    def set_rows(self, rows=None):
+        self.model().set_rows(rows)
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.StandardKey.Copy):
+            self.copy_selection()
+            return
+        super().keyPressEvent(event)
+
+    def show_context_menu(self, position):
+        menu = QMenu(self)
+        menu.addAction("Copy", self.copy_selection)
+        menu.addAction("Copy All", self.copy_all)
+        menu.exec(self.viewport().mapToGlobal(position))
+
+    def copy_selection(self):
+        indexes = self.selectionModel().selectedIndexes()
+        if not indexes:
+            return
+        rows = sorted({index.row() for index in indexes})
+        columns = sorted({index.column() for index in indexes})
+        QApplication.clipboard().setText(self.model().to_text(rows, columns))
+
+    def copy_all(self):
+        # Includes rows the view has not fetched yet
+        QApplication.clipboard().setText(self.model().to_text())
@@ -0,0 +1,173 @@
+import os
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from .fingerprint import file_fingerprint, file_content_hash
+from .staging import get_staging_manager
+
+FINGERPRINT_WORKERS = 4
+# Duplicates found close together are reported as one batch
+DUPLICATE_REPORT_DELAY_MS = 200
+
+
+def registry_key(file_path):
+    return os.path.normcase(os.path.abspath(file_path))
+
+
+def file_signature(file_path):
+    file_stat = os.stat(file_path)
+    return file_stat.st_size, file_stat.st_mtime_ns
+
+
+class FileRegistry(QObject):
+    # Queued input files indexed by normalized path and by content
+    # fingerprint. Path lookups are dict hits; fingerprints are computed on a
+    # small pool after a file is added. The fingerprint only samples the
+    # file, so a match is confirmed with a full hash before the file is
+    # reported through duplicates_found.
+    duplicates_found = pyqtSignal(list)
+    fingerprint_ready = pyqtSignal(str, str)
+    _fingerprint_computed = pyqtSignal(str, object, object)
+    _duplicate_confirmed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = {}
+        self.by_fingerprint = {}
+        self.pending_duplicates = []
+        self.sequence = itertools.count()
+        self.pool = ThreadPoolExecutor(max_workers=FINGERPRINT_WORKERS)
+        self._fingerprint_computed.connect(self.on_fingerprint_computed)
+        self._duplicate_confirmed.connect(self.on_duplicate_confirmed)
+        # Queued hashes are dropped with the tab instead of keeping threads busy
+        pool = self.pool
+        self.destroyed.connect(lambda: pool.shutdown(wait=False, cancel_futures=True))
+
+        self.duplicate_timer = QTimer(self)
+        self.duplicate_timer.setSingleShot(True)
+        self.duplicate_timer.setInterval(DUPLICATE_REPORT_DELAY_MS)
+        self.duplicate_timer.timeout.connect(self.report_duplicates)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def contains(self, file_path):
+        return registry_key(file_path) in self.entries
+
+    def add(self, file_path):
+        # Returns False when the same path is already queued
+        key = registry_key(file_path)
+        if key in self.entries:
+            return False
+        self.entries[key] = {'path': file_path, 'fingerprint': None, 'signature': None,
+                             'sequence': next(self.sequence)}
+        self.pool.submit(self.compute_fingerprint, key, file_path)
+        # Queued files are copied to local disk right away, well before a job
+        # needs them
+        staging = get_staging_manager()
+        if staging is not None:
+            staging.stage(file_path)
+        return True
+
+    def compute_fingerprint(self, key, file_path):
+        # Runs on the pool; the signal hands the result back to the UI thread
+        try:
+            signature = file_signature(file_path)
+            fingerprint = file_fingerprint(file_path)
+        except OSError as e:
+            print(f"Could not fingerprint {file_path}: {str(e)}")
+            signature, fingerprint = None, None
+        self.emit_from_pool(self._fingerprint_computed, key, fingerprint, signature)
+
+    def confirm_duplicate(self, file_path, existing_path):
+        # Runs on the pool; only files with the same content are reported
+        try:
+            if (os.path.getsize(file_path) == os.path.getsize(existing_path)
+                    and file_content_hash(file_path) == file_content_hash(existing_path)):
+                self.emit_from_pool(self._duplicate_confirmed, file_path, existing_path)
+        except OSError as e:
+            print(f"Could not compare {file_path} with {existing_path}: {str(e)}")
+
+    def emit_from_pool(self, signal, *args):
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            pass  # The registry was deleted while the pool was working
+
+    def on_fingerprint_computed(self, key, fingerprint, signature):
+        entry = self.entries.get(key)
+        if entry is None or fingerprint is None:
+            return
+        entry['fingerprint'] = fingerprint
+        entry['signature'] = signature
+
+        existing_key = self.by_fingerprint.get(fingerprint)
+        if existing_key is not None and existing_key != key and existing_key in self.entries:
+            # Hashes finish in any order; the file queued first is the one kept
+            existing = self.entries[existing_key]
+            if existing['sequence'] < entry['sequence']:
+                self.pool.submit(self.confirm_duplicate, entry['path'], existing['path'])
+            else:
+                self.pool.submit(self.confirm_duplicate, existing['path'], entry['path'])
+                self.by_fingerprint[fingerprint] = key
+        else:
+            self.by_fingerprint[fingerprint] = key
+        self.fingerprint_ready.emit(entry['path'], fingerprint)
+
+    def on_duplicate_confirmed(self, file_path, existing_path):
+        self.pending_duplicates.append((file_path, existing_path))
+        self.duplicate_timer.start()
+
+    def report_duplicates(self):
+        duplicates, self.pending_duplicates = self.pending_duplicates, []
+        # Skip files removed while the report was waiting
+        duplicates = [(path, existing) for path, existing in duplicates if self.contains(path)]
+        if duplicates:
+            self.duplicates_found.emit(duplicates)
+
+    def remove(self, file_path):
+        key = registry_key(file_path)
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.release_staged(entry['path'])
+        if entry is None or not entry['fingerprint'] or self.by_fingerprint.get(entry['fingerprint']) != key:
+            return
+        del self.by_fingerprint[entry['fingerprint']]
+        # A duplicate that was kept now owns the fingerprint
+        for other_key, other in self.entries.items():
+            if other['fingerprint'] == entry['fingerprint']:
+                self.by_fingerprint[entry['fingerprint']] = other_key
+                break
+
+    def release_staged(self, file_path):
+        staging = get_staging_manager()
+        if staging is not None:
+            staging.release(file_path)
+
+    def clear(self):
+        for entry in self.entries.values():
+            self.release_staged(entry['path'])
+        self.entries.clear()
+        self.by_fingerprint.clear()
+        self.pending_duplicates = []
+
+    def fingerprint(self, file_path):
+        # Only returned while the file is unchanged since it was hashed
+        entry = self.entries.get(registry_key(file_path))
+        if not entry or not entry['fingerprint']:
+            return None
+        try:
+            if file_signature(file_path) != entry['signature']:
+                return None
+        except OSError:
+            return None
+        return entry['fingerprint']
+
+    def fingerprints(self, file_paths):
+        # For passing to runs that cache by content, e.g. the combiner
+        fingerprints = {}
+        for file_path in file_paths:
+            fingerprint = self.fingerprint(file_path)
+            if fingerprint:
+                fingerprints[file_path] = fingerprint
+        return fingerprints
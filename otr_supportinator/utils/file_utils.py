@@ -1,41 +1,55 @@
 import os
 import re
-import pandas as pd
-import numpy as np
-import openpyxl
 from datetime import datetime
-from PyQt6.QtWidgets import QFileDialog, QMessageBox
-from openpyxl import load_workbook
+from .tracing import span
+from .memory_stats import record_frame
 
-def process_file(file_path):
+CANCEL_CHECK_ROWS = 500  # Rows read between cancellation checks
+
+def process_file(file_path, cancel_token=None, progress_callback=None):
     if not file_path or not os.path.isfile(file_path):
         raise ValueError(f"Invalid file path: {file_path}")
+    # Imported here so the window can open without pandas and openpyxl loaded
+    import pandas as pd
+    import openpyxl
     
     print(f"Processing file: {file_path}")  # Debug print
     try:
         print(f"\nProcessing file: {file_path}")
         
-        # Read the Excel file using openpyxl
-        wb = openpyxl.load_workbook(file_path, data_only=True)
-        sheet = wb.active
-        
-        # Convert openpyxl worksheet to a list of lists, preserving original values
-        data = []
-        for row in sheet.iter_rows():
-            row_data = []
-            for cell in row:
-                if isinstance(cell.value, datetime):
-                    row_data.append(cell.value.strftime('%Y-%m-%d'))
-                elif cell.data_type == 'e':  # Error cell
-                    row_data.append(None)
-                elif cell.data_type == 'f':  # Formula cell
-                    row_data.append(cell.value)
-                else:
-                    row_data.append(cell.value)
-            data.append(row_data)
-        
-        # Create DataFrame from the data
-        df = pd.DataFrame(data[1:], columns=data[0])
+        with span('read', file=os.path.basename(file_path), bytes=os.path.getsize(file_path)) as read_span:
+            # Read the Excel file using openpyxl; read-only mode streams the rows so
+            # cancellation can be checked while reading
+            wb = openpyxl.load_workbook(file_path, data_only=True, read_only=True)
+            sheet = wb.active
+
+            # Convert openpyxl worksheet to a list of lists, preserving original values
+            data = []
+            # Read-only sheets know their size when the file has a dimension record
+            max_row = sheet.max_row if progress_callback is not None else None
+            for row_number, row in enumerate(sheet.iter_rows()):
+                if row_number % CANCEL_CHECK_ROWS == 0:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    if max_row:
+                        progress_callback(min(row_number / max_row, 1.0))
+                row_data = []
+                for cell in row:
+                    if isinstance(cell.value, datetime):
+                        row_data.append(cell.value.strftime('%Y-%m-%d'))
+                    elif cell.data_type == 'e':  # Error cell
+                        row_data.append(None)
+                    elif cell.data_type == 'f':  # Formula cell
+                        row_data.append(cell.value)
+                    else:
+                        row_data.append(cell.value)
+                data.append(row_data)
+            wb.close()
+
+            # Create DataFrame from the data
+            df = pd.DataFrame(data[1:], columns=data[0])
+            read_span.set(rows=len(df))
+            record_frame(f"read {os.path.basename(file_path)}", df)
         
         print(f"Original DataFrame shape: {df.shape}")
         print(f"Original DataFrame columns: {df.columns.tolist()}")
@@ -45,16 +59,19 @@ def process_file(file_path):
         date_columns = [col for col in df.columns if col not in index_columns]
         print(f"Identified date columns: {date_columns}")
 
-        # Melt the dataframe to long format
-        df_melted = df.melt(id_vars=index_columns, 
-                            var_name='forecast_period_start', 
-                            value_name='value')
-        
-        # Ensure forecast_period_start is datetime
-        df_melted['forecast_period_start'] = pd.to_datetime(df_melted['forecast_period_start'], format='%Y-%m-%d', errors='coerce')
-        
-        # Drop rows with invalid dates
-        df_melted = df_melted.dropna(subset=['forecast_period_start'])
+        with span('melt', rows=len(df)) as melt_span:
+            # Melt the dataframe to long format
+            df_melted = df.melt(id_vars=index_columns,
+                                var_name='forecast_period_start',
+                                value_name='value')
+
+            # Ensure forecast_period_start is datetime
+            df_melted['forecast_period_start'] = pd.to_datetime(df_melted['forecast_period_start'], format='%Y-%m-%d', errors='coerce')
+
+            # Drop rows with invalid dates
+            df_melted = df_melted.dropna(subset=['forecast_period_start'])
+            melt_span.set(output_rows=len(df_melted))
+            record_frame(f"melt {os.path.basename(file_path)}", df_melted)
         
         print(f"Melted DataFrame shape: {df_melted.shape}")
         print(f"Melted DataFrame columns: {df_melted.columns.tolist()}")
@@ -66,6 +83,8 @@ def process_file(file_path):
 
         return df_melted
     except Exception as e:
+        if cancel_token is not None and cancel_token.is_cancelled():
+            raise
         print(f"Error processing file {file_path}: {str(e)}")
         return None
 
@@ -85,11 +104,13 @@ def validate_file(file_path):
 
 def clean_data(value):
     if isinstance(value, (int, float)):
+        import numpy as np
         if np.isnan(value) or np.isinf(value):
             return ''  # Convert NaN and Inf to empty string
     return value
 
 def merge_excel_files(file_paths, temp_dir, progress_callback):
+    import pandas as pd
     total_files = len(file_paths)
     merged_output_file = os.path.join(temp_dir, 'merged_data.xlsx')
     
@@ -152,6 +173,8 @@ def get_planning_week(file_name):
     return int(match.group(1)) if match else None
 
 def save_file_with_retry(self, pivot_table, suggested_filename):
+    from PyQt6.QtWidgets import QFileDialog, QMessageBox
+
     while True:
         file_path, _ = QFileDialog.getSaveFileName(
             self, "Save Summary File", suggested_filename, "Excel Files (*.xlsx)"
@@ -0,0 +1,31 @@
+import os
+import hashlib
+
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+
+def file_fingerprint(file_path):
+    # Fast content fingerprint: the file size plus hashes of the first,
+    # middle and last blocks. xlsx files keep their zip directory at the end,
+    # so any content change also changes the last block.
+    size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode())
+    with open(file_path, 'rb') as f:
+        if size <= 3 * SAMPLE_BLOCK_SIZE:
+            digest.update(f.read())
+        else:
+            for offset in (0, size // 2, size - SAMPLE_BLOCK_SIZE):
+                f.seek(offset)
+                digest.update(f.read(SAMPLE_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def file_content_hash(file_path, chunk_size=1024 * 1024):
+    # Hash of the whole file, for when the sampled fingerprint is not enough,
+    # e.g. before a queued file is dropped as a duplicate
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
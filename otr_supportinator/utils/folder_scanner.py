@@ -0,0 +1,187 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from .path_filters import parse_include_patterns, iter_candidate_files, stat_file
+from .workbook_metadata import scan_input_metadata
+
+# Stat calls on the W: share are dominated by round trips, so many can be
+# in flight at once
+STAT_WORKERS = 16
+BATCH_SIZE = 50
+BATCH_INTERVAL = 0.25
+# Each metadata scan opens a workbook, so fewer of them run at once
+METADATA_WORKERS = 4
+
+
+class FolderScanWorker(QThread):
+    files_found = pyqtSignal(list)
+    scan_finished = pyqtSignal(int)
+
+    def __init__(self, paths, patterns=None, extensions=None, parent=None):
+        super().__init__(parent)
+        self.paths = list(paths)
+        self.patterns = patterns
+        self.extensions = extensions
+        self.cancelled = False
+
+    def run(self):
+        found = 0
+        batch = []
+        last_emit = time.monotonic()
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=STAT_WORKERS) as pool:
+            candidates = iter_candidate_files(self.paths, self.patterns, self.extensions, lambda: self.cancelled)
+            for path in candidates:
+                pending.append(pool.submit(stat_file, path))
+                # Collect finished stats in discovery order, and keep the
+                # number in flight bounded
+                while pending and (pending[0].done() or len(pending) >= STAT_WORKERS * 4):
+                    result = pending.popleft().result()
+                    if result:
+                        batch.append(result)
+                if batch and (len(batch) >= BATCH_SIZE or time.monotonic() - last_emit >= BATCH_INTERVAL):
+                    found += len(batch)
+                    self.files_found.emit(batch)
+                    batch = []
+                    last_emit = time.monotonic()
+                if self.cancelled:
+                    break
+
+            while pending and not self.cancelled:
+                result = pending.popleft().result()
+                if result:
+                    batch.append(result)
+            for future in pending:
+                future.cancel()
+
+        if batch and not self.cancelled:
+            found += len(batch)
+            self.files_found.emit(batch)
+        self.scan_finished.emit(found)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FolderImporter(QObject):
+    # Runs folder scans for a file list widget and hands results back in batches
+    files_found = pyqtSignal(list)
+    status_changed = pyqtSignal(str)
+
+    def __init__(self, extensions=None, parent=None):
+        super().__init__(parent)
+        self.extensions = extensions
+        self.include_patterns = []
+        self.workers = []
+
+    def set_include_patterns(self, text):
+        self.include_patterns = parse_include_patterns(text)
+
+    def import_paths(self, paths, patterns=None):
+        paths = [path for path in paths if path]
+        if not paths:
+            return
+        worker = FolderScanWorker(paths, self.include_patterns if patterns is None else patterns,
+                                  self.extensions, self)
+        worker.files_found.connect(lambda batch, worker=worker: self.on_files_found(worker, batch))
+        worker.scan_finished.connect(lambda count, worker=worker: self.on_scan_finished(worker, count))
+        self.workers.append(worker)
+        self.status_changed.emit("Scanning for input files...")
+        worker.start()
+
+    def on_files_found(self, worker, batch):
+        # Batches queued before cancel_all() arrive after it; they must not
+        # put files back into a list that was just cleared
+        if not worker.cancelled:
+            self.files_found.emit(batch)
+
+    def on_scan_finished(self, worker, count):
+        if worker in self.workers:
+            self.workers.remove(worker)
+        worker.wait()
+        worker.deleteLater()
+        self.status_changed.emit(f"Found {count} input file{'s' if count != 1 else ''}")
+
+    def is_scanning(self):
+        return bool(self.workers)
+
+    def cancel_all(self):
+        for worker in self.workers:
+            worker.cancel()
+        for worker in self.workers:
+            worker.wait()
+
+
+class MetadataScanWorker(QThread):
+    # Reads the metadata preflight of added files; results come back in
+    # batches as (path, metadata, error)
+    metadata_scanned = pyqtSignal(list)
+
+    def __init__(self, file_paths, parent=None):
+        super().__init__(parent)
+        self.file_paths = list(file_paths)
+        self.cancelled = False
+
+    def run(self):
+        batch = []
+        last_emit = time.monotonic()
+        with ThreadPoolExecutor(max_workers=METADATA_WORKERS) as pool:
+            futures = [(path, pool.submit(scan_input_metadata, path)) for path in self.file_paths]
+            for path, future in futures:
+                if self.cancelled:
+                    break
+                try:
+                    batch.append((path, future.result(), None))
+                except Exception as e:
+                    batch.append((path, None, str(e)))
+                if len(batch) >= BATCH_SIZE or time.monotonic() - last_emit >= BATCH_INTERVAL:
+                    self.metadata_scanned.emit(batch)
+                    batch = []
+                    last_emit = time.monotonic()
+            for path, future in futures:
+                future.cancel()
+
+        if batch and not self.cancelled:
+            self.metadata_scanned.emit(batch)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class MetadataScanner(QObject):
+    # Keeps metadata scans off the UI thread for a file list widget
+    metadata_scanned = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.workers = []
+
+    def scan(self, file_paths):
+        if not file_paths:
+            return
+        worker = MetadataScanWorker(file_paths, self)
+        worker.metadata_scanned.connect(lambda batch, worker=worker: self.on_metadata_scanned(worker, batch))
+        worker.finished.connect(lambda worker=worker: self.on_scan_finished(worker))
+        self.workers.append(worker)
+        worker.start()
+
+    def on_metadata_scanned(self, worker, batch):
+        if not worker.cancelled:
+            self.metadata_scanned.emit(batch)
+
+    def on_scan_finished(self, worker):
+        if worker in self.workers:
+            self.workers.remove(worker)
+        worker.wait()
+        worker.deleteLater()
+
+    def is_scanning(self):
+        return bool(self.workers)
+
+    def cancel_all(self):
+        # Scans already opening a workbook finish in the background; their
+        # results are dropped
+        for worker in self.workers:
+            worker.cancel()
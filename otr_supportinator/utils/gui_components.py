@@ -5,6 +5,9 @@ from PyQt6.QtWidgets import (QLabel, QListWidget, QVBoxLayout, QPushButton,
                              QProgressDialog, QDialog, QProgressBar)
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtGui import QDragEnterEvent, QDropEvent, QMouseEvent
+from .folder_scanner import FolderImporter
+from .file_registry import FileRegistry
+from .input_readers import EXCEL_EXTENSIONS
 
 class DropLabel(QLabel):
     file_dropped = pyqtSignal(str)
@@ -93,6 +96,14 @@ class FileDropArea(QWidget):
         self.file_list = QListWidget()
         self.file_list.setMinimumWidth(400)  # Adjust as needed
         self.layout.addWidget(self.file_list)
+
+        # Dropped folders and file checks are handled off the UI thread
+        self.importer = FolderImporter(EXCEL_EXTENSIONS, self)
+        self.importer.files_found.connect(self.add_files)
+        self.importer.status_changed.connect(lambda status: self.update_label())
+
+        self.registry = FileRegistry(self)
+        self.registry.duplicates_found.connect(self.remove_duplicates)
         
         self.setStyleSheet("""
             FileDropArea {
@@ -124,8 +135,7 @@ class FileDropArea(QWidget):
 
     def dropEvent(self, event: QDropEvent):
         self.reset_style()
-        files = [u.toLocalFile() for u in event.mimeData().urls() if u.toLocalFile().endswith(('.xlsx', '.xls'))]
-        self.add_files(files)
+        self.importer.import_paths([u.toLocalFile() for u in event.mimeData().urls()])
 
     def reset_style(self):
         self.setStyleSheet("""
@@ -143,28 +153,54 @@ class FileDropArea(QWidget):
 
     def browse_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Select Excel Files", "", "Excel Files (*.xlsx *.xls)")
-        self.add_files(files)
+        self.importer.import_paths(files)
+
+    def browse_folder(self, default_dir=""):
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder", default_dir)
+        if folder:
+            self.importer.import_paths([folder])
 
     def add_files(self, files):
+        # Paths come from the folder importer, which has already checked them
+        self.file_list.setUpdatesEnabled(False)
         for file in files:
-            if file and os.path.isfile(file):  # Check if file exists
+            if file and self.registry.add(file):
                 item = QListWidgetItem(os.path.basename(file))
                 item.setData(Qt.ItemDataRole.UserRole, file)
                 self.file_list.addItem(item)
-            else:
-                print(f"Invalid file: {file}")  # Debug print
+        self.file_list.setUpdatesEnabled(True)
         
         self.update_label()
         
         if files:
             self.files_added.emit()
 
+    def file_paths(self):
+        return [self.file_list.item(i).data(Qt.ItemDataRole.UserRole) for i in range(self.file_list.count())]
+
+    def remove_files(self, file_paths):
+        file_paths = set(file_paths)
+        for row in reversed(range(self.file_list.count())):
+            if self.file_list.item(row).data(Qt.ItemDataRole.UserRole) in file_paths:
+                self.file_list.takeItem(row)
+        for file_path in file_paths:
+            self.registry.remove(file_path)
+        self.update_label()
+
+    def remove_duplicates(self, duplicates):
+        self.remove_files([path for path, existing in duplicates])
+        show_duplicates_message(self, duplicates)
+        self.files_cleared.emit()
+
     def update_label(self):
         count = self.file_list.count()
-        self.label.setText(f"{count} file{'s' if count != 1 else ''} selected")
+        scanning = " (scanning folders...)" if self.importer.is_scanning() else ""
+        self.label.setText(f"{count} file{'s' if count != 1 else ''} selected{scanning}")
 
     def clear_all_files(self):
+        self.importer.cancel_all()
         self.file_list.clear()
+        self.registry.clear()
         self.update_label()
         self.files_cleared.emit()
 
@@ -215,6 +251,14 @@ class FileProcessingDialog(QDialog):
         self.label.setText(message)
 
 
+def show_duplicates_message(parent, duplicates):
+    lines = [f"{os.path.basename(path)} (same content as {existing})" for path, existing in duplicates[:20]]
+    if len(duplicates) > 20:
+        lines.append(f"... and {len(duplicates) - 20} more")
+    QMessageBox.warning(parent, "Duplicate Files",
+                        "These files were removed from the list because an identical file is already queued:\n\n"
+                        + "\n".join(lines))
+
 def show_error_message(parent, title, message):
     QMessageBox.critical(parent, title, message)
 
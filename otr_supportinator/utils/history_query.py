@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import sqlite3
+from .history_store import HistoryStore, TEXT_COLUMNS, ROLLUP_KEYS, rollup_file_for, write_rollup
+
+# Questions over the history store, e.g. "4 - amflex vans_ask by region for
+# target week 45 across the last 8 planning weeks":
+#   query_history('4 - amflex vans_ask', 45, 'ask', last_weeks=8, group_by='region')
+# The catalog picks the runs (the latest run of each planning week that
+# forecasts the target week), only their files are opened, only the needed
+# columns are read, and per-region rollups stand in for the full pivots
+# whenever no node is involved.
+
+GROUP_BY_OPTIONS = ['region', 'node', None]  # None gives one total per planning week
+DEFAULT_LAST_WEEKS = 8
+
+
+def select_runs(store, plan_type, target_week, last_weeks, regions=None, nodes=None):
+    # Newest planning weeks first. run_keys drops runs that have no rows
+    # for the target week, node or region before any file is touched.
+    conditions = ["k.run_id = r.run_id", "k.amazon_week = ?"]
+    params = [plan_type, target_week]
+    for column, values in (('region', regions), ('node', nodes)):
+        if values:
+            conditions.append(f"k.{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    query = f"""
+        SELECT r.run_id, r.planning_year, r.planning_week, r.created_at, r.data_file
+        FROM runs r
+        WHERE r.plan_type = ?
+          AND r.created_at = (SELECT MAX(latest.created_at) FROM runs latest
+                              WHERE latest.plan_type = r.plan_type
+                                AND latest.planning_year = r.planning_year
+                                AND latest.planning_week = r.planning_week)
+          AND EXISTS (SELECT 1 FROM run_keys k WHERE {' AND '.join(conditions)})
+        ORDER BY r.planning_year DESC, r.planning_week DESC
+        LIMIT ?
+    """
+    with store.catalog() as connection:
+        connection.row_factory = sqlite3.Row
+        return [dict(row) for row in connection.execute(query, params + [last_weeks])]
+
+
+def ensure_rollup(store, run):
+    # Runs stored before rollups existed get theirs built on first use
+    path = os.path.join(store.directory, rollup_file_for(run['data_file']))
+    if not os.path.exists(path):
+        import pyarrow.parquet as pq
+        write_rollup(pq.read_table(os.path.join(store.directory, run['data_file'])), path)
+    return path
+
+
+def query_history(metric, target_week, plan_type, last_weeks=DEFAULT_LAST_WEEKS, group_by='region',
+                  regions=None, nodes=None, store=None):
+    # Returns a dict with 'table' (planning weeks by group), 'rows' (the same
+    # in long form), 'runs' and what it took to answer
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    if group_by not in GROUP_BY_OPTIONS:
+        raise ValueError(f"group_by must be one of {GROUP_BY_OPTIONS}")
+    if metric in TEXT_COLUMNS or metric in ROLLUP_KEYS:
+        raise ValueError(f"{metric} is not a metric")
+    started = time.perf_counter()
+    store = store or HistoryStore()
+    runs = select_runs(store, plan_type, target_week, last_weeks, regions, nodes)
+    use_rollups = group_by != 'node' and not nodes
+    group_columns = ['run_id'] + ([group_by] if group_by else [])
+
+    rows = None
+    if runs:
+        if use_rollups:
+            paths = [ensure_rollup(store, run) for run in runs]
+        else:
+            paths = [os.path.join(store.directory, run['data_file']) for run in runs]
+        # Runs can have different metric columns, and a dataset takes its
+        # schema from the first file; a run without the metric reads as nulls
+        schema = pa.unify_schemas([pq.read_schema(path) for path in paths])
+        if metric not in schema.names:
+            raise ValueError(f"No stored run has a column named {metric}")
+        dataset = ds.dataset(paths, schema=schema, format='parquet')
+        condition = ds.field('amazon_week') == target_week
+        if regions:
+            condition = condition & ds.field('region').isin(regions)
+        if nodes:
+            condition = condition & ds.field('node').isin(nodes)
+        needed = list(dict.fromkeys(group_columns + [metric]))
+        table = dataset.to_table(columns=needed, filter=condition)
+        table = table.set_column(0, 'run_id', pc.cast(table.column('run_id'), 'string'))
+        rows = table.group_by(group_columns).aggregate([(metric, 'sum')]).to_pandas()
+        rows = rows.rename(columns={f"{metric}_sum": 'value'})
+
+    import pandas as pd
+    weeks = pd.DataFrame(runs, columns=['run_id', 'planning_year', 'planning_week', 'created_at', 'data_file'])
+    weeks['planning'] = [f"{year}-W{week:02d}" for year, week in zip(weeks['planning_year'], weeks['planning_week'])]
+    if rows is None:
+        rows = pd.DataFrame(columns=group_columns + ['value'])
+    rows = weeks[['run_id', 'planning']].merge(rows, on='run_id', how='inner')
+    rows = rows.iloc[::-1].reset_index(drop=True)  # Oldest planning week first
+
+    if group_by:
+        table = rows.pivot_table(index='planning', columns=group_by, values='value', aggfunc='sum')
+        table.columns = [str(column) for column in table.columns]
+    else:
+        table = rows.set_index('planning')[['value']].rename(columns={'value': metric})
+    table = table.reindex([label for label in weeks['planning'][::-1]]).reset_index()
+
+    return {
+        'table': table,
+        'rows': rows,
+        'runs': runs,
+        'used_rollups': use_rollups,
+        'files_read': len(runs),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def history_options(store=None):
+    # What the query inputs can offer: plan types, planning weeks and the
+    # metric columns of every run, those of the most recent run first
+    store = store or HistoryStore()
+    with store.catalog() as connection:
+        plan_types = [row[0] for row in connection.execute(
+            "SELECT DISTINCT plan_type FROM runs ORDER BY plan_type")]
+        run_columns = [row[0] for row in connection.execute("SELECT columns FROM runs ORDER BY created_at DESC")]
+        weeks = [row[0] for row in connection.execute(
+            "SELECT DISTINCT amazon_week FROM run_keys WHERE amazon_week IS NOT NULL ORDER BY amazon_week")]
+        run_count = connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+    columns = dict.fromkeys(column for names in run_columns for column in json.loads(names))
+    metrics = [column for column in columns if column not in TEXT_COLUMNS and column not in ROLLUP_KEYS]
+    return {'plan_types': plan_types, 'metrics': metrics, 'amazon_weeks': weeks, 'runs': run_count}
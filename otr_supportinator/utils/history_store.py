@@ -0,0 +1,257 @@
+import os
+import re
+import json
+import uuid
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from datetime import datetime
+from .fingerprint import file_fingerprint
+from .date_utils import get_amazon_week, get_amazon_year
+
+# Every generated pivot is also appended here, so cross-week questions do not
+# need the xlsx files. Layout:
+#   <dir>/catalog.sqlite                                   runs, inputs and key index
+#   <dir>/pivots/plan_type=<type>/planning_week=<year>-<week>/<run id>.parquet
+#   <dir>/rollups/...same partitions...                    metric sums per region and week
+# Data files are never rewritten; a rerun of a week adds a new run.
+# history_query.py answers questions over it.
+HISTORY_DIR_ENV_VAR = 'OTR_HISTORY_DIR'  # A folder, or "off" to disable
+SCHEMA_VERSION = 1
+TEXT_COLUMNS = ['region', 'node', 'cycle', 'forecast_period_start', 'generated_at']
+ROLLUP_KEYS = ['run_id', 'region', 'amazon_week']
+SQLITE_TIMEOUT = 30  # Seconds to wait for another job's write to the catalog
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    planning_year INTEGER NOT NULL,
+    planning_week INTEGER NOT NULL,
+    plan_type TEXT NOT NULL,
+    data_file TEXT NOT NULL,
+    output_file TEXT,
+    rows INTEGER NOT NULL,
+    columns TEXT NOT NULL,
+    schema_version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_partition ON runs (plan_type, planning_year, planning_week);
+CREATE TABLE IF NOT EXISTS run_inputs (
+    run_id TEXT NOT NULL,
+    input_file TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS run_inputs_run ON run_inputs (run_id);
+CREATE INDEX IF NOT EXISTS run_inputs_fingerprint ON run_inputs (fingerprint);
+CREATE TABLE IF NOT EXISTS run_keys (
+    run_id TEXT NOT NULL,
+    region TEXT,
+    node TEXT,
+    amazon_week INTEGER,
+    rows INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS run_keys_run ON run_keys (run_id);
+CREATE INDEX IF NOT EXISTS run_keys_node ON run_keys (node);
+CREATE INDEX IF NOT EXISTS run_keys_region ON run_keys (region);
+CREATE INDEX IF NOT EXISTS run_keys_week ON run_keys (amazon_week);
+"""
+
+
+def get_history_directory():
+    value = os.environ.get(HISTORY_DIR_ENV_VAR)
+    if value and value.strip().lower() in ('0', 'off', 'false', 'no'):
+        return None
+    return value or os.path.join(os.path.expanduser("~"), ".otr_supportinator", "history")
+
+
+def planning_year_for(planning_week, now=None):
+    # The year is not in the file names; take the run date's Amazon year,
+    # moved by one when the planning week is more than half a year away
+    now = now or datetime.now()
+    year = get_amazon_year(now)
+    current_week = get_amazon_week(now)
+    if planning_week - current_week > 26:
+        year -= 1
+    elif current_week - planning_week > 26:
+        year += 1
+    return year
+
+
+def partition_name(value):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', str(value))
+
+
+def rollup_file_for(data_file):
+    return data_file.replace('pivots', 'rollups', 1)
+
+
+def metric_columns(table):
+    return [name for name in table.column_names if name not in TEXT_COLUMNS and name not in ROLLUP_KEYS]
+
+
+def write_rollup(table, path):
+    # Sums of every metric per region and Amazon week; most questions are
+    # asked at that level and it is a few hundred rows instead of thousands
+    import pyarrow.parquet as pq
+    metrics = metric_columns(table)
+    rollup = table.group_by(ROLLUP_KEYS).aggregate([(metric, 'sum') for metric in metrics])
+    renamed = {f"{metric}_sum": metric for metric in metrics}
+    rollup = rollup.rename_columns([renamed.get(name, name) for name in rollup.column_names])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(rollup.select(ROLLUP_KEYS + metrics), path + '.partial', compression='zstd')
+    os.replace(path + '.partial', path)
+
+
+class HistoryStore:
+    def __init__(self, directory=None):
+        self.directory = directory or get_history_directory()
+        self.catalog_path = os.path.join(self.directory, 'catalog.sqlite')
+        os.makedirs(os.path.join(self.directory, 'pivots'), exist_ok=True)
+        with self.catalog() as connection:
+            connection.executescript(CATALOG_SCHEMA)
+
+    @contextmanager
+    def catalog(self):
+        # One transaction per use; WAL lets readers run while a job appends
+        with closing(sqlite3.connect(self.catalog_path, timeout=SQLITE_TIMEOUT)) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                yield connection
+
+    def to_arrow(self, pivot_table, run_id):
+        import pandas as pd
+        import pyarrow as pa
+        # Metric columns hold None for gaps and can be object dtype; they are
+        # stored as float64 so every run has the same schema
+        columns = {'run_id': pa.array([run_id] * len(pivot_table)).dictionary_encode()}
+        for column in pivot_table.columns:
+            values = pivot_table[column]
+            if column in TEXT_COLUMNS:
+                columns[column] = pa.array(values.astype(object).where(values.notna(), None), type=pa.string())
+            elif column == 'amazon_week':
+                columns[column] = pa.array(values, type=pa.int16())
+            else:
+                columns[column] = pa.array(pd.to_numeric(values, errors='coerce'), type=pa.float64())
+        return pa.table(columns)
+
+    def append(self, pivot_table, planning_week, plan_type, input_files=None, output_file=None, created_at=None):
+        # Writes the pivot as a new run and returns its run id
+        run = self.write_run(pivot_table, planning_week, plan_type, input_files, created_at)
+        return self.record_run(run, output_file)
+
+    def write_run(self, pivot_table, planning_week, plan_type, input_files=None, created_at=None):
+        # Writes the data and rollup files only; the run is not visible to
+        # queries until record_run() adds it to the catalog
+        import pyarrow.parquet as pq
+        created_at = created_at or datetime.now()
+        planning_year = planning_year_for(planning_week, created_at)
+        run_id = f"{created_at.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        data_file = os.path.join('pivots', f"plan_type={partition_name(plan_type)}",
+                                 f"planning_week={planning_year}-{planning_week:02d}", f"{run_id}.parquet")
+        path = os.path.join(self.directory, data_file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        run = {'run_id': run_id, 'created_at': created_at, 'planning_year': planning_year,
+               'planning_week': planning_week, 'plan_type': plan_type, 'data_file': data_file,
+               'rows': len(pivot_table), 'columns': list(pivot_table.columns)}
+        try:
+            table = self.to_arrow(pivot_table, run_id)
+            pq.write_table(table, path + '.partial', compression='zstd')
+            os.replace(path + '.partial', path)
+            write_rollup(table, os.path.join(self.directory, rollup_file_for(data_file)))
+
+            keys = (pivot_table.groupby(['region', 'node', 'amazon_week'], dropna=False).size()
+                    .reset_index(name='rows'))
+            run['keys'] = [(run_id, region, node, None if week != week else int(week), int(rows))
+                           for region, node, week, rows in keys.itertuples(index=False)]
+            run['inputs'] = [(run_id, input_file, file_fingerprint(read_path), os.path.getsize(read_path))
+                             for input_file, read_path in input_files or []]
+        except BaseException:
+            self.discard_run(run)
+            raise
+        return run
+
+    def record_run(self, run, output_file=None):
+        with self.catalog() as connection:
+            connection.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run['run_id'], run['created_at'].strftime('%Y-%m-%d %H:%M:%S'), run['planning_year'],
+                 run['planning_week'], run['plan_type'], run['data_file'].replace(os.sep, '/'), output_file,
+                 run['rows'], json.dumps(run['columns']), SCHEMA_VERSION))
+            connection.executemany("INSERT INTO run_inputs VALUES (?, ?, ?, ?)", run['inputs'])
+            connection.executemany("INSERT INTO run_keys VALUES (?, ?, ?, ?, ?)", run['keys'])
+        return run['run_id']
+
+    def discard_run(self, run):
+        # Removes the files of a run that never made it into the catalog
+        path = os.path.join(self.directory, run['data_file'])
+        for data_path in (path, os.path.join(self.directory, rollup_file_for(run['data_file']))):
+            for candidate in (data_path, data_path + '.partial'):
+                try:
+                    os.remove(candidate)
+                except FileNotFoundError:
+                    pass
+
+    def runs(self, plan_type=None):
+        query = "SELECT * FROM runs"
+        params = []
+        if plan_type:
+            query += " WHERE plan_type = ?"
+            params.append(plan_type)
+        with self.catalog() as connection:
+            connection.row_factory = sqlite3.Row
+            return [dict(row) for row in connection.execute(
+                query + " ORDER BY planning_year, planning_week, created_at", params)]
+
+
+class HistoryAppend:
+    # Writes the run's files on a background thread while the xlsx is saved.
+    # The catalog rows are only added by commit(), once the save succeeded;
+    # discard() removes the files when it did not.
+    def __init__(self, pivot_table, planning_week, plan_type, input_files, directory=None):
+        self.store = None
+        self.run = None
+        self.error = None
+        self.thread = threading.Thread(target=self.write, name='history-append', daemon=True,
+                                       args=(pivot_table, planning_week, plan_type, input_files, directory))
+        self.thread.start()
+
+    def write(self, pivot_table, planning_week, plan_type, input_files, directory):
+        try:
+            self.store = HistoryStore(directory)
+            self.run = self.store.write_run(pivot_table, planning_week, plan_type, input_files)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    def commit(self, output_file):
+        # Returns the run id, or None with error set
+        self.thread.join()
+        if self.run is None:
+            return None
+        try:
+            return self.store.record_run(self.run, output_file)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.store.discard_run(self.run)
+            return None
+
+    def discard(self):
+        self.thread.join()
+        if self.run is not None:
+            self.store.discard_run(self.run)
+            self.run = None
+
+
+def start_history_append(pivot_table, planning_week, plan_type, input_files):
+    # None when the store is switched off, pyarrow is missing or the planning
+    # week is unknown; the run itself never depends on the history
+    directory = get_history_directory()
+    if directory is None or planning_week is None:
+        return None
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        print("pyarrow is not installed; the run is not added to the history store")
+        return None
+    return HistoryAppend(pivot_table, planning_week, plan_type, input_files, directory)
@@ -0,0 +1,143 @@
+import os
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+PARQUET_EXTENSIONS = ('.parquet',)
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+CSV_EXTENSIONS = ('.csv',)
+SUPPORTED_INPUT_EXTENSIONS = EXCEL_EXTENSIONS + PARQUET_EXTENSIONS + ARROW_EXTENSIONS + CSV_EXTENSIONS
+INPUT_FILE_FILTER = "Summary Files (" + " ".join(f"*{ext}" for ext in SUPPORTED_INPUT_EXTENSIONS) + ")"
+
+# Rough in-memory DataFrame size relative to the file on disk
+MEMORY_FACTORS = {
+    '.xlsx': 10,
+    '.xls': 4,
+    '.parquet': 6,
+    '.arrow': 1.5,
+    '.feather': 1.5,
+    '.ipc': 1.5,
+    '.csv': 2,
+}
+# Rough peak of a full openpyxl load relative to the file size
+OPENPYXL_MEMORY_FACTOR = 20
+XLSX_BYTES_PER_CELL = 7  # Compressed size of a typical summary file cell
+CANCEL_CHECK_ROWS = 1000  # Rows streamed between cancellation checks
+
+
+def get_extension(file_path):
+    return os.path.splitext(file_path)[1].lower()
+
+
+def is_supported_input(file_path):
+    return get_extension(file_path) in SUPPORTED_INPUT_EXTENSIONS
+
+
+def is_columnar_input(file_path):
+    return get_extension(file_path) in PARQUET_EXTENSIONS + ARROW_EXTENSIONS + CSV_EXTENSIONS
+
+
+def estimate_in_memory_size(file_path):
+    return os.path.getsize(file_path) * MEMORY_FACTORS.get(get_extension(file_path), 10)
+
+
+def read_summary_input(file_path, columns=None, cancel_token=None):
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+    if is_columnar_input(file_path):
+        table = _dates_as_text(read_arrow_table(file_path, columns))
+        # self_destruct lets Arrow free each column as soon as it is converted
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    import pandas as pd
+    if cancel_token is None or get_extension(file_path) != '.xlsx':
+        return pd.read_excel(file_path, usecols=columns)
+    return _read_xlsx_cancellable(file_path, columns, cancel_token)
+
+
+def _read_xlsx_cancellable(file_path, columns, cancel_token):
+    # Streams the sheet like pd.read_excel does internally, but checks for
+    # cancellation between batches of rows
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        data = []
+        for row_number, row in enumerate(rows):
+            if row_number % CANCEL_CHECK_ROWS == 0:
+                cancel_token.raise_if_cancelled()
+            data.append(row)
+    finally:
+        wb.close()
+
+    # Trailing empty rows and columns are dropped the same way read_excel does
+    while header and header[-1] is None:
+        header.pop()
+    df = pd.DataFrame([row[:len(header)] for row in data], columns=header)
+    df = df.dropna(how='all')
+    return df[columns] if columns else df
+
+
+def _dates_as_text(table):
+    # The xlsx summary files store forecast_period_start as 'YYYY-MM-DD' text,
+    # so typed dates are converted back to keep the outputs identical
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for index, field in enumerate(table.schema):
+        if pa.types.is_date(field.type) or pa.types.is_timestamp(field.type):
+            column = table.column(index)
+            if pa.types.is_date(field.type):
+                column = column.cast(pa.timestamp('s'))
+            table = table.set_column(index, field.name, pc.strftime(column, format='%Y-%m-%d'))
+    return table
+
+
+def read_arrow_table(file_path, columns=None):
+    import pyarrow as pa
+
+    extension = get_extension(file_path)
+    if extension in PARQUET_EXTENSIONS:
+        import pyarrow.parquet as pq
+        return pq.read_table(file_path, columns=columns, memory_map=True)
+
+    if extension in ARROW_EXTENSIONS:
+        source = pa.memory_map(file_path, 'r')
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            # Streaming format rather than the random-access file format
+            source.seek(0)
+            table = pa.ipc.open_stream(source).read_all()
+        return table.select(columns) if columns else table
+
+    import pyarrow.csv as pv
+    convert_options = pv.ConvertOptions(include_columns=columns) if columns else None
+    return pv.read_csv(file_path, convert_options=convert_options)
+
+
+def read_input_schema(file_path):
+    import pyarrow as pa
+
+    extension = get_extension(file_path)
+    if extension in PARQUET_EXTENSIONS:
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(file_path)
+        return parquet_file.schema_arrow.names, parquet_file.metadata.num_rows
+
+    if extension in ARROW_EXTENSIONS:
+        with pa.memory_map(file_path, 'r') as source:
+            try:
+                reader = pa.ipc.open_file(source)
+                num_rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+                return reader.schema.names, num_rows
+            except pa.ArrowInvalid:
+                source.seek(0)
+                table = pa.ipc.open_stream(source).read_all()
+                return table.schema.names, table.num_rows
+
+    import pyarrow.csv as pv
+    with pv.open_csv(file_path) as reader:
+        return reader.schema.names, None
@@ -0,0 +1,98 @@
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                             QHeaderView, QProgressBar, QPushButton, QComboBox, QLabel)
+from PyQt6.QtCore import Qt
+from .job_scheduler import PRIORITY_NAMES
+
+COLUMNS = ["#", "Job", "Priority", "Status", "Progress", "Details", ""]
+
+
+class JobQueuePanel(QWidget):
+    def __init__(self, scheduler, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        header_layout = QHBoxLayout()
+        self.summary_label = QLabel()
+        header_layout.addWidget(self.summary_label)
+        header_layout.addStretch(1)
+        self.clear_finished_button = QPushButton("Clear Finished")
+        self.clear_finished_button.clicked.connect(self.scheduler.clear_finished)
+        header_layout.addWidget(self.clear_finished_button)
+        layout.addLayout(header_layout)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        header = self.table.horizontalHeader()
+        for column in range(len(COLUMNS)):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(5, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+
+        self.scheduler.job_added.connect(self.add_job)
+        self.scheduler.job_updated.connect(self.update_job)
+        self.scheduler.job_removed.connect(self.remove_job)
+        self.update_summary()
+
+    def add_job(self, job):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+
+        self.table.setItem(row, 0, QTableWidgetItem(str(job.job_id)))
+        self.table.setItem(row, 1, QTableWidgetItem(job.title))
+
+        priority_combo = QComboBox()
+        for priority, name in PRIORITY_NAMES.items():
+            priority_combo.addItem(name, priority)
+        priority_combo.setCurrentIndex(priority_combo.findData(job.priority))
+        priority_combo.currentIndexChanged.connect(
+            lambda index, job=job, combo=priority_combo: self.scheduler.set_priority(job, combo.itemData(index)))
+        self.table.setCellWidget(row, 2, priority_combo)
+
+        self.table.setItem(row, 3, QTableWidgetItem(job.status))
+
+        progress_bar = QProgressBar()
+        progress_bar.setRange(0, 100)
+        self.table.setCellWidget(row, 4, progress_bar)
+
+        self.table.setItem(row, 5, QTableWidgetItem(job.message))
+
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(lambda checked, job=job: self.scheduler.cancel(job))
+        self.table.setCellWidget(row, 6, cancel_button)
+
+        self.update_job(job)
+
+    def find_row(self, job):
+        for row in range(self.table.rowCount()):
+            if self.table.item(row, 0).text() == str(job.job_id):
+                return row
+        return None
+
+    def update_job(self, job):
+        row = self.find_row(job)
+        if row is None:
+            return
+        self.table.item(row, 3).setText(job.status)
+        self.table.item(row, 5).setText(job.message)
+        self.table.item(row, 5).setToolTip(job.result_summary or job.message)
+        self.table.cellWidget(row, 4).setValue(job.progress)
+        self.table.cellWidget(row, 2).setEnabled(job.status == "Queued")
+        self.table.cellWidget(row, 6).setEnabled(not job.is_finished())
+        self.update_summary()
+
+    def remove_job(self, job):
+        row = self.find_row(job)
+        if row is not None:
+            self.table.removeRow(row)
+        self.update_summary()
+
+    def update_summary(self):
+        self.summary_label.setText(
+            f"{len(self.scheduler.running)} running, {len(self.scheduler.queued)} queued "
+            f"(up to {self.scheduler.max_concurrent_jobs} at a time)")
@@ -0,0 +1,207 @@
+import os
+import time
+import queue
+import multiprocessing
+from PyQt6.QtCore import QThread, pyqtSignal
+from ..engine.jobs import run_job_in_child
+from .memory_governor import get_memory_governor
+from .staging import get_staging_manager
+
+CANCEL_GRACE_SECONDS = 0.75  # Time the job gets to stop on its own before it is killed
+POLL_INTERVAL = 0.05
+RESERVE_TIMEOUT = 60
+# Progress relayed to the UI at most this often; updates in between are
+# coalesced so a chatty job cannot flood the event loop
+PROGRESS_EMIT_INTERVAL = 0.1
+
+
+class JobRunner(QThread):
+    # Runs an engine job in a child process so pandas and openpyxl never hold
+    # the GIL of the UI process. This thread only relays messages.
+    progress_updated = pyqtSignal(int, str)
+    error_occurred = pyqtSignal(str)
+    job_succeeded = pyqtSignal(object)
+    job_failed = pyqtSignal(str)
+    job_cancelled = pyqtSignal()
+
+    def __init__(self, job_name, job_kwargs, memory_estimate=0, parent=None):
+        super().__init__(parent)
+        self.job_name = job_name
+        self.job_kwargs = job_kwargs
+        self.memory_estimate = memory_estimate
+        self.memory_reserved = False  # Read by the scheduler
+        self.cancel_event = None
+        self.cancel_requested_at = None
+        self.replies = None
+        self.partial_outputs = set()
+        self.staged_inputs = []
+        self.trace_file = None
+        self.rows_processed = 0
+        self.pending_progress = None
+        self.last_progress_emit = 0.0
+
+    def prepare(self):
+        # Runs in this thread before the job process starts, e.g. to ask the
+        # user for a save location. Returning False aborts the job.
+        return True
+
+    def stage_inputs(self, file_paths):
+        # Waits in this thread for the local copies of the inputs and returns
+        # {source: local path} for the job. The copies stay reserved until the
+        # job ends. Returns None if the job was cancelled while waiting.
+        staging = get_staging_manager()
+        if staging is None:
+            return {}
+        self.progress_updated.emit(0, "Waiting for local copies of the input files...")
+        local_paths = staging.acquire_local_copies(
+            file_paths,
+            cancel_check=lambda: self.cancel_requested_at is not None,
+            progress_callback=lambda done, total: self.progress_updated.emit(
+                0, f"Staged {done} of {total} input files"))
+        if local_paths is not None:
+            self.staged_inputs = list(local_paths)
+        return local_paths
+
+    def release_staged_inputs(self):
+        staging = get_staging_manager()
+        if staging is not None:
+            staging.release_all(self.staged_inputs)
+        self.staged_inputs = []
+
+    def handle_request(self, kind, args):
+        raise NotImplementedError(f"Unhandled job request: {kind}")
+
+    def handle_result(self, result):
+        pass
+
+    def describe_result(self, result):
+        return "Completed"
+
+    def run(self):
+        reservation = None
+        try:
+            if not self.prepare():
+                self.job_cancelled.emit()
+                return
+            if self.cancel_requested_at is not None:
+                self.job_cancelled.emit()
+                return
+
+            governor = get_memory_governor()
+            if self.memory_estimate:
+                reservation = governor.reserve(self.memory_estimate, owner=self.job_name, timeout=RESERVE_TIMEOUT)
+            self.memory_reserved = reservation is not None
+            memory_budget = reservation.nbytes if reservation is not None else governor.available()
+
+            mp_context = multiprocessing.get_context('spawn')
+            events = mp_context.Queue()
+            self.replies = mp_context.Queue()
+            self.cancel_event = mp_context.Event()
+            if self.cancel_requested_at is not None:
+                self.cancel_event.set()
+
+            process = mp_context.Process(
+                target=run_job_in_child,
+                args=(self.job_name, self.job_kwargs, events, self.replies, self.cancel_event, memory_budget),
+                daemon=True,
+            )
+            process.start()
+            self.monitor(process, events)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+            self.job_failed.emit(str(e))
+        finally:
+            if reservation is not None:
+                reservation.release()
+            self.release_staged_inputs()
+
+    def monitor(self, process, events):
+        while True:
+            try:
+                kind, payload = events.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                self.flush_progress()
+                if (self.cancel_requested_at is not None
+                        and time.monotonic() - self.cancel_requested_at > CANCEL_GRACE_SECONDS):
+                    # The job is stuck in a step without cancellation points;
+                    # killing the process is safe because outputs are only
+                    # ever committed by rename
+                    process.terminate()
+                    process.join()
+                    self.remove_partial_outputs()
+                    self.job_cancelled.emit()
+                    return
+                if not process.is_alive():
+                    message = f"The {self.job_name} job stopped unexpectedly (exit code {process.exitcode})"
+                    self.remove_partial_outputs()
+                    self.error_occurred.emit(message)
+                    self.job_failed.emit(message)
+                    return
+                continue
+
+            if self.handle_event(kind, payload):
+                process.join()
+                return
+
+    def flush_progress(self):
+        if self.pending_progress is not None:
+            self.progress_updated.emit(*self.pending_progress)
+            self.pending_progress = None
+            self.last_progress_emit = time.monotonic()
+
+    def handle_event(self, kind, payload):
+        if kind == 'progress':
+            self.pending_progress = payload
+            if time.monotonic() - self.last_progress_emit >= PROGRESS_EMIT_INTERVAL:
+                self.flush_progress()
+            return False
+        # Anything else may change what the user sees, so the latest
+        # progress goes out first
+        self.flush_progress()
+        if kind == 'error':
+            self.error_occurred.emit(payload)
+        elif kind == 'writing':
+            self.partial_outputs.add(payload)
+        elif kind == 'committed':
+            self.partial_outputs.discard(payload)
+        elif kind == 'request':
+            self.handle_request(*payload)
+        elif kind == 'rows':
+            self.rows_processed += payload
+        elif kind == 'trace':
+            self.trace_file = payload
+            print(f"Trace of the {self.job_name} job written to {payload}")
+        elif kind == 'result':
+            self.handle_result(payload)
+            self.job_succeeded.emit(payload)
+            return True
+        elif kind == 'cancelled':
+            self.remove_partial_outputs()
+            self.job_cancelled.emit()
+            return True
+        elif kind == 'failed':
+            self.remove_partial_outputs()
+            self.error_occurred.emit(payload)
+            self.job_failed.emit(payload)
+            return True
+        return False
+
+    def reply(self, value):
+        if self.replies is not None:
+            self.replies.put(value)
+
+    def cancel(self):
+        if self.cancel_requested_at is None:
+            self.cancel_requested_at = time.monotonic()
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+
+    def remove_partial_outputs(self):
+        for path in self.partial_outputs:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Could not remove partial output {path}: {e}")
+        self.partial_outputs.clear()
@@ -0,0 +1,144 @@
+import os
+import itertools
+from datetime import datetime
+from PyQt6.QtCore import QObject, pyqtSignal
+from .memory_governor import get_memory_governor
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_NAMES = {PRIORITY_HIGH: "High", PRIORITY_NORMAL: "Normal", PRIORITY_LOW: "Low"}
+
+# Each job is a whole process running pandas, so only a few run side by side
+DEFAULT_MAX_CONCURRENT_JOBS = max(1, min(4, (os.cpu_count() or 2) // 2))
+MAX_HISTORY = 50
+
+
+class ScheduledJob:
+    def __init__(self, job_id, runner, title, priority):
+        self.job_id = job_id
+        self.runner = runner
+        self.title = title
+        self.priority = priority
+        self.status = "Queued"
+        self.progress = 0
+        self.message = ""
+        self.result_summary = ""
+        self.submitted_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+    def is_finished(self):
+        return self.status in ("Completed", "Failed", "Cancelled")
+
+
+class JobScheduler(QObject):
+    job_added = pyqtSignal(object)
+    job_updated = pyqtSignal(object)
+    job_removed = pyqtSignal(object)
+
+    def __init__(self, max_concurrent_jobs=DEFAULT_MAX_CONCURRENT_JOBS, parent=None):
+        super().__init__(parent)
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.jobs = []
+        self.queued = []
+        self.running = []
+        self.job_ids = itertools.count(1)
+
+    def submit(self, runner, title, priority=PRIORITY_NORMAL):
+        job = ScheduledJob(next(self.job_ids), runner, title, priority)
+        runner.progress_updated.connect(lambda value, message, job=job: self.on_progress(job, value, message))
+        runner.job_succeeded.connect(lambda result, job=job: self.on_finished(job, "Completed", runner.describe_result(result)))
+        runner.job_failed.connect(lambda message, job=job: self.on_finished(job, "Failed", message))
+        runner.job_cancelled.connect(lambda job=job: self.on_finished(job, "Cancelled", "Cancelled by user"))
+
+        self.jobs.append(job)
+        self.queued.append(job)
+        self.job_added.emit(job)
+        self.start_next_jobs()
+        return job
+
+    def cancel(self, job):
+        if job in self.queued:
+            self.queued.remove(job)
+            self.on_finished(job, "Cancelled", "Removed from queue")
+        elif job in self.running:
+            job.message = "Cancelling..."
+            self.job_updated.emit(job)
+            job.runner.cancel()
+
+    def set_priority(self, job, priority):
+        job.priority = priority
+        self.job_updated.emit(job)
+        self.start_next_jobs()
+
+    def can_start(self, job):
+        # One job always runs, however large; its runner waits for the memory
+        if not self.running:
+            return True
+        if len(self.running) >= self.max_concurrent_jobs:
+            return False
+        # Running jobs hold their memory once their thread has reserved it;
+        # until then their estimate still has to be set aside
+        unreserved = sum(running.runner.memory_estimate for running in self.running
+                         if not running.runner.memory_reserved)
+        return get_memory_governor().available() - unreserved >= job.runner.memory_estimate
+
+    def start_next_jobs(self):
+        while self.queued:
+            # Highest priority first, then in submission order
+            job = min(self.queued, key=lambda queued_job: (queued_job.priority, queued_job.job_id))
+            if not self.can_start(job):
+                return
+            self.queued.remove(job)
+            self.running.append(job)
+            job.status = "Running"
+            job.started_at = datetime.now()
+            self.job_updated.emit(job)
+            job.runner.start()
+
+    def on_progress(self, job, value, message):
+        job.progress = value
+        job.message = message
+        self.job_updated.emit(job)
+
+    def on_finished(self, job, status, summary):
+        if job.is_finished():
+            return
+        if job in self.running:
+            self.running.remove(job)
+        job.status = status
+        job.result_summary = summary
+        job.message = summary
+        job.finished_at = datetime.now()
+        if status == "Completed":
+            job.progress = 100
+        self.job_updated.emit(job)
+        self.trim_history()
+        self.start_next_jobs()
+
+    def trim_history(self):
+        finished = [job for job in self.jobs if job.is_finished()]
+        for job in finished[:max(len(finished) - MAX_HISTORY, 0)]:
+            self.remove(job)
+
+    def remove(self, job):
+        if job.is_finished():
+            self.jobs.remove(job)
+            self.job_removed.emit(job)
+
+    def clear_finished(self):
+        for job in [job for job in self.jobs if job.is_finished()]:
+            self.remove(job)
+
+    def has_active_jobs(self):
+        return bool(self.queued or self.running)
+
+    def wait_for_threads(self):
+        # A finished job's thread can still be cleaning up for a moment
+        for job in self.jobs:
+            job.runner.wait()
+
+    def cancel_all(self):
+        for job in list(self.queued) + list(self.running):
+            self.cancel(job)
@@ -0,0 +1,132 @@
+import os
+import threading
+
+DEFAULT_BUDGET_FRACTION = 0.5
+# Never plan against more than this share of what the OS reports as free
+SYSTEM_HEADROOM = 0.8
+
+
+def system_available_memory():
+    # psutil is only loaded once something plans memory, not at startup
+    import psutil
+    return psutil.virtual_memory().available
+
+
+class MemoryReservation:
+    def __init__(self, governor, nbytes, owner):
+        self.governor = governor
+        self.nbytes = nbytes
+        self.owner = owner
+        self.released = False
+
+    def resize(self, nbytes):
+        # Adjust a reservation once the real footprint is known. Growing is
+        # accounted immediately; the caller has already allocated the memory.
+        self.governor._resize(self, nbytes)
+
+    def release(self):
+        self.governor._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class MemoryGovernor:
+    def __init__(self, budget_bytes=None, budget_fraction=DEFAULT_BUDGET_FRACTION):
+        if budget_bytes is None:
+            budget_bytes = int(system_available_memory() * budget_fraction)
+        self.budget = budget_bytes
+        self.reserved = 0
+        self.reservations = []
+        self.condition = threading.Condition()
+
+    def available(self):
+        with self.condition:
+            return self._available()
+
+    def _available(self):
+        system_available = int(system_available_memory() * SYSTEM_HEADROOM)
+        return max(min(self.budget - self.reserved, system_available), 0)
+
+    def reserve(self, nbytes, owner="", timeout=None):
+        # Blocks until the request fits in the budget. Returns None when the
+        # timeout expires so the caller can spill to disk instead.
+        nbytes = min(int(nbytes), self.budget)
+        with self.condition:
+            # Only wait while another owner holds memory that could come back;
+            # an owner waiting on its own reservations would never wake up
+            self.condition.wait_for(lambda: self._available() >= nbytes or not self._reserved_by_others(owner),
+                                    timeout=timeout)
+            if self._available() < nbytes:
+                return None
+            return self._grant(nbytes, owner)
+
+    def _reserved_by_others(self, owner):
+        return sum(reservation.nbytes for reservation in self.reservations if reservation.owner != owner)
+
+    def try_reserve(self, nbytes, owner=""):
+        return self.reserve(nbytes, owner, timeout=0)
+
+    def _grant(self, nbytes, owner):
+        reservation = MemoryReservation(self, nbytes, owner)
+        self.reserved += nbytes
+        self.reservations.append(reservation)
+        return reservation
+
+    def _resize(self, reservation, nbytes):
+        with self.condition:
+            if reservation.released:
+                return
+            self.reserved += int(nbytes) - reservation.nbytes
+            reservation.nbytes = int(nbytes)
+            self.condition.notify_all()
+
+    def _release(self, reservation):
+        with self.condition:
+            if reservation.released:
+                return
+            reservation.released = True
+            self.reserved -= reservation.nbytes
+            self.reservations.remove(reservation)
+            self.condition.notify_all()
+
+    def chunk_rows(self, bytes_per_row, share=0.1, minimum=1000):
+        # Rows that fit in a share of the memory currently left in the budget
+        bytes_per_row = max(bytes_per_row, 1)
+        return max(int(self.available() * share / bytes_per_row), minimum)
+
+    def max_workers(self, bytes_per_worker, limit=None):
+        limit = limit or os.cpu_count() or 1
+        if bytes_per_worker <= 0:
+            return limit
+        return max(min(int(self.available() // bytes_per_worker), limit), 1)
+
+    def usage_by_owner(self):
+        with self.condition:
+            usage = {}
+            for reservation in self.reservations:
+                usage[reservation.owner] = usage.get(reservation.owner, 0) + reservation.nbytes
+            return usage
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_memory_governor():
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = MemoryGovernor()
+        return _governor
+
+
+def configure_memory_governor(budget_bytes):
+    # Used by job processes, which get their budget from the parent's governor
+    global _governor
+    with _governor_lock:
+        _governor = MemoryGovernor(budget_bytes=budget_bytes)
+        return _governor
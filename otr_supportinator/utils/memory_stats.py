@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import threading
+from . import tracing
+
+# "1" records RSS and Python allocation peaks; "rss" skips tracemalloc,
+# which slows pandas-heavy stages down noticeably
+MEMORY_STATS_ENV_VAR = 'OTR_MEMORY_STATS'
+RSS_SAMPLE_INTERVAL = 0.02
+SUMMARY_STAGES = 8  # Stages listed in the run summary, largest peak first
+
+_stats = None
+
+
+def format_bytes(nbytes):
+    if nbytes is None:
+        return "n/a"
+    for unit in ('B', 'KB', 'MB'):
+        if abs(nbytes) < 1024:
+            return f"{nbytes:.0f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.2f} GB"
+
+
+class RSSSampler:
+    # Tracks the highest RSS seen since the last take_peak()
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        import psutil
+        self.process = psutil.Process()
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.peak = self.current()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='rss-sampler', daemon=True)
+        self.thread.start()
+
+    def current(self):
+        return self.process.memory_info().rss
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            rss = self.current()
+            with self.lock:
+                self.peak = max(self.peak, rss)
+
+    def take_peak(self):
+        # Returns the peak so far and starts a new window at the current RSS
+        rss = self.current()
+        with self.lock:
+            peak, self.peak = max(self.peak, rss), rss
+        return peak, rss
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+
+class StageFrame:
+    def __init__(self, span, rss):
+        self.span = span
+        self.rss_start = rss
+        self.rss_peak = rss
+        self.python_peak = 0
+
+
+class MemoryStats:
+    # Span observer that records the RSS and tracemalloc peaks of every stage
+    # run on the job's main thread. Peaks are windows between span
+    # boundaries, folded into the enclosing stages as spans close.
+    def __init__(self, name, use_tracemalloc=True):
+        self.name = name
+        self.use_tracemalloc = use_tracemalloc
+        self.thread = threading.current_thread()
+        self.stack = []
+        self.stages = []
+        self.frames = []
+        self.started = time.time()
+        self.sampler = RSSSampler()
+        if use_tracemalloc:
+            import tracemalloc
+            tracemalloc.start()
+
+    def close_window(self):
+        # Charges the peaks since the last boundary to the innermost stage
+        rss_peak, rss = self.sampler.take_peak()
+        python_peak = 0
+        if self.use_tracemalloc:
+            import tracemalloc
+            python_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+        if self.stack:
+            frame = self.stack[-1]
+            frame.rss_peak = max(frame.rss_peak, rss_peak)
+            frame.python_peak = max(frame.python_peak, python_peak)
+        return rss
+
+    def span_started(self, span):
+        if threading.current_thread() is not self.thread:
+            return
+        rss = self.close_window()
+        self.stack.append(StageFrame(span, rss))
+
+    def span_finished(self, span, start, end):
+        if threading.current_thread() is not self.thread or not self.stack or self.stack[-1].span is not span:
+            return
+        rss = self.close_window()
+        frame = self.stack.pop()
+        if self.stack:
+            parent = self.stack[-1]
+            parent.rss_peak = max(parent.rss_peak, frame.rss_peak)
+            parent.python_peak = max(parent.python_peak, frame.python_peak)
+        record = {
+            'stage': span.name,
+            'depth': len(self.stack),
+            'seconds': (end - start) / 1e9,
+            'rss_start': frame.rss_start,
+            'rss_end': rss,
+            'rss_peak': frame.rss_peak,
+            'python_peak': frame.python_peak if self.use_tracemalloc else None,
+        }
+        record.update({key: value for key, value in span.args.items() if key in ('file', 'title', 'rows')})
+        self.stages.append(record)
+
+    def record_frame(self, label, df):
+        self.frames.append({
+            'label': label,
+            'stage': self.stack[-1].span.name if self.stack else None,
+            'rows': len(df),
+            'columns': len(df.columns),
+            'bytes': int(df.memory_usage(deep=True).sum()),
+        })
+
+    def stop(self):
+        self.sampler.stop()
+        if self.use_tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+
+    def report(self):
+        return {
+            'job': self.name,
+            'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            'tracemalloc': self.use_tracemalloc,
+            'stages': self.stages,
+            'frames': self.frames,
+        }
+
+    def summary_lines(self):
+        lines = []
+        stages = sorted(self.stages, key=lambda record: record['rss_peak'], reverse=True)
+        for record in stages[:SUMMARY_STAGES]:
+            label = record['stage']
+            if record.get('file') or record.get('title'):
+                label += f" ({record.get('file') or record.get('title')})"
+            line = (f"{label}: peak RSS {format_bytes(record['rss_peak'])} "
+                    f"({format_bytes(record['rss_peak'] - record['rss_start'])} above start)")
+            if record['python_peak'] is not None:
+                line += f", Python allocations peak {format_bytes(record['python_peak'])}"
+            lines.append(line)
+        for frame in self.frames:
+            lines.append(f"DataFrame after {frame['label']}: {frame['rows']:,} rows x {frame['columns']} columns, "
+                         f"{format_bytes(frame['bytes'])}")
+        return lines
+
+
+def record_frame(label, df):
+    # Footprint of a DataFrame after a transformation; a no-op unless memory
+    # stats are being collected, since deep memory_usage is not free
+    stats = _stats
+    if stats is not None:
+        stats.record_frame(label, df)
+
+
+def start_memory_stats(name, mode=None):
+    global _stats
+    mode = (mode or os.environ.get(MEMORY_STATS_ENV_VAR) or '').strip().lower()
+    if mode in ('', '0', 'false', 'no'):
+        return None
+    _stats = MemoryStats(name, use_tracemalloc=mode != 'rss')
+    tracing.add_observer(_stats)
+    return _stats
+
+
+def stop_memory_stats():
+    global _stats
+    stats, _stats = _stats, None
+    if stats is not None:
+        tracing.remove_observer(stats)
+        stats.stop()
+    return stats
+
+
+def write_memory_stats(stats, path):
+    with open(path + '.partial', 'w', encoding='utf-8') as f:
+        json.dump(stats.report(), f, indent=2, default=str)
+    os.replace(path + '.partial', path)
+    return path
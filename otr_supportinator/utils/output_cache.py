@@ -0,0 +1,109 @@
+import os
+import json
+import shutil
+import hashlib
+from .fingerprint import file_fingerprint
+
+CACHE_VERSION = 2
+DEFAULT_MAX_CACHE_BYTES = 5 * 1024 ** 3
+# Points the cache somewhere else, e.g. an empty folder so benchmarks never hit it
+CACHE_DIR_ENV_VAR = 'OTR_OUTPUT_CACHE_DIR'
+
+
+def get_default_cache_directory():
+    if os.environ.get(CACHE_DIR_ENV_VAR):
+        return os.environ[CACHE_DIR_ENV_VAR]
+    return os.path.join(os.path.expanduser("~"), ".otr_supportinator", "output_cache")
+
+
+def combination_cache_key(input_hashes, planning_week, start_week, end_week):
+    # Input order matters because it decides the row order of the output
+    payload = json.dumps({
+        'version': CACHE_VERSION,
+        'inputs': list(input_hashes),
+        'planning_week': planning_week,
+        'start_week': start_week,
+        'end_week': end_week,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def link_or_copy(source, destination):
+    # Hard-links when source and destination share a volume, copies otherwise.
+    # The destination only appears once it is complete.
+    temp_path = destination + ".partial"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copyfile(source, temp_path)
+    os.replace(temp_path, destination)
+
+
+class OutputCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.directory = directory or get_default_cache_directory()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _entry_paths(self, key):
+        return (os.path.join(self.directory, f"{key}.xlsx"),
+                os.path.join(self.directory, f"{key}.json"))
+
+    def lookup(self, key):
+        data_path, meta_path = self._entry_paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # A hard-linked output edited in place would change the cached entry too
+        if not os.path.isfile(data_path) or file_fingerprint(data_path) != meta.get('fingerprint'):
+            self.invalidate(key)
+            return None
+        return meta
+
+    def materialize(self, key, destination):
+        meta = self.lookup(key)
+        if meta is None:
+            return None
+        data_path, _ = self._entry_paths(key)
+        link_or_copy(data_path, destination)
+        os.utime(data_path)  # Keep recently used entries out of pruning
+        return meta
+
+    def store(self, key, output_file, row_count):
+        data_path, meta_path = self._entry_paths(key)
+        try:
+            link_or_copy(output_file, data_path)
+            meta = {'fingerprint': file_fingerprint(data_path), 'rows': row_count}
+            with open(meta_path + ".partial", 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(meta_path + ".partial", meta_path)
+            self.prune()
+        except OSError as e:
+            print(f"Could not store {output_file} in the output cache: {e}")
+
+    def invalidate(self, key):
+        for path in self._entry_paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def prune(self):
+        entries = []
+        total_bytes = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".xlsx"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.name[:-len(".xlsx")]))
+                total_bytes += stat.st_size
+
+        for _, size, key in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            self.invalidate(key)
+            total_bytes -= size
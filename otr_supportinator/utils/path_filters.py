@@ -0,0 +1,67 @@
+import os
+import re
+import stat
+import fnmatch
+
+# File name filtering shared by the folder import of the window and the
+# headless watch mode; nothing here may import Qt
+
+
+def parse_include_patterns(text):
+    # Comma or semicolon separated; a bare prefix such as "kanto_" matches
+    # every name starting with it
+    patterns = [pattern.strip() for pattern in re.split(r'[,;]', text or '') if pattern.strip()]
+    return [pattern if any(char in pattern for char in '*?[') else pattern + '*' for pattern in patterns]
+
+
+def matches_patterns(file_name, patterns):
+    if not patterns:
+        return True
+    name = file_name.lower()
+    return any(fnmatch.fnmatchcase(name, pattern.lower()) for pattern in patterns)
+
+
+def is_wanted_file(file_name, extensions=None, patterns=None):
+    # Excel keeps "~$name.xlsx" lock files next to open workbooks
+    if file_name.startswith('~$'):
+        return False
+    if extensions and not file_name.lower().endswith(tuple(extensions)):
+        return False
+    return matches_patterns(file_name, patterns)
+
+
+def iter_candidate_files(paths, patterns=None, extensions=None, cancel_check=None):
+    # Files given directly only need the right extension; include patterns
+    # apply to what is discovered inside folders. scandir returns the entry
+    # type with the listing, so directories cost one call each.
+    directories = []
+    for path in paths:
+        if os.path.isdir(path):
+            directories.append(path)
+        elif is_wanted_file(os.path.basename(path), extensions):
+            yield path
+
+    while directories:
+        if cancel_check and cancel_check():
+            return
+        directory = directories.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(entry.path)
+                        elif is_wanted_file(entry.name, extensions, patterns):
+                            yield entry.path
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Could not scan {directory}: {str(e)}")
+
+
+def stat_file(path):
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return None
+    return path if stat.S_ISREG(file_stat.st_mode) else None
@@ -0,0 +1,104 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QLineEdit, QLabel, QPushButton
+from .dataframe_table import DataFrameTableView
+
+ALL_VALUES = "All"
+FILTER_COLUMNS = [('region', "Region"), ('cycle', "Cycle"), ('amazon_week', "Week")]
+TOTAL_COLUMN = '4 - amflex vans_ask'
+
+
+class PivotDrillDownPanel(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index = None
+        self.totals = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        filter_layout = QHBoxLayout()
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Search node, region or cycle...")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(self.apply_filters)
+        filter_layout.addWidget(self.search_edit, 2)
+
+        self.filter_combos = {}
+        for column, label in FILTER_COLUMNS:
+            filter_layout.addWidget(QLabel(f"{label}:"))
+            combo = QComboBox()
+            combo.currentIndexChanged.connect(self.apply_filters)
+            filter_layout.addWidget(combo, 1)
+            self.filter_combos[column] = combo
+
+        self.clear_filters_button = QPushButton("Clear Filters")
+        self.clear_filters_button.clicked.connect(self.clear_filters)
+        filter_layout.addWidget(self.clear_filters_button)
+        layout.addLayout(filter_layout)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        self.table = DataFrameTableView()
+        layout.addWidget(self.table)
+
+        self.set_pivot(None)
+
+    def set_pivot(self, pivot_table):
+        # Index building happens once per run; filtering afterwards only
+        # combines the prebuilt position arrays. None clears the panel.
+        if pivot_table is None:
+            self.index = None
+            self.totals = None
+        else:
+            from .pivot_index import PivotIndex
+            self.index = PivotIndex(pivot_table)
+            self.totals = pivot_table[TOTAL_COLUMN].to_numpy() if TOTAL_COLUMN in pivot_table.columns else None
+
+        for column, combo in self.filter_combos.items():
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem(ALL_VALUES, None)
+            if self.index is not None:
+                for value in self.index.values(column):
+                    combo.addItem(str(value), value)
+            combo.setEnabled(self.index is not None and column in self.index.columns)
+            combo.blockSignals(False)
+        self.search_edit.blockSignals(True)
+        self.search_edit.clear()
+        self.search_edit.blockSignals(False)
+
+        self.table.set_dataframe(pivot_table)
+        self.update_summary(self.table.model().rows)
+
+    def current_filters(self):
+        filters = {}
+        for column, combo in self.filter_combos.items():
+            value = combo.currentData()
+            if value is not None:
+                filters[column] = [value]
+        return filters
+
+    def apply_filters(self):
+        if self.index is None:
+            return
+        rows = self.index.filter(self.current_filters(), self.search_edit.text())
+        self.table.set_rows(rows)
+        self.update_summary(rows)
+
+    def clear_filters(self):
+        for combo in self.filter_combos.values():
+            combo.blockSignals(True)
+            combo.setCurrentIndex(0)
+            combo.blockSignals(False)
+        self.search_edit.blockSignals(True)
+        self.search_edit.clear()
+        self.search_edit.blockSignals(False)
+        self.apply_filters()
+
+    def update_summary(self, rows):
+        text = f"{len(rows):,} of {len(self.index) if self.index is not None else 0:,} rows"
+        if self.totals is not None and len(rows):
+            import pandas as pd
+            total = pd.to_numeric(pd.Series(self.totals[rows]), errors='coerce').sum()
+            text += f"  |  Total Van ask: {int(round(total)):,}"
+        self.summary_label.setText(text)
@@ -0,0 +1,67 @@
+import numpy as np
+
+INDEXED_COLUMNS = ['region', 'node', 'cycle', 'amazon_week']
+SEARCH_COLUMNS = ['node', 'region', 'cycle']
+
+
+class PivotIndex:
+    # Row positions of the pivot grouped by each indexed column, built once
+    # per run. Filters intersect these position arrays instead of scanning
+    # the frame, and text search only looks at each column's distinct values.
+    def __init__(self, df, columns=INDEXED_COLUMNS):
+        self.df = df
+        self.columns = [column for column in columns if column in df.columns]
+        self.positions = {}
+        self.labels = {}
+        for column in self.columns:
+            groups = df.groupby(column, sort=True).indices
+            self.positions[column] = {value: np.asarray(rows, dtype=np.int64) for value, rows in groups.items()}
+            values = list(self.positions[column])
+            self.labels[column] = (values, np.array([str(value).lower() for value in values], dtype=object))
+
+    def __len__(self):
+        return len(self.df)
+
+    def values(self, column):
+        return list(self.positions.get(column, {}))
+
+    def lookup(self, column, values):
+        groups = self.positions.get(column, {})
+        matches = [groups[value] for value in values if value in groups]
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        if len(matches) == 1:
+            return matches[0]
+        return np.sort(np.concatenate(matches))
+
+    def search(self, text, columns=SEARCH_COLUMNS):
+        text = text.strip().lower()
+        matches = []
+        for column in columns:
+            if column not in self.labels:
+                continue
+            values, labels = self.labels[column]
+            hits = [values[i] for i, label in enumerate(labels) if text in label]
+            if hits:
+                matches.append(self.lookup(column, hits))
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(matches))
+
+    def filter(self, filters=None, search=""):
+        # filters maps a column to the values to keep; empty means no filter
+        selected = None
+        for column, values in (filters or {}).items():
+            if not values:
+                continue
+            rows = self.lookup(column, values)
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        if search.strip():
+            rows = self.search(search)
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        if selected is None:
+            return np.arange(len(self.df), dtype=np.int64)
+        return selected
+
+    def select(self, filters=None, search=""):
+        return self.df.iloc[self.filter(filters, search)]
@@ -0,0 +1,86 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from .run_manifest import partial_path
+from .tracing import span
+
+# A few concurrent copies keep the share busy without one combination's
+# upload starving the next
+PUBLISH_WORKERS = 3
+PUBLISH_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def publish_file(source, destination, chunk_size=PUBLISH_CHUNK_SIZE, check_cancelled=None,
+                 on_writing=None, on_committed=None):
+    # Copies under a temporary name in the target directory and renames once
+    # the copy is complete and flushed, so the upload team never sees a
+    # partially written workbook
+    temp_path = partial_path(destination)
+    if on_writing:
+        on_writing(temp_path)
+    try:
+        with span('publish', file=os.path.basename(destination), bytes=os.path.getsize(source)), \
+                open(source, 'rb') as src, open(temp_path, 'wb') as dst:
+            while True:
+                if check_cancelled:
+                    check_cancelled()
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                dst.write(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+        if os.path.getsize(temp_path) != os.path.getsize(source):
+            raise OSError(f"Incomplete copy of {os.path.basename(destination)}")
+        os.replace(temp_path, destination)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    finally:
+        if on_committed:
+            on_committed(temp_path)
+    return destination
+
+
+class OutputPublisher:
+    # Publishes locally built outputs to the target directory on a bounded
+    # pool, so the network write overlaps with building the next output.
+    # Each publish carries a tag that comes back from collect() once the file
+    # is visible in the target.
+    def __init__(self, target_directory, workers=PUBLISH_WORKERS, check_cancelled=None,
+                 on_writing=None, on_committed=None):
+        self.target_directory = target_directory
+        self.check_cancelled = check_cancelled
+        self.on_writing = on_writing
+        self.on_committed = on_committed
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='publish')
+        self.pending = {}
+
+    def publish(self, local_file, tag=None, file_name=None):
+        destination = os.path.join(self.target_directory, file_name or os.path.basename(local_file))
+        future = self.pool.submit(publish_file, local_file, destination, PUBLISH_CHUNK_SIZE,
+                                  self.check_cancelled, self.on_writing, self.on_committed)
+        self.pending[future] = (local_file, tag)
+        return future
+
+    def collect(self, wait_for_all=False):
+        # Returns [(tag, local_file, destination)] for finished publishes and
+        # re-raises the first failure
+        if wait_for_all and self.pending:
+            wait(list(self.pending), return_when=FIRST_EXCEPTION)
+        finished = []
+        for future in [future for future in self.pending if future.done()]:
+            local_file, tag = self.pending.pop(future)
+            finished.append((tag, local_file, future.result()))
+        return finished
+
+    def has_pending(self):
+        return bool(self.pending)
+
+    def shutdown(self):
+        # Unstarted copies are dropped; running ones stop at their next
+        # cancellation check
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.pending = {}
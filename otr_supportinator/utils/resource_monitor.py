@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtWidgets import QLabel
+from .memory_stats import format_bytes
+
+# Seconds between samples; each one is a handful of psutil calls
+DEFAULT_INTERVAL = 1.0
+INTERVAL_ENV_VAR = 'OTR_MONITOR_INTERVAL'
+
+
+def monitor_interval():
+    try:
+        return max(float(os.environ.get(INTERVAL_ENV_VAR, DEFAULT_INTERVAL)), 0.2)
+    except ValueError:
+        return DEFAULT_INTERVAL
+
+
+class ResourceMonitor(QThread):
+    # Samples this process and its job processes off the UI thread. CPU and
+    # I/O are summed over the whole process tree, since the heavy work runs
+    # in the job children.
+    sample_ready = pyqtSignal(dict)
+
+    def __init__(self, scheduler=None, interval=None, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.interval = interval or monitor_interval()
+        self.stopped = threading.Event()
+        self.processes = {}
+        self.previous = None
+
+    def run(self):
+        # The first sample waits one interval, so psutil loads after the
+        # window is up rather than during startup
+        if self.stopped.wait(self.interval):
+            return
+        import psutil
+        self.psutil = psutil
+        self.root = psutil.Process()
+        while True:
+            try:
+                sample = self.take_sample()
+                if sample is not None:
+                    self.sample_ready.emit(sample)
+            except psutil.Error as e:
+                print(f"Resource monitor: {e}")
+            if self.stopped.wait(self.interval):
+                return
+
+    def process_tree(self):
+        # Process objects are kept between samples because cpu_percent
+        # measures against the previous call on the same object
+        try:
+            current = [self.root] + self.root.children(recursive=True)
+        except self.psutil.Error:
+            current = [self.root]
+        processes = {}
+        for process in current:
+            processes[process.pid] = self.processes.get(process.pid, process)
+        self.processes = processes
+        return list(processes.values())
+
+    def take_sample(self):
+        now = time.monotonic()
+        cpu = rss = read_bytes = write_bytes = 0
+        for process in self.process_tree():
+            try:
+                with process.oneshot():
+                    cpu += process.cpu_percent()
+                    rss += process.memory_info().rss
+                    io = process.io_counters() if hasattr(process, 'io_counters') else None
+                    if io is not None:
+                        # Includes reads and writes on network shares
+                        read_bytes += io.read_bytes
+                        write_bytes += io.write_bytes
+            except self.psutil.Error:
+                continue
+        if not hasattr(self.root, 'io_counters'):
+            # macOS has no per-process I/O counters; fall back to the disks
+            io = self.psutil.disk_io_counters()
+            read_bytes, write_bytes = (io.read_bytes, io.write_bytes) if io else (0, 0)
+        rows = self.rows_processed()
+
+        previous, self.previous = self.previous, (now, read_bytes, write_bytes, rows)
+        if previous is None:
+            return None
+        elapsed = max(now - previous[0], 1e-6)
+        return {
+            'cpu_percent': cpu / (self.psutil.cpu_count() or 1),
+            'rss': rss,
+            'system_memory_percent': self.psutil.virtual_memory().percent,
+            # Job processes that exit take their counters with them
+            'read_per_second': max(read_bytes - previous[1], 0) / elapsed,
+            'write_per_second': max(write_bytes - previous[2], 0) / elapsed,
+            'rows_per_second': max(rows - previous[3], 0) / elapsed if self.has_running_jobs() else None,
+        }
+
+    def has_running_jobs(self):
+        return self.scheduler is not None and bool(self.scheduler.running)
+
+    def rows_processed(self):
+        if self.scheduler is None:
+            return 0
+        # Counters only grow, so finished jobs keep contributing their total
+        return sum(job.runner.rows_processed for job in list(self.scheduler.jobs))
+
+    def stop(self):
+        self.stopped.set()
+        self.wait()
+
+
+class ResourceStatusLabel(QLabel):
+    # Permanent status bar widget fed by ResourceMonitor
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setText("Collecting resource usage...")
+        self.setToolTip("CPU and memory of this app and its job processes, disk and share throughput, "
+                        f"and rows per second of running jobs. Set {INTERVAL_ENV_VAR} to change the "
+                        "sampling interval in seconds.")
+
+    def show_sample(self, sample):
+        parts = [
+            f"CPU {sample['cpu_percent']:.0f}%",
+            f"RSS {format_bytes(sample['rss'])}",
+            f"RAM {sample['system_memory_percent']:.0f}%",
+            f"Read {format_bytes(sample['read_per_second'])}/s",
+            f"Write {format_bytes(sample['write_per_second'])}/s",
+        ]
+        if sample['rows_per_second'] is not None:
+            parts.append(f"{sample['rows_per_second']:,.0f} rows/s")
+        self.setText("  |  ".join(parts))
@@ -0,0 +1,113 @@
+import os
+import json
+import hashlib
+from .fingerprint import file_fingerprint
+
+# One manifest per set of inputs and planning week, so runs into the same
+# folder from the window, the service and the CLI keep their own
+MANIFEST_NAME = ".otr_combiner_manifest_{key}.json"
+PARTIAL_SUFFIX = ".partial"
+MANIFEST_VERSION = 2
+
+
+def partial_path(output_file):
+    return output_file + PARTIAL_SUFFIX
+
+
+def commit_partial(output_file):
+    # os.replace is atomic on the same volume, so readers only ever see a
+    # complete workbook under the final name
+    os.replace(partial_path(output_file), output_file)
+
+
+def remove_partial(output_file):
+    try:
+        os.remove(partial_path(output_file))
+    except FileNotFoundError:
+        pass
+
+
+def remove_stale_partials(directory, titles):
+    # Only this run's outputs; other partials in the folder may belong to
+    # jobs that are still writing
+    for title in titles:
+        stale_file = partial_path(os.path.join(directory, f"{title}.xlsx"))
+        if not os.path.exists(stale_file):
+            continue
+        try:
+            os.remove(stale_file)
+            print(f"Removed stale partial output: {stale_file}")
+        except OSError as e:
+            print(f"Could not remove stale partial output {stale_file}: {e}")
+
+
+class RunManifest:
+    def __init__(self, directory, file_paths, planning_week, fingerprints=None):
+        self.directory = directory
+        self.planning_week = planning_week
+        fingerprints = fingerprints or {}
+        self.inputs = {os.path.abspath(path): self.input_key(path, fingerprints.get(path))
+                       for path in file_paths}
+        key = hashlib.sha1(json.dumps([planning_week, self.inputs], sort_keys=True).encode('utf-8'))
+        self.path = os.path.join(directory, MANIFEST_NAME.format(key=key.hexdigest()[:16]))
+        self.completed = {}
+
+    def input_key(self, path, fingerprint=None):
+        # The fingerprint only samples the file; size and mtime catch an edit
+        # between the sampled blocks
+        file_stat = os.stat(path)
+        return [file_stat.st_size, file_stat.st_mtime_ns, fingerprint or file_fingerprint(path)]
+
+    def load(self):
+        # Picks up the finished combinations of an interrupted run with the
+        # same inputs; anything that does not match starts a fresh manifest
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if (data.get('version') != MANIFEST_VERSION
+                or data.get('planning_week') != self.planning_week
+                or data.get('inputs') != self.inputs):
+            return False
+
+        for title, entry in data.get('completed', {}).items():
+            output_file = os.path.join(self.directory, entry['file'])
+            if os.path.isfile(output_file) and os.path.getsize(output_file) == entry['size']:
+                self.completed[title] = entry
+        return bool(self.completed)
+
+    def is_completed(self, combination):
+        entry = self.completed.get(combination['title'])
+        return (entry is not None
+                and entry['start_week'] == combination['start_week']
+                and entry['end_week'] == combination['end_week'])
+
+    def mark_completed(self, combination, output_file, row_count):
+        self.completed[combination['title']] = {
+            'file': os.path.basename(output_file),
+            'size': os.path.getsize(output_file),
+            'rows': row_count,
+            'start_week': combination['start_week'],
+            'end_week': combination['end_week'],
+        }
+        self.save()
+
+    def save(self):
+        data = {
+            'version': MANIFEST_VERSION,
+            'planning_week': self.planning_week,
+            'inputs': self.inputs,
+            'completed': self.completed,
+        }
+        temp_path = f"{self.path}.{os.getpid()}{PARTIAL_SUFFIX}"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,219 @@
+import os
+import time
+import shutil
+import hashlib
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .run_manifest import partial_path
+
+STAGING_WORKERS = 4
+# Few large sequential reads instead of openpyxl's many small random ones
+STAGING_CHUNK_SIZE = 8 * 1024 * 1024
+# Set to e.g. "5" to simulate a 5 MB/s share when testing against local files
+THROTTLE_ENV_VAR = 'OTR_STAGING_THROTTLE_MBPS'
+
+
+class StagingError(Exception):
+    pass
+
+
+class BandwidthThrottle:
+    # Shares one simulated link between all copy workers
+    def __init__(self, bytes_per_second, latency=0.0):
+        self.bytes_per_second = bytes_per_second
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.available_at = time.monotonic()
+
+    def __call__(self, nbytes):
+        with self.lock:
+            start = max(self.available_at, time.monotonic())
+            self.available_at = start + self.latency + nbytes / self.bytes_per_second
+            wait = self.available_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+
+def throttle_from_environment():
+    value = os.environ.get(THROTTLE_ENV_VAR)
+    if not value:
+        return None
+    try:
+        return BandwidthThrottle(float(value) * 1024 * 1024, latency=0.005)
+    except ValueError:
+        print(f"Ignoring invalid {THROTTLE_ENV_VAR}={value}")
+        return None
+
+
+def source_signature(path):
+    file_stat = os.stat(path)
+    return file_stat.st_size, file_stat.st_mtime_ns
+
+
+def copy_file_chunked(source, destination, chunk_size=STAGING_CHUNK_SIZE, throttle=None, cancel_check=None):
+    temp_path = partial_path(destination)
+    try:
+        with open(source, 'rb') as src, open(temp_path, 'wb') as dst:
+            while True:
+                if cancel_check and cancel_check():
+                    raise StagingError("Staging cancelled")
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                if throttle:
+                    throttle(len(chunk))
+                dst.write(chunk)
+        shutil.copystat(source, temp_path)
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class StagedFile:
+    def __init__(self, source, local_path):
+        self.source = source
+        self.local_path = local_path
+        self.signature = None
+        self.future = None
+        self.refs = 0
+
+
+class StagingManager:
+    # Copies queued inputs from the share into the session's temp directory
+    # as soon as they are queued, so jobs parse local copies. Copies are
+    # reference counted: each file list entry and each running job holds one.
+    def __init__(self, staging_dir, workers=STAGING_WORKERS, chunk_size=STAGING_CHUNK_SIZE, throttle=None):
+        self.staging_dir = staging_dir
+        self.chunk_size = chunk_size
+        self.throttle = throttle
+        self.files = {}
+        self.copy_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.closed = False
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='staging')
+        os.makedirs(staging_dir, exist_ok=True)
+
+    def key(self, source):
+        return os.path.normcase(os.path.abspath(source))
+
+    def stage(self, source):
+        # Starts copying in the background if needed; takes a reference
+        with self.lock:
+            key = self.key(source)
+            staged = self.files.get(key)
+            if staged is None:
+                # One folder per copy keeps the original file name, and a copy
+                # still being removed never collides with a new one
+                folder = f"{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}-{next(self.copy_ids)}"
+                staged = StagedFile(source, os.path.join(self.staging_dir, folder, os.path.basename(source)))
+                self.files[key] = staged
+            staged.refs += 1
+            if staged.future is None or (staged.future.done() and staged.future.exception() is not None):
+                staged.future = self.pool.submit(self.copy, staged)
+            return staged
+
+    def copy(self, staged):
+        started = time.perf_counter()
+        signature = source_signature(staged.source)
+        os.makedirs(os.path.dirname(staged.local_path), exist_ok=True)
+        copy_file_chunked(staged.source, staged.local_path, self.chunk_size, self.throttle,
+                          lambda: self.closed)
+
+        # The source must not have changed while it was being copied
+        if source_signature(staged.source) != signature:
+            os.remove(staged.local_path)
+            raise StagingError(f"{staged.source} changed while it was being staged")
+        if os.path.getsize(staged.local_path) != signature[0]:
+            os.remove(staged.local_path)
+            raise StagingError(f"Staged copy of {staged.source} is incomplete")
+        staged.signature = signature
+        print(f"Staged {os.path.basename(staged.source)} ({signature[0]} bytes) "
+              f"in {time.perf_counter() - started:.2f} seconds")
+        return staged.local_path
+
+    def local_path(self, source, timeout=None):
+        # Waits for the copy and checks it still matches the source; a changed
+        # source is copied again
+        staged = self.stage(source)
+        try:
+            staged.future.result(timeout)
+            if source_signature(source) != staged.signature:
+                with self.lock:
+                    staged.future = self.pool.submit(self.copy, staged)
+                staged.future.result(timeout)
+            return staged.local_path
+        finally:
+            self.release(source)
+
+    def is_staged(self, source):
+        staged = self.files.get(self.key(source))
+        return staged is not None and staged.future is not None and staged.future.done() \
+            and staged.future.exception() is None
+
+    def acquire_local_copies(self, sources, cancel_check=None, progress_callback=None):
+        # For jobs: returns {source: local path} and keeps a reference on each
+        # copy until release_all(). Files that cannot be staged are read from
+        # the source instead.
+        # Every copy is started before waiting on the first, so files not
+        # staged yet are copied side by side
+        staged_files = [self.stage(source) for source in sources]
+        local_paths = {}
+        for i, (source, staged) in enumerate(zip(sources, staged_files), 1):
+            while not staged.future.done():
+                if cancel_check and cancel_check():
+                    self.release_all(sources)
+                    return None
+                time.sleep(0.05)
+            try:
+                local_paths[source] = self.local_path(source)
+            except (OSError, StagingError) as e:
+                print(f"Reading {source} directly, staging failed: {str(e)}")
+                local_paths[source] = source
+            if progress_callback:
+                progress_callback(i, len(sources))
+        return local_paths
+
+    def release(self, source):
+        with self.lock:
+            key = self.key(source)
+            staged = self.files.get(key)
+            if staged is None:
+                return
+            staged.refs -= 1
+            if staged.refs > 0:
+                return
+            del self.files[key]
+        if staged.future is not None:
+            staged.future.add_done_callback(lambda future, staged=staged: self.remove_copy(staged))
+
+    def release_all(self, sources):
+        for source in sources:
+            self.release(source)
+
+    def remove_copy(self, staged):
+        shutil.rmtree(os.path.dirname(staged.local_path), ignore_errors=True)
+
+    def shutdown(self):
+        self.closed = True
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+_staging_manager = None
+
+
+def get_staging_manager():
+    # None until the main window configures staging for its session
+    return _staging_manager
+
+
+def configure_staging(staging_dir, **kwargs):
+    global _staging_manager
+    if _staging_manager is not None:
+        _staging_manager.shutdown()
+    kwargs.setdefault('throttle', throttle_from_environment())
+    _staging_manager = StagingManager(staging_dir, **kwargs)
+    return _staging_manager
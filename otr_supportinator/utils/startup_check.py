@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+import subprocess
+from .startup_timing import HEAVY_MODULES
+
+# Importing the main window should only pull in Qt and our own modules;
+# pandas and friends load when the first job needs them
+IMPORT_BUDGET_SECONDS = 1.0
+IMPORT_CHECK_RUNS = 3
+
+
+IMPORT_CHECK_CODE = """
+import sys, json, time
+started = time.perf_counter()
+import otr_supportinator.main_window
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_import(runs=IMPORT_CHECK_RUNS):
+    # Each run is a fresh interpreter, so nothing is already imported. The
+    # fastest run is kept to smooth out disk cache and scheduler noise.
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([package_root] + [p for p in [env.get('PYTHONPATH')] if p])
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', IMPORT_CHECK_CODE], env=env, capture_output=True,
+                                text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return min(results, key=lambda result: result['seconds'])
+
+
+def check_import_budget(budget=IMPORT_BUDGET_SECONDS):
+    # Returns a list of problems; empty when startup is within budget
+    result = measure_import()
+    print(f"Importing the main window took {result['seconds']:.3f}s (budget {budget:.2f}s)")
+    problems = []
+    if result['seconds'] > budget:
+        problems.append(f"Import took {result['seconds']:.3f}s, over the {budget:.2f}s budget")
+    if result['loaded']:
+        problems.append(f"Heavy modules imported at startup: {', '.join(result['loaded'])}")
+    return problems
+
+
+if __name__ == '__main__':
+    # python -m otr_supportinator.utils.startup_check
+    problems = check_import_budget()
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,45 @@
+import sys
+import time
+from PyQt6.QtCore import QObject, QEvent, QTimer
+
+# Loaded on demand by jobs; none of these should be needed to show the window
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'psutil', 'pyarrow']
+
+_started = time.perf_counter()
+_marks = []
+
+
+def mark(label):
+    _marks.append((label, time.perf_counter()))
+
+
+def report():
+    lines = ["Startup timing:"]
+    previous = _started
+    for label, timestamp in _marks:
+        lines.append(f"  {label}: {timestamp - _started:.3f}s (+{timestamp - previous:.3f}s)")
+        previous = timestamp
+    loaded = [module for module in HEAVY_MODULES if module in sys.modules]
+    if loaded:
+        lines.append(f"  Loaded before first paint: {', '.join(loaded)}")
+    print("\n".join(lines))
+
+
+class FirstPaintReporter(QObject):
+    # Prints the report once the window has painted for the first time
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        window.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self.window and event.type() == QEvent.Type.Paint:
+            self.window.removeEventFilter(self)
+            mark("First paint")
+            # Report after the paint itself has finished
+            QTimer.singleShot(0, report)
+        return False
+
+
+def report_on_first_paint(window):
+    return FirstPaintReporter(window)
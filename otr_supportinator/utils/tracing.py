@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+# Set to a folder to write a trace of every job run into it
+TRACE_DIR_ENV_VAR = 'OTR_TRACE_DIR'
+
+_tracer = None
+# Everything told about spans: the tracer and e.g. memory accounting
+_observers = []
+
+
+class Span:
+    def __init__(self, observers, name, args):
+        self.observers = observers
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def set(self, **args):
+        # For counts only known once the work is done, e.g. rows after a melt
+        self.args.update(args)
+
+    def __enter__(self):
+        for observer in self.observers:
+            observer.span_started(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        for observer in self.observers:
+            observer.span_finished(self, self.start, end)
+        return False
+
+
+class _NullSpan:
+    # Shared by every span() call while tracing is off
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    # Collects complete-duration events in the Chrome trace event format,
+    # which chrome://tracing and ui.perfetto.dev open directly
+    def __init__(self, name, trace_dir=None):
+        self.name = name
+        self.trace_dir = trace_dir
+        self.pid = os.getpid()
+        self.origin = time.perf_counter_ns()
+        self.events = []
+        self.thread_names = {}
+        self.lock = threading.Lock()
+
+    def span_started(self, span):
+        pass
+
+    def span_finished(self, span, start, end):
+        self.add(span.name, start, end, span.args)
+
+    def add(self, name, start, end, args):
+        thread = threading.current_thread()
+        event = {
+            'name': name,
+            'ph': 'X',
+            'ts': (start - self.origin) / 1000,
+            'dur': (end - start) / 1000,
+            'pid': self.pid,
+            'tid': thread.ident,
+            'args': args,
+        }
+        with self.lock:
+            self.thread_names.setdefault(thread.ident, thread.name)
+            self.events.append(event)
+
+    def to_json(self):
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': self.name}}]
+        for tid, thread_name in self.thread_names.items():
+            metadata.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                             'args': {'name': thread_name}})
+        return {'traceEvents': metadata + sorted(self.events, key=lambda event: event['ts']),
+                'displayTimeUnit': 'ms'}
+
+    def write(self, path):
+        with open(path + '.partial', 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, default=str)
+        os.replace(path + '.partial', path)
+        return path
+
+
+def span(name, **args):
+    # with span('pivot', rows=len(df)) as s: ... s.set(output_rows=...)
+    observers = _observers
+    if not observers:
+        return _NULL_SPAN
+    return Span(observers, name, args)
+
+
+def is_enabled():
+    # Lets callers skip computing arguments nobody will see
+    return bool(_observers)
+
+
+def add_observer(observer):
+    # Observers get span_started(span) and span_finished(span, start, end),
+    # with times from perf_counter_ns
+    global _observers
+    _observers = _observers + [observer]
+
+
+def remove_observer(observer):
+    global _observers
+    _observers = [other for other in _observers if other is not observer]
+
+
+def start_tracing(name, trace_dir=None):
+    # Tracing is per process; jobs run in their own process, so one tracer
+    # covers exactly one job
+    global _tracer
+    trace_dir = trace_dir or os.environ.get(TRACE_DIR_ENV_VAR)
+    if not trace_dir:
+        return None
+    os.makedirs(trace_dir, exist_ok=True)
+    _tracer = Tracer(name, trace_dir)
+    add_observer(_tracer)
+    return _tracer
+
+
+def stop_tracing():
+    # Writes the trace file and returns its path
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return None
+    remove_observer(tracer)
+    file_name = f"{tracer.name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{tracer.pid}.trace.json"
+    try:
+        return tracer.write(os.path.join(tracer.trace_dir, file_name))
+    except OSError as e:
+        print(f"Could not write trace file: {e}")
+        return None
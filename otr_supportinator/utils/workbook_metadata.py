@@ -0,0 +1,238 @@
+import os
+import re
+import zipfile
+import posixpath
+from xml.etree.ElementTree import iterparse
+from .input_readers import (is_columnar_input, read_arrow_table, read_input_schema,
+                            XLSX_BYTES_PER_CELL)
+
+EXCEL_MAX_ROWS = 1048576  # Including the header row
+SAMPLE_ROWS = 2000
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def scan_input_metadata(file_path, sample_rows=SAMPLE_ROWS):
+    if is_columnar_input(file_path):
+        return _scan_columnar_metadata(file_path)
+
+    # Reads only the dimension element, the header row and a sample of the
+    # amazon_week column instead of loading the whole workbook
+    with zipfile.ZipFile(file_path) as zf:
+        sheet_path = _first_sheet_path(zf)
+        sheet_info = zf.getinfo(sheet_path)
+
+        dimension = None
+        header_cells = {}
+        week_column = None
+        week_counts = {}
+        sampled_rows = 0
+        sampled_bytes = 0
+        shared_strings = _SharedStrings(zf)
+
+        with zf.open(sheet_path) as sheet:
+            for event, elem in iterparse(sheet, events=('end',)):
+                tag = elem.tag
+                if tag == _MAIN_NS + 'dimension':
+                    dimension = elem.get('ref')
+                elif tag == _MAIN_NS + 'row':
+                    if not header_cells:
+                        for position, cell in enumerate(elem.iter(_MAIN_NS + 'c'), 1):
+                            header_cells[_column_index(cell.get('r'), position)] = _cell_value(cell, shared_strings)
+                        week_column = next((col for col, name in header_cells.items() if name == 'amazon_week'), None)
+                    else:
+                        sampled_rows += 1
+                        if week_column is not None:
+                            for position, cell in enumerate(elem.iter(_MAIN_NS + 'c'), 1):
+                                if _column_index(cell.get('r'), position) == week_column:
+                                    week = _as_week(_cell_value(cell, shared_strings))
+                                    if week is not None:
+                                        week_counts[week] = week_counts.get(week, 0) + 1
+                                    break
+                        if sampled_rows >= sample_rows:
+                            sampled_bytes = sheet.tell() if hasattr(sheet, 'tell') else 0
+                            break
+                    elem.clear()
+                elif tag == _MAIN_NS + 'sheetData':
+                    break
+        shared_strings.close()
+
+    columns = [header_cells[col] for col in sorted(header_cells)]
+    data_rows, rows_estimated = _data_row_count(dimension, sampled_rows, sample_rows,
+                                                sampled_bytes, sheet_info.file_size)
+
+    file_size = os.path.getsize(file_path)
+
+    return {
+        'file_path': file_path,
+        'file_size': file_size,
+        'columns': columns,
+        'data_rows': data_rows,
+        'rows_estimated': rows_estimated,
+        'sampled_rows': sampled_rows,
+        'week_counts': week_counts,
+        'amazon_weeks': sorted(week_counts),
+        # A sample stops at sample_rows, so later regions may forecast weeks it missed
+        'weeks_complete': sampled_rows < sample_rows,
+        'bytes_per_row': file_size / data_rows if data_rows else 0,
+    }
+
+
+def _scan_columnar_metadata(file_path):
+    # Columnar formats carry their schema and row count in the footer, and
+    # the amazon_week column can be read on its own
+    columns, data_rows = read_input_schema(file_path)
+    week_counts = {}
+    if 'amazon_week' in columns:
+        import pyarrow.compute as pc
+        weeks = read_arrow_table(file_path, ['amazon_week']).column('amazon_week')
+        if data_rows is None:
+            data_rows = len(weeks)
+        for entry in pc.value_counts(weeks).to_pylist():
+            week = _as_week(entry['values'])
+            if week is not None:
+                week_counts[week] = week_counts.get(week, 0) + entry['counts']
+
+    return {
+        'file_path': file_path,
+        'file_size': os.path.getsize(file_path),
+        'columns': columns,
+        'data_rows': data_rows or 0,
+        'rows_estimated': False,
+        'sampled_rows': data_rows or 0,
+        'week_counts': week_counts,
+        'amazon_weeks': sorted(week_counts),
+        'weeks_complete': True,
+        'bytes_per_row': len(columns) * XLSX_BYTES_PER_CELL,
+    }
+
+
+def get_planned_horizons(metadata, planning_week):
+    # Same horizon definition the combiner uses when filtering
+    return sorted({(week - planning_week) % 52 for week in metadata['amazon_weeks']})
+
+
+def estimate_combination_output(metadata_list, planning_week, start_week, end_week):
+    horizons = set(range(start_week, end_week + 1))
+    rows = 0
+    total_bytes = 0
+    for metadata in metadata_list:
+        sampled = sum(metadata['week_counts'].values())
+        if not sampled or not metadata['data_rows']:
+            continue
+        matching = sum(count for week, count in metadata['week_counts'].items()
+                       if (week - planning_week) % 52 in horizons)
+        file_rows = int(round(metadata['data_rows'] * matching / sampled))
+        rows += file_rows
+        total_bytes += int(file_rows * metadata['bytes_per_row'])
+
+    return {
+        'rows': rows,
+        'bytes': total_bytes,
+        'exceeds_excel_limit': rows + 1 > EXCEL_MAX_ROWS,
+    }
+
+
+def format_byte_size(num_bytes):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if num_bytes < 1024 or unit == 'GB':
+            return f"{num_bytes:.0f} {unit}" if unit == 'B' else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+def _data_row_count(dimension, sampled_rows, sample_rows, sampled_bytes, sheet_size):
+    if sampled_rows < sample_rows:
+        # The whole sheet fit in the sample, so the count is exact
+        return sampled_rows, False
+
+    if dimension and ':' in dimension:
+        last_cell = dimension.split(':')[1]
+        match = re.search(r'(\d+)$', last_cell)
+        if match:
+            return max(int(match.group(1)) - 1, 0), False
+
+    # No usable dimension (e.g. write-only workbooks): extrapolate from the
+    # uncompressed sheet size and the bytes consumed by the sample
+    if sampled_bytes:
+        return int(sampled_rows * sheet_size / sampled_bytes), True
+    return sampled_rows, True
+
+
+def _first_sheet_path(zf):
+    sheet_rel_id = None
+    with zf.open('xl/workbook.xml') as workbook:
+        for event, elem in iterparse(workbook, events=('end',)):
+            if elem.tag == _MAIN_NS + 'sheet':
+                sheet_rel_id = elem.get(_REL_NS + 'id')
+                break
+
+    with zf.open('xl/_rels/workbook.xml.rels') as rels:
+        for event, elem in iterparse(rels, events=('end',)):
+            if elem.tag == _PKG_REL_NS + 'Relationship' and elem.get('Id') == sheet_rel_id:
+                target = elem.get('Target')
+                if target.startswith('/'):
+                    return target.lstrip('/')
+                return posixpath.normpath(posixpath.join('xl', target))
+
+    raise ValueError("Workbook does not contain any worksheets")
+
+
+class _SharedStrings:
+    # Parses the shared string table only as far as the requested index, so a
+    # header lookup does not pay for every node name in the workbook
+    def __init__(self, zf):
+        self.zf = zf
+        self.strings = []
+        self.stream = None
+        self.parser = None
+
+    def __getitem__(self, index):
+        if self.parser is None and self.stream is None:
+            if 'xl/sharedStrings.xml' not in self.zf.namelist():
+                raise IndexError(index)
+            self.stream = self.zf.open('xl/sharedStrings.xml')
+            self.parser = iterparse(self.stream, events=('end',))
+        while index >= len(self.strings):
+            for event, elem in self.parser:
+                if elem.tag == _MAIN_NS + 'si':
+                    self.strings.append(''.join(t.text or '' for t in elem.iter(_MAIN_NS + 't')))
+                    elem.clear()
+                    break
+            else:
+                raise IndexError(index)
+        return self.strings[index]
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+
+
+def _cell_value(cell, shared_strings):
+    cell_type = cell.get('t')
+    if cell_type == 'inlineStr':
+        return ''.join(t.text or '' for t in cell.iter(_MAIN_NS + 't'))
+    value = cell.find(_MAIN_NS + 'v')
+    if value is None or value.text is None:
+        return None
+    if cell_type == 's':
+        return shared_strings[int(value.text)]
+    return value.text
+
+
+def _as_week(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _column_index(cell_ref, position):
+    # Cell references are optional in the spec; fall back to the cell's position
+    if not cell_ref:
+        return position
+    index = 0
+    for char in re.match(r'[A-Z]+', cell_ref).group(0):
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index
@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import threading
+from .engine.naming import extract_plan_type, extract_planning_week, DEFAULT_PLAN_TYPE
+from .engine.input_cache import enable_input_cache
+from .utils.path_filters import parse_include_patterns, is_wanted_file
+from .cli import build_generate_job, run_job, summarize_result
+
+# Usage:
+#   otr_supportinator watch "W:/drop" --output-dir "W:/summaries" --include "*plwk*" --stable-seconds 60
+#
+# Forecast workbooks that land in the folder are grouped by planning week and
+# plan type. Once every file of a group has stopped changing for the
+# stability window, the group is run through the generator; groups whose
+# files did not change are left alone. Change notification comes from
+# watchdog when it is installed; otherwise, or on shares that do not deliver
+# notifications, the folder is polled.
+
+DEFAULT_INCLUDE = "*plwk*"
+FORECAST_EXTENSIONS = ('.xlsx',)
+DEFAULT_STABLE_SECONDS = 30
+DEFAULT_POLL_SECONDS = 10
+# With notifications a full rescan is still done now and then, in case some were lost
+NOTIFIED_RESCAN_SECONDS = 120
+SETTLE_CHECK_SECONDS = 1  # Tick while files are waiting out the stability window
+STATE_FILE_NAME = ".otr_watch_state.json"
+
+
+def file_signature(path):
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return None
+    return [file_stat.st_size, file_stat.st_mtime_ns]
+
+
+def group_key(file_name):
+    week = extract_planning_week(file_name)
+    if week is None:
+        return None
+    return f"plwk{week}_{extract_plan_type(file_name) or DEFAULT_PLAN_TYPE}"
+
+
+class ChangeNotifier:
+    # Wakes the watch loop on file system events. watchdog is optional; without
+    # it wait() simply sleeps for the poll interval.
+    def __init__(self, folder, poll_seconds):
+        self.folder = folder
+        self.poll_seconds = poll_seconds
+        self.changed = threading.Event()
+        self.observer = None
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return
+
+        notifier = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                notifier.changed.set()
+
+        self.observer = Observer()
+        self.observer.schedule(Handler(), folder, recursive=False)
+        self.observer.start()
+
+    @property
+    def mode(self):
+        return "notifications" if self.observer is not None else "polling"
+
+    def wait(self, timeout):
+        if self.observer is None:
+            time.sleep(timeout)
+            return False
+        changed = self.changed.wait(timeout)
+        self.changed.clear()
+        return changed
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+
+
+class FolderWatcher:
+    def __init__(self, folder, output_dir, printer, include=DEFAULT_INCLUDE, stable_seconds=DEFAULT_STABLE_SECONDS,
+                 poll_seconds=DEFAULT_POLL_SECONDS, plan_type=None):
+        self.folder = os.path.abspath(folder)
+        self.output_dir = os.path.abspath(output_dir)
+        self.printer = printer
+        self.patterns = parse_include_patterns(include)
+        self.stable_seconds = stable_seconds
+        self.poll_seconds = poll_seconds
+        self.plan_type = plan_type
+        # path -> [signature, monotonic time it was first seen with it]
+        self.observed = {}
+        self.state_path = os.path.join(self.output_dir, STATE_FILE_NAME)
+        # group -> {path: signature} of the last run, kept across restarts
+        self.processed = self.load_state()
+        self.stopped = threading.Event()
+
+    def load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('processed', {})
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self):
+        with open(self.state_path + '.partial', 'w', encoding='utf-8') as f:
+            json.dump({'folder': self.folder, 'processed': self.processed}, f, indent=2)
+        os.replace(self.state_path + '.partial', self.state_path)
+
+    def is_forecast(self, file_name):
+        # Summary files written into the same folder must not trigger runs
+        if file_name.startswith('summary_file_'):
+            return False
+        return is_wanted_file(file_name, FORECAST_EXTENSIONS, self.patterns)
+
+    def scan(self):
+        # One scandir of the folder; stats only the files that match
+        now = time.monotonic()
+        seen = {}
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not self.is_forecast(entry.name):
+                        continue
+                    signature = file_signature(entry.path)
+                    if signature is not None:
+                        seen[entry.path] = signature
+        except OSError as e:
+            self.printer.write('warning', message=f"Could not scan {self.folder}: {e}")
+            return
+        for path, signature in seen.items():
+            previous = self.observed.get(path)
+            if previous is None or previous[0] != signature:
+                self.observed[path] = [signature, now]
+        for path in set(self.observed) - set(seen):
+            del self.observed[path]
+
+    def groups(self):
+        groups = {}
+        for path in self.observed:
+            key = group_key(os.path.basename(path))
+            if key is None:
+                continue
+            if self.plan_type and not key.endswith(f"_{self.plan_type}"):
+                continue
+            groups.setdefault(key, []).append(path)
+        return groups
+
+    def ready_groups(self):
+        # Groups whose files changed since their last run and have all been
+        # stable for the whole window. Returns (ready, still settling).
+        now = time.monotonic()
+        ready = []
+        settling = False
+        for key, paths in sorted(self.groups().items()):
+            current = {path: self.observed[path][0] for path in paths}
+            if current == self.processed.get(key):
+                continue
+            if any(now - self.observed[path][1] < self.stable_seconds for path in paths):
+                settling = True
+                continue
+            ready.append((key, sorted(paths), current))
+        return ready, settling
+
+    def run_group(self, key, paths, signatures):
+        self.printer.write('started', message=f"Generating {key} from {len(paths)} file(s)", group=key, files=paths)
+        week = extract_planning_week(os.path.basename(paths[0]))
+        plan_type = key.split('_', 1)[1]
+        try:
+            job_kwargs = build_generate_job(paths, plan_type, week, self.output_dir)
+        except ValueError as e:
+            self.printer.write('failed', message=str(e), group=key)
+            return
+        kind, payload = run_job('generate', job_kwargs, self.printer)
+        if kind == 'result':
+            self.printer.write('result', group=key, **summarize_result('generate', payload))
+        else:
+            self.printer.write(kind, message=payload or kind, group=key)
+        if kind == 'cancelled':
+            self.stopped.set()
+            return
+        # A failed group is not retried until one of its files changes again
+        self.processed[key] = signatures
+        self.save_state()
+
+    def run(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        # Files unchanged between runs of the watcher are only parsed once
+        enable_input_cache()
+        notifier = ChangeNotifier(self.folder, self.poll_seconds)
+        self.printer.write('watching', message=f"Watching {self.folder} using {notifier.mode}, "
+                                               f"writing to {self.output_dir}")
+        try:
+            while not self.stopped.is_set():
+                self.scan()
+                ready, settling = self.ready_groups()
+                for key, paths, signatures in ready:
+                    if self.stopped.is_set():
+                        break
+                    self.run_group(key, paths, signatures)
+                if settling:
+                    timeout = SETTLE_CHECK_SECONDS
+                elif notifier.observer is not None:
+                    timeout = NOTIFIED_RESCAN_SECONDS
+                else:
+                    timeout = self.poll_seconds
+                notifier.wait(timeout)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            notifier.stop()
+        self.printer.write('stopped', message="Stopped watching")
+        return 0
+
+
+def watch_command(args, printer):
+    if not os.path.isdir(args.folder):
+        printer.write('failed', message=f"Not a folder: {args.folder}")
+        return 1
+    watcher = FolderWatcher(args.folder, args.output_dir or args.folder, printer, args.include,
+                            args.stable_seconds, args.poll_seconds, args.plan_type)
+    return watcher.run()
+
+
+if __name__ == '__main__':
+    from .cli import main
+    sys.exit(main(['watch'] + sys.argv[1:]))
@@ -6,6 +6,7 @@ setup(
     packages=find_packages(),
     install_requires=[
         'PyQt6',
+        'psutil',
         # add other dependencies
     ],
     entry_points={
@@ -0,0 +1,59 @@
+import os
+import threading
+import pytest
+from otr_supportinator.engine.generator import generate_summary_file
+from otr_supportinator.utils.history_store import HistoryStore
+
+
+@pytest.fixture
+def forecast(tmp_path, monkeypatch):
+    from benchmarks.synthetic_data import write_forecast_workbook
+    monkeypatch.setenv('OTR_HISTORY_DIR', str(tmp_path / 'history'))
+    monkeypatch.setenv('OTR_THROUGHPUT_HISTORY', str(tmp_path / 'throughput.json'))
+    path = str(tmp_path / 'plwk45_final_w-1.2.3.xlsx')
+    write_forecast_workbook(path, 0, nodes=2, weeks=3)
+    return path
+
+
+def data_files(directory):
+    return [name for root, dirs, names in os.walk(directory) for name in names if '.parquet' in name]
+
+
+def test_saved_run_is_recorded(tmp_path, forecast):
+    output_file = str(tmp_path / 'summary_file_plwk45_final.xlsx')
+    result = generate_summary_file([forecast], 'summary.xlsx', save_file_path=output_file)
+    runs = HistoryStore(str(tmp_path / 'history')).runs()
+    assert [run['run_id'] for run in runs] == [result['history_run_id']]
+    assert runs[0]['output_file'] == output_file
+    assert len(data_files(tmp_path / 'history')) == 2  # The pivot and its rollup
+
+
+def test_failed_save_records_nothing(tmp_path, forecast):
+    output_file = str(tmp_path / 'missing_dir' / 'summary_file_plwk45_final.xlsx')
+    with pytest.raises(FileNotFoundError):
+        generate_summary_file([forecast], 'summary.xlsx', save_file_path=output_file)
+    # Nothing may be recorded late either
+    for thread in threading.enumerate():
+        if thread.name == 'history-append':
+            thread.join()
+    assert HistoryStore(str(tmp_path / 'history')).runs() == []
+    assert data_files(tmp_path / 'history') == []
+
+
+@pytest.mark.parametrize('group_by', ['region', 'node'])
+def test_query_reads_a_metric_the_latest_run_lacks(tmp_path, group_by):
+    import pandas as pd
+    from datetime import datetime
+    from otr_supportinator.utils.history_query import query_history, history_options
+    store = HistoryStore(str(tmp_path / 'history'))
+    pivot = pd.DataFrame({'region': ['KANTO', 'KANSAI'], 'node': ['K1', 'K2'], 'amazon_week': [45, 45],
+                          'vans': [1.0, 2.0]})
+    # The newer run, read first, has no vans column
+    store.append(pivot, 43, 'ask', created_at=datetime(2026, 10, 19))
+    store.append(pivot.rename(columns={'vans': 'trucks'}), 44, 'ask', created_at=datetime(2026, 10, 26))
+    result = query_history('vans', 45, 'ask', group_by=group_by, store=store)
+    assert result['files_read'] == 2
+    assert result['rows']['value'].sum() == 3.0
+    assert history_options(store)['metrics'] == ['trucks', 'vans']
+    with pytest.raises(ValueError):
+        query_history('boats', 45, 'ask', group_by=group_by, store=store)
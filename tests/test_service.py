@@ -0,0 +1,84 @@
+import os
+import json
+import threading
+import urllib.request
+import urllib.error
+import pytest
+from otr_supportinator.service import create_server, ServiceClient
+
+TOKEN = 'test-token'
+
+
+@pytest.fixture(scope='module')
+def service(tmp_path_factory):
+    # One worker process for the whole module; spawning it is the slow part
+    from benchmarks.synthetic_data import write_forecast_workbook
+    folder = tmp_path_factory.mktemp('service')
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('OTR_HISTORY_DIR', 'off')
+        patch.setenv('OTR_THROUGHPUT_HISTORY', str(folder / 'throughput.json'))
+        source = folder / 'plwk45_final_w-1.2.3.xlsx'
+        write_forecast_workbook(str(source), 0, nodes=2, weeks=3)
+        server = create_server(port=0, workers=1, cache_bytes=64 * 1024 * 1024, token=TOKEN)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield {'url': f"http://127.0.0.1:{server.server_address[1]}", 'folder': folder, 'source': source}
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.service.shutdown()
+
+
+def raw_post(url, body, headers):
+    request = urllib.request.Request(url, data=body, method='POST', headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_client_runs_jobs_and_reuses_parsed_inputs(service):
+    client = ServiceClient(service['url'], token=TOKEN)
+    output_dir = service['folder'] / 'out'
+    for name in ('first.xlsx', 'second.xlsx'):
+        job = client.submit('generate', inputs=[str(service['source'])], output_dir=str(output_dir),
+                            output_name=name)
+        finished = client.wait(job['id'], poll_interval=0.2, timeout=120)
+        assert finished['status'] == 'succeeded', finished['error']
+        assert os.path.isfile(output_dir / name)
+    assert [job['status'] for job in client.jobs()] == ['succeeded', 'succeeded']
+    assert client.rpc('service_status')['workers'][0]['input_cache']['hits'] >= 1
+
+
+def test_rejects_requests_a_web_page_could_send(service):
+    body = json.dumps({'job': 'generate', 'params': {'inputs': [str(service['source'])],
+                                                     'output_dir': str(service['folder'] / 'evil'),
+                                                     'output_name': 'pwn.xlsx'}}).encode('utf-8')
+    url = service['url'] + '/jobs'
+    authorized = {'Authorization': f"Bearer {TOKEN}"}
+    assert raw_post(url, body, dict(authorized, **{'Content-Type': 'text/plain'})) == 415
+    assert raw_post(url, body, dict(authorized, **{'Content-Type': 'application/json',
+                                                   'Host': 'evil.example.com'})) == 403
+    assert raw_post(url, body, {'Content-Type': 'application/json'}) == 401
+    assert raw_post(url, body, {'Content-Type': 'application/json', 'Authorization': 'Bearer wrong'}) == 401
+    with pytest.raises(RuntimeError):
+        ServiceClient(service['url']).jobs()
+    assert not os.path.exists(service['folder'] / 'evil')
+
+
+@pytest.mark.parametrize('output_name', ['pwn.txt', '../pwn.xlsx', '/tmp/pwn.xlsx', 'sub\\pwn.xlsx'])
+def test_rejects_output_names_that_are_not_bare_workbooks(service, output_name):
+    client = ServiceClient(service['url'], token=TOKEN)
+    with pytest.raises(RuntimeError, match='400'):
+        client.submit('generate', inputs=[str(service['source'])], output_name=output_name)
+
+
+def test_cancel_sent_right_after_submit_is_not_lost(service):
+    client = ServiceClient(service['url'], token=TOKEN)
+    job = client.submit('generate', inputs=[str(service['source'])], output_dir=str(service['folder'] / 'cancelled'),
+                        output_name='cancelled.xlsx')
+    client.cancel(job['id'])
+    assert client.wait(job['id'], poll_interval=0.2, timeout=120)['status'] == 'cancelled'
+    assert not os.path.exists(service['folder'] / 'cancelled' / 'cancelled.xlsx')
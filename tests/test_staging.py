@@ -0,0 +1,117 @@
+import os
+import threading
+import pytest
+from otr_supportinator.utils.staging import StagingManager, BandwidthThrottle, StagingError
+
+# The share is simulated by a local folder read through a bandwidth throttle
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RecordingThrottle(BandwidthThrottle):
+    # Also records how many copies were waiting on the link at once
+    def __init__(self, bytes_per_second, latency=0.0, on_chunk=None):
+        super().__init__(bytes_per_second, latency)
+        self.on_chunk = on_chunk
+        self.active = 0
+        self.max_active = 0
+        self.counter_lock = threading.Lock()
+
+    def __call__(self, nbytes):
+        with self.counter_lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if self.on_chunk:
+                self.on_chunk()
+            super().__call__(nbytes)
+        finally:
+            with self.counter_lock:
+                self.active -= 1
+
+
+def write_file(path, size, fill=b'x'):
+    with open(path, 'wb') as f:
+        f.write(fill * size)
+    return path
+
+
+@pytest.fixture
+def share(tmp_path):
+    folder = tmp_path / 'share'
+    folder.mkdir()
+    return folder
+
+
+def make_manager(tmp_path, throttle, workers=4):
+    return StagingManager(str(tmp_path / 'staging'), workers=workers, chunk_size=CHUNK_SIZE, throttle=throttle)
+
+
+def test_copies_run_in_parallel_through_the_throttle(tmp_path, share):
+    throttle = RecordingThrottle(16 * 1024 * 1024, latency=0.02)
+    manager = make_manager(tmp_path, throttle)
+    sources = [write_file(str(share / f"input_{i}.xlsx"), 4 * CHUNK_SIZE, bytes([65 + i])) for i in range(4)]
+    try:
+        local_paths = manager.acquire_local_copies(sources)
+        assert throttle.max_active > 1
+        for source in sources:
+            local_path = local_paths[source]
+            assert local_path != source
+            assert local_path.startswith(manager.staging_dir)
+            with open(local_path, 'rb') as copy, open(source, 'rb') as original:
+                assert copy.read() == original.read()
+            assert os.stat(local_path).st_mtime_ns == os.stat(source).st_mtime_ns
+    finally:
+        manager.shutdown()
+
+
+def test_source_changed_during_copy_fails(tmp_path, share):
+    source = write_file(str(share / 'input.xlsx'), 4 * CHUNK_SIZE)
+
+    def grow_source():
+        # Once, or the copy would keep chasing the end of the file
+        if os.path.getsize(source) == 4 * CHUNK_SIZE:
+            with open(source, 'ab') as f:
+                f.write(b'y')
+
+    manager = make_manager(tmp_path, RecordingThrottle(64 * 1024 * 1024, on_chunk=grow_source))
+    try:
+        staged = manager.stage(source)
+        with pytest.raises(StagingError):
+            staged.future.result(10)
+        assert not manager.is_staged(source)
+        manager.release(source)
+    finally:
+        manager.shutdown()
+
+
+def test_source_changed_after_copy_is_staged_again(tmp_path, share):
+    source = write_file(str(share / 'input.xlsx'), 2 * CHUNK_SIZE)
+    manager = make_manager(tmp_path, RecordingThrottle(64 * 1024 * 1024))
+    try:
+        manager.stage(source).future.result(10)
+        write_file(source, 3 * CHUNK_SIZE, b'z')
+        local_path = manager.local_path(source, timeout=10)
+        with open(local_path, 'rb') as f:
+            assert f.read() == b'z' * 3 * CHUNK_SIZE
+    finally:
+        manager.shutdown()
+
+
+def test_generator_parses_the_local_copy(tmp_path, share):
+    from benchmarks.synthetic_data import write_forecast_workbook
+    from otr_supportinator.engine.generator import SummaryFileGenerator
+
+    source = str(share / 'plwk45_final_w-1.2.3.xlsx')
+    write_forecast_workbook(source, 0, nodes=2, weeks=3)
+    manager = make_manager(tmp_path, RecordingThrottle(64 * 1024 * 1024))
+    try:
+        local_paths = manager.acquire_local_copies([source])
+        # Anything still reading the share would now fail
+        os.remove(source)
+        pivot_table, _, _ = SummaryFileGenerator([source], local_paths=local_paths).process_files()
+        assert len(pivot_table) > 0
+        assert set(pivot_table['node']) == {'K000000', 'K000001'}
+        manager.release_all(local_paths)
+    finally:
+        manager.shutdown()
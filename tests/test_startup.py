@@ -0,0 +1,7 @@
+from otr_supportinator.utils.startup_check import check_import_budget
+
+
+def test_main_window_import_is_within_budget():
+    # Fails when importing the main window gets slower than the budget or
+    # starts pulling in pandas and other heavy modules
+    assert check_import_budget() == []